@@ -0,0 +1,132 @@
+"""
+async_views.py
+
+This module contains native async read endpoints for the Library Management System app.
+
+These views are plain Django async views: under an ASGI server (e.g. uvicorn library_management_system.asgi:application)
+they run on the event loop and use Django's async ORM (aget, async for), so a single worker process can serve many
+concurrent reads without holding a thread per request. The existing serializers are reused; rows are fetched
+asynchronously first and serialized afterwards, so serialization never touches the database.
+
+Endpoints (GET only):
+    - /library/async/books/: List all books.
+    - /library/async/books/<id>/: Retrieve a book.
+    - /library/async/bookdetails/: List all book details.
+    - /library/async/bookdetails/<id>/: Retrieve book details.
+    - /library/async/borrowedbooks/current/: List currently borrowed books, cursor paginated like
+      /library/borrowedbooks/current/ (cursor and page_size query parameters).
+
+Authentication:
+    - Same JWT access tokens as the DRF viewsets, validated with TokenUserAuthentication.aauthenticate.
+    - Responses mirror the DRF error format: {"detail": ...} with 401, 404 or 405.
+
+Usage:
+    - Run the project with an ASGI server to benefit from the async path; under WSGI the views still work,
+      but Django runs them in a one-off event loop per request.
+"""
+
+
+import functools
+
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, MethodNotAllowed, NotAuthenticated, NotFound
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import replace_query_param
+
+from .authentication import TokenUserAuthentication
+from .models import Book, BookDetails, BorrowedBooks
+from .pagination import LOAN_ORDERING, LoanCursorPagination, decode_cursor, encode_cursor, filter_after_cursor
+from .serializers import BookSerializer, BookDetailsSerializer, BorrowedBooksSerializer
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    return JsonResponse(data, status=status_code, encoder=JSONEncoder, safe=False)
+
+
+def async_api_view(view):
+    """
+    Decorator for async read views: allows GET only, authenticates the request with a JWT access token
+    and turns DRF API exceptions into JSON error responses.
+    """
+    authenticator = TokenUserAuthentication()
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            if request.method != 'GET':
+                raise MethodNotAllowed(request.method)
+            auth = await authenticator.aauthenticate(request)
+            if auth is None:
+                raise NotAuthenticated()
+            request.user, request.auth = auth
+            return await view(request, *args, **kwargs)
+        except APIException as exc:
+            response = json_response({'detail': exc.detail}, status_code=exc.status_code)
+            if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+                response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+            return response
+
+    return wrapper
+
+
+async def retrieve(queryset, pk, serializer_class):
+    try:
+        instance = await queryset.aget(pk=pk)
+    except queryset.model.DoesNotExist:
+        raise NotFound('No {} matches the given query.'.format(queryset.model._meta.object_name))
+    return json_response(serializer_class(instance).data)
+
+
+async def list_all(queryset, serializer_class):
+    instances = [instance async for instance in queryset]
+    return json_response(serializer_class(instances, many=True).data)
+
+
+@async_api_view
+async def book_list(request):
+    return await list_all(Book.objects.all(), BookSerializer)
+
+
+@async_api_view
+async def book_detail(request, pk):
+    return await retrieve(Book.objects.all(), pk, BookSerializer)
+
+
+@async_api_view
+async def bookdetails_list(request):
+    return await list_all(BookDetails.objects.all(), BookDetailsSerializer)
+
+
+@async_api_view
+async def bookdetails_detail(request, pk):
+    return await retrieve(BookDetails.objects.all(), pk, BookDetailsSerializer)
+
+
+@async_api_view
+async def borrowedbooks_current(request):
+    """
+    Lists currently borrowed books one page at a time, with the same keyset cursor as the synchronous endpoint.
+    """
+    try:
+        page_size = int(request.GET.get('page_size', LoanCursorPagination.page_size))
+    except ValueError:
+        page_size = LoanCursorPagination.page_size
+    page_size = max(1, min(page_size, LoanCursorPagination.max_page_size))
+
+    queryset = BorrowedBooks.objects.filter(HasBeenReturned=False).order_by(*LOAN_ORDERING)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        queryset = filter_after_cursor(queryset, decode_cursor(cursor))
+
+    loans = [loan async for loan in queryset[:page_size + 1]]
+    next_link = None
+    if len(loans) > page_size:
+        loans = loans[:page_size]
+        next_link = replace_query_param(request.build_absolute_uri(), 'page_size', page_size)
+        next_link = replace_query_param(next_link, 'cursor', encode_cursor(loans[-1].BorrowDate, loans[-1].pk))
+
+    return json_response({
+        'next': next_link,
+        'results': BorrowedBooksSerializer(loans, many=True).data,
+    })
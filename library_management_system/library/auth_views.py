@@ -7,6 +7,9 @@ LoginView:
     Inherits from TokenObtainPairView provided by the rest_framework_simplejwt library.
     Responsible for handling user login and providing JWT tokens upon successful authentication.
     Extends the default behavior to include the user_id in the response for convenience.
+    Uses LoginSerializer, which takes the user_id from the user authenticated while issuing the tokens,
+    so no additional database query is needed.
+    Throttled per client IP and per username (throttle scope "login", see throttling.py).
 
     - POST:
         - Endpoint: /library/login/
@@ -15,10 +18,12 @@ LoginView:
             - password (string): User's password
         - Response:
             - 200 OK: Successful login, includes access and refresh tokens. Additional user_id is appended to the response data.
+            - 429 Too Many Requests: Too many attempts from this IP address or for this username; see Retry-After.
 
 SignupView:
     Inherits from APIView provided by the Django Rest Framework.
     Responsible for handling user signup and creating a new user in the system.
+    Throttled per client IP and per username (throttle scope "signup", see throttling.py).
 
     - POST:
         - Endpoint: /library/signup/
@@ -28,14 +33,17 @@ SignupView:
         - Response:
             - 201 Created: User created successfully.
             - 400 Bad Request: Username already exists.
+            - 429 Too Many Requests: Too many signups from this IP address or for this username; see Retry-After.
 
 Permissions:
     Both LoginView and SignupView allow any user (including unauthenticated users) to access their respective endpoints.
     This is achieved by setting the permission_classes attribute to (permissions.AllowAny,).
+    Both are throttled with token buckets instead, which reject bursts before any password is hashed.
 
 Note:
     - TokenObtainPairView is part of the rest_framework_simplejwt library, providing a standard implementation for JWT token generation.
     - The LoginView extends this functionality to include the user_id in the response, facilitating user identification in subsequent requests.
+    - The issued tokens carry the user_id and username claims, which TokenUserAuthentication uses to authenticate requests without a database lookup.
     - The SignupView checks for existing usernames and prevents creating a new user with an existing username.
 
 Usage:
@@ -53,23 +61,20 @@ from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.exceptions import ValidationError
+from .serializers import LoginSerializer
+from .throttling import IPTokenBucketThrottle, UsernameTokenBucketThrottle
 
 class LoginView(TokenObtainPairView):
     permission_classes = (permissions.AllowAny,)
-
-    def post(self, request, *args, **kwargs):
-        try:
-            response = super().post(request, *args, **kwargs)
-            if response.status_code == status.HTTP_200_OK:
-                user = User.objects.get(username=request.data.get('username'))
-                response.data['user_id'] = user.id
-            return response
-        except User.DoesNotExist:
-            raise NotFound('User not found')
+    serializer_class = LoginSerializer
+    throttle_classes = (IPTokenBucketThrottle, UsernameTokenBucketThrottle)
+    throttle_scope = 'login'
 
 class SignupView(APIView):
     permission_classes = (permissions.AllowAny,)
+    throttle_classes = (IPTokenBucketThrottle, UsernameTokenBucketThrottle)
+    throttle_scope = 'signup'
 
     def post(self, request):
         try:
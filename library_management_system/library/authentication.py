@@ -0,0 +1,103 @@
+"""
+authentication.py
+
+This module contains the authentication classes used by the viewsets of the Library Management System app.
+
+TokenUserAuthentication:
+    - Inherits from JWTAuthentication provided by the rest_framework_simplejwt library.
+    - Builds request.user from the claims of the validated access token (a TokenUser carrying user_id and username)
+      instead of loading auth.User from the database on every request.
+    - Optionally verifies that the user still exists and is active. The result is kept in an in-process LRU cache for
+      LIBRARY_AUTH_ACTIVE_USER_TTL seconds, so a deactivated or deleted user loses access within that time while
+      active users cost at most one query per TTL per worker process.
+
+    - aauthenticate() is the native async counterpart used by the async read views (see async_views.py);
+      its active-user check uses the async ORM instead of blocking the event loop.
+
+Settings:
+    - LIBRARY_AUTH_ACTIVE_USER_TTL (integer, default: 60): Seconds an active-user check is cached. 0 disables the
+      check entirely, so access tokens are trusted until they expire.
+    - LIBRARY_AUTH_ACTIVE_USER_CACHE_SIZE (integer, default: 10000): Maximum number of users kept in the cache.
+
+Usage:
+    - Set TokenUserAuthentication in the authentication_classes of a view or in REST_FRAMEWORK settings.
+    - Views using it receive a TokenUser, not an auth.User instance, as request.user.
+"""
+
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import LocalTTLCache
+
+active_users = LocalTTLCache(
+    maxsize=getattr(settings, 'LIBRARY_AUTH_ACTIVE_USER_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'LIBRARY_AUTH_ACTIVE_USER_TTL', 60),
+)
+
+
+def active_user_queryset(user_id):
+    return get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id, 'is_active': True})
+
+
+def is_active_user(user_id):
+    """
+    Returns whether the user exists and is active, using the in-process cache when possible.
+    """
+    is_active = active_users.get(user_id)
+    if is_active is None:
+        is_active = active_user_queryset(user_id).exists()
+        active_users.set(user_id, is_active)
+    return is_active
+
+
+async def ais_active_user(user_id):
+    """
+    Async version of is_active_user.
+    """
+    is_active = active_users.get(user_id)
+    if is_active is None:
+        is_active = await active_user_queryset(user_id).aexists()
+        active_users.set(user_id, is_active)
+    return is_active
+
+
+class TokenUserAuthentication(JWTAuthentication):
+    """
+    JWT authentication returning a token-backed user instead of querying auth.User on every request.
+    """
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        if active_users.ttl > 0 and not is_active_user(user_id):
+            raise AuthenticationFailed('User not found or inactive', code='user_inactive')
+
+        return api_settings.TOKEN_USER_CLASS(validated_token)
+
+    async def aauthenticate(self, request):
+        """
+        Async version of authenticate(), for plain Django async views.
+        Returns a (user, validated_token) tuple, or None when the request carries no token.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        user_id = self.get_user_id(validated_token)
+        if active_users.ttl > 0 and not await ais_active_user(user_id):
+            raise AuthenticationFailed('User not found or inactive', code='user_inactive')
+
+        return api_settings.TOKEN_USER_CLASS(validated_token), validated_token
@@ -0,0 +1,188 @@
+"""
+availability.py
+
+This module contains the in-process availability index answering "how many copies of book X are on the shelf right
+now?" from memory, for the batch endpoint GET /library/books/availability/?ids=... (see views.py).
+
+AvailabilityIndex:
+    - Holds the AvailableCopies of every book in a compact array indexed by BookID (4 bytes per book id, -1 for ids
+      without a book), so a lookup is a list index and thousands of ids are answered in microseconds.
+    - Warmed on first use from a single query on BookInventory (ready() must not query the database, so the
+      first request of each worker process pays for it).
+    - Kept current from the change feed (see changes.py): at most every LIBRARY_AVAILABILITY_SYNC_INTERVAL seconds,
+      a request reads the events written since the last sync, by any worker process, and reloads the inventories
+      of the books they touch (borrowed, returned or deleted loans, new or deleted books, inventory changes) with
+      one query. Between syncs, requests do not touch the database; answers are at most one sync interval stale
+      (or LIBRARY_CHANGES_GAP_TIMEOUT seconds while a transaction holding an earlier event is still committing).
+    - Reconciled with the database every LIBRARY_AVAILABILITY_RECONCILE_INTERVAL seconds: the whole index is
+      reloaded and the books whose count had drifted (e.g. after changes made outside the API) are logged.
+    - Syncs run in the request thread that finds them due; concurrent requests keep answering from the current
+      array meanwhile instead of waiting.
+
+Settings:
+    - LIBRARY_AVAILABILITY_SYNC_INTERVAL (float, default: 1): Seconds between two reads of the change feed.
+    - LIBRARY_AVAILABILITY_RECONCILE_INTERVAL (float, default: 300): Seconds between two full reconciliations.
+    - LIBRARY_AVAILABILITY_MAX_IDS (integer, default: 10000): Maximum number of ids per availability request.
+
+Usage:
+    from library.availability import availability_index
+    availability_index.get_many([1, 2, 3])  # {1: 2, 2: 0, 3: None}
+"""
+
+
+import logging
+import threading
+import time
+from array import array
+
+from django.conf import settings
+from django.db.models import Max
+
+from .changes import read_changes
+from .models import BookInventory, ChangeEvent
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN = -1
+SYNC_BATCH_SIZE = 1000
+
+
+def load_counts(book_ids=None):
+    queryset = BookInventory.objects.all()
+    if book_ids is not None:
+        queryset = queryset.filter(BookID__in=book_ids)
+    return queryset.values_list('BookID', 'AvailableCopies')
+
+
+def book_ids_of_events(events):
+    book_ids = set()
+    for event in events:
+        if event.Model == 'borrowedbooks':
+            if event.Data and event.Data.get('BookID') is not None:
+                book_ids.add(event.Data['BookID'])
+        elif event.Model in ('book', 'bookinventory'):
+            book_ids.add(event.ObjectID)
+    return book_ids
+
+
+class AvailabilityIndex:
+    """
+    Number of available copies per BookID, kept in memory and synchronised from the change feed.
+    """
+    def __init__(self):
+        self.counts = None
+        self.last_seq = 0
+        self.synced_at = 0.0
+        self.reconciled_at = 0.0
+        self.drifted = 0
+        self.lock = threading.Lock()
+
+    def build(self):
+        """
+        Load the whole index with one query; returns the new array and the change feed position it reflects.
+        """
+        # Read the position first: events written while the inventories are loaded are applied again by the next
+        # sync, which is harmless as syncs reload absolute counts
+        last_seq = ChangeEvent.objects.aggregate(last=Max('Seq'))['last'] or 0
+        rows = list(load_counts())
+        counts = array('i', [UNKNOWN]) * (max((book_id for book_id, _ in rows), default=0) + 1)
+        for book_id, available in rows:
+            counts[book_id] = available
+        return counts, last_seq
+
+    def reload(self):
+        """
+        Replace the whole index, returning the number of books whose count had drifted. The lock must be held.
+        """
+        counts, last_seq = self.build()
+        current = self.counts
+        drifted = 0
+        if current is not None:
+            size = max(len(counts), len(current))
+            counts_padded = counts + array('i', [UNKNOWN]) * (size - len(counts))
+            current_padded = current + array('i', [UNKNOWN]) * (size - len(current))
+            drifted = sum(1 for new, old in zip(counts_padded, current_padded) if new != old)
+            last_seq = max(last_seq, self.last_seq)
+        self.counts, self.last_seq = counts, last_seq
+        self.synced_at = self.reconciled_at = time.monotonic()
+        if drifted:
+            self.drifted += drifted
+            logger.warning('Availability index reconciled: %d books were out of date.', drifted)
+        return drifted
+
+    def reconcile(self):
+        """
+        Reload the whole index from the database.
+
+        Returns:
+            int: The number of books that were out of date.
+        """
+        with self.lock:
+            return self.reload()
+
+    def apply(self, book_ids):
+        """
+        Reload the counts of some books from the database.
+        """
+        found = dict(load_counts(book_ids))
+        counts = self.counts
+        size = max(max(book_ids, default=0) + 1, len(counts))
+        if size > len(counts):
+            counts = counts + array('i', [UNKNOWN]) * (size - len(counts))
+        for book_id in book_ids:
+            counts[book_id] = found.get(book_id, UNKNOWN)
+        self.counts = counts
+
+    def sync(self):
+        """
+        Apply the change feed events written since the last sync.
+        """
+        while True:
+            events = read_changes(self.last_seq, limit=SYNC_BATCH_SIZE)
+            if not events:
+                break
+            book_ids = book_ids_of_events(events)
+            if book_ids:
+                self.apply(book_ids)
+            self.last_seq = events[-1].Seq
+            if len(events) < SYNC_BATCH_SIZE:
+                break
+        self.synced_at = time.monotonic()
+
+    def refresh(self):
+        """
+        Warm, sync or reconcile the index when due. Called before answering a request.
+        """
+        if self.counts is None:
+            # Nothing to answer from yet: wait for the thread warming the index
+            with self.lock:
+                if self.counts is None:
+                    self.reload()
+            return
+        now = time.monotonic()
+        reconcile_due = now - self.reconciled_at >= getattr(settings, 'LIBRARY_AVAILABILITY_RECONCILE_INTERVAL', 300)
+        sync_due = now - self.synced_at >= getattr(settings, 'LIBRARY_AVAILABILITY_SYNC_INTERVAL', 1)
+        if (reconcile_due or sync_due) and self.lock.acquire(blocking=False):
+            try:
+                if reconcile_due:
+                    self.reload()
+                else:
+                    self.sync()
+            finally:
+                self.lock.release()
+
+    def get_many(self, book_ids):
+        """
+        Returns {book_id: number of available copies}, None for ids that are not books.
+        """
+        self.refresh()
+        counts = self.counts
+        size = len(counts)
+        result = {}
+        for book_id in book_ids:
+            available = counts[book_id] if 0 <= book_id < size else UNKNOWN
+            result[book_id] = None if available == UNKNOWN else available
+        return result
+
+
+availability_index = AvailabilityIndex()
@@ -0,0 +1,681 @@
+"""
+benchmarks.py
+
+This module contains the benchmark suite of the Library Management System (see the benchmark_library management
+command, which seeds a throwaway database and runs it).
+
+Benchmarks:
+    - serializer.*: Microbenchmarks of the serializers: BorrowedBooksSerializer validation, many=True
+      serialization of up to --sample-size preloaded instances of every model, and serialization plus rendering
+      of loans through DRF (borrowedbooks_render) and through the .values() fast path (borrowedbooks_render_fast),
+      for --sample-size loans and for a 10,000-loan page (*_10k, larger than the listings' max_page_size, as in an
+      export or an internal consumer).
+    - endpoint.*: Macrobenchmarks of the API endpoints, called through the DRF test client with a real JWT, so
+      authentication, middleware, queries, serialization and rendering are all included.
+    - Benchmarks that write (borrow, return, bulk borrow and return) run inside a transaction that is rolled back
+      after every round, so every round starts from the same data.
+    - Catalog endpoints served through the cache are measured both with an empty cache (cold) and cached.
+    - borrowedbooks_list_large_not_modified polls a large loan listing with the ETag of its previous response,
+      answered with 304 from the table versions (see conditional.py).
+    - books_availability asks for the available copies of up to --sample-size books, answered from the in-memory
+      availability index (see availability.py).
+    - login_burst and signup_burst send a burst of requests from one client, with the throttles configured in
+      settings and with throttling disabled (*_unthrottled); their CPU time shows the password hashing saved by
+      rejecting the burst early. They hash passwords for real, so they run fewer rounds.
+    - auth.*: Authentication of one request carrying a JWT, with the database user lookup of simplejwt's
+      JWTAuthentication (jwt_user) and with TokenUserAuthentication, which builds the user from the token claims
+      (token_user, see authentication.py). endpoint.books_retrieve_cached_jwt_user repeats
+      books_retrieve_cached with JWTAuthentication on the books viewset, to compare whole requests.
+    - index.*: The lookups served by the indexes of models.py (open loans of a user and of a book, overdue loans,
+      a keyset page in the middle of the loan history, books of a genre), with the EXPLAIN plan of each query
+      stored in the results, to check which index is used at a realistic size (e.g. --loans 1000000).
+    - search.*: The first page of catalog search results through the full-text search (search_books, GIN
+      indexed) and through the icontains substring matching it replaced, with their EXPLAIN plans, to compare
+      them at a realistic catalog size (e.g. --books 1000000): for a word found in many titles (*_common) and for
+      the ISBN of the last book (*_rare). PostgreSQL only (skipped on other databases).
+    - partitioning.*: The same loan queries filtered on BorrowDate (one month of loans, recent open loans) on the
+      loans table and on a copy of it partitioned by month (see partitioning.py), created on first use
+      (PostgreSQL only, skipped on other databases).
+
+run_benchmarks:
+    - Runs every benchmark for a number of warmup rounds (not recorded) and measured rounds, and returns
+      min/max/mean/median/stddev of the time of one call, in seconds, per benchmark, and the median CPU time of
+      the process (cpu_median), plus the EXPLAIN plan (plan) of the benchmarks declaring their query.
+
+compare:
+    - Compares the medians of two result sets and lists the benchmarks that got slower than a threshold.
+
+Usage:
+    - Register a new benchmark with the @benchmark decorator. The function receives the BenchmarkContext and is
+      timed as a whole; number > 1 calls it several times per round for very fast operations.
+"""
+
+
+import statistics
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User as AuthUser
+from django.db import connection, transaction
+from django.test import override_settings
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from rest_framework.renderers import JSONRenderer
+
+from . import cache, partitioning
+from .authentication import TokenUserAuthentication
+from .fastpath import FastJSONRenderer, build_plan, values_to_data
+from .models import User, Book, BookDetails, BookInventory, BorrowedBooks
+from .pagination import LOAN_ORDERING, filter_after_cursor
+from .search import filter_substring, search_books
+from .serializers import (
+    UserSerializer, BookSerializer, BookDetailsSerializer, BorrowedBooksSerializer, BookWithDetailsSerializer,
+    BorrowedBooksExpandedSerializer, LoginSerializer,
+)
+from .views import BookViewSet
+
+
+class Benchmark:
+    def __init__(self, group, name, func, number=1, setup=None, rollback=False, max_rounds=None, explain=None,
+                 vendors=None):
+        self.name = '{}.{}'.format(group, name)
+        self.func = func
+        self.number = number
+        self.setup = setup
+        self.rollback = rollback
+        self.max_rounds = max_rounds
+        self.explain = explain
+        self.vendors = vendors
+
+
+BENCHMARKS = []
+POSTGRESQL = ('postgresql',)
+
+
+def benchmark(group, number=1, setup=None, rollback=False, max_rounds=None, explain=None, vendors=None):
+    """
+    Register the decorated function as a benchmark.
+
+    Args:
+        group: Benchmark group ("serializer" or "endpoint").
+        number: Number of calls per round.
+        setup: Function called with the context before every round, outside the timing.
+        rollback: Run every round in a transaction that is rolled back.
+        max_rounds: Upper bound of the measured and warmup rounds, for slow benchmarks.
+        explain: Function returning the queryset run by the benchmark; its EXPLAIN plan is stored with the results.
+        vendors: Database vendors the benchmark runs on (e.g. ('postgresql',)); it is skipped on the others.
+    """
+    def decorator(func):
+        BENCHMARKS.append(
+            Benchmark(group, func.__name__, func, number, setup, rollback, max_rounds, explain, vendors)
+        )
+        return func
+    return decorator
+
+
+class BenchmarkContext:
+    """
+    Authenticated API client and sample data shared by the benchmarks.
+    """
+    def __init__(self, sample_size=1000):
+        auth_user, _ = AuthUser.objects.get_or_create(username='benchmark')
+        if not auth_user.password:
+            auth_user.set_password('benchmark password')
+            auth_user.save(update_fields=['password'])
+        token = LoginSerializer.get_token(auth_user).access_token
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer {}'.format(token))
+        self.auth_request = APIRequestFactory().get('/', HTTP_AUTHORIZATION='Bearer {}'.format(token))
+
+        self.users = list(User.objects.order_by('pk')[:sample_size])
+        self.books = list(Book.objects.order_by('pk')[:sample_size])
+        self.books_with_details = list(Book.objects.select_related('bookdetails').order_by('pk')[:sample_size])
+        self.details = list(BookDetails.objects.order_by('pk')[:sample_size])
+        self.loans = list(BorrowedBooks.objects.order_by('pk')[:sample_size])
+        self.expanded_loans = list(
+            BorrowedBooks.objects.select_related('UserID', 'BookID').order_by('pk')[:sample_size]
+        )
+        self.loan_plan = build_plan(BorrowedBooksSerializer())
+        self.loan_rows = list(BorrowedBooks.objects.order_by('pk').values(*self.loan_plan[0])[:sample_size])
+        if not (self.users and self.books and self.loans):
+            raise ValueError('The benchmarks need at least one user, book and loan; seed the database first.')
+
+        self.available_book_ids = list(BookInventory.objects.filter(AvailableCopies__gt=0)
+                                       .order_by('pk').values_list('BookID', flat=True)[:10])
+        self.open_loan_ids = list(BorrowedBooks.objects.filter(HasBeenReturned=False)
+                                  .order_by('pk').values_list('pk', flat=True)[:10])
+        self.search_text = self.books[0].Title.split()[0]
+        today = date.today()
+        self.loan_data = {
+            'UserID': self.users[0].pk, 'BookID': self.books[0].pk,
+            'BorrowDate': today.isoformat(), 'ReturnDate': (today + timedelta(days=14)).isoformat(),
+        }
+        self.validated_loan = {'BorrowDate': today, 'ReturnDate': today + timedelta(days=14)}
+        self.login_data = {'username': 'benchmark', 'password': 'wrong password'}
+
+    def request(self, method, url, data=None, expected=200):
+        response = getattr(self.client, method)(url, data, format='json')
+        if response.status_code != expected:
+            raise AssertionError('{} {} returned {}, expected {}'.format(
+                method.upper(), url, response.status_code, expected))
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def get(self, url):
+        return self.request('get', url)
+
+    def get_not_modified(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        if response.status_code != 304:
+            raise AssertionError('GET {} returned {}, expected 304'.format(url, response.status_code))
+        return response
+
+
+def clear_cache(context):
+    cache.get_cache().clear()
+
+
+def create_partitioned_loans(context):
+    if not getattr(context, 'partitioned_loans', None):
+        partitioning.create_partitioned_copy(PARTITIONED_LOANS)
+        context.partitioned_loans = PARTITIONED_LOANS
+
+
+@contextmanager
+def authentication_classes(viewset, classes):
+    """
+    Temporarily replace the authentication classes of a viewset.
+    """
+    previous = viewset.authentication_classes
+    viewset.authentication_classes = classes
+    try:
+        yield
+    finally:
+        viewset.authentication_classes = previous
+
+
+def run_query(sql, table, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(connection.ops.quote_name(table)), params)
+        return cursor.fetchall()
+
+
+# Serializer microbenchmarks
+
+@benchmark('serializer', number=1000)
+def borrowedbooks_validate(context):
+    BorrowedBooksSerializer().validate(dict(context.validated_loan))
+
+
+@benchmark('serializer', number=10)
+def borrowedbooks_is_valid(context):
+    BorrowedBooksSerializer(data=context.loan_data).is_valid(raise_exception=True)
+
+
+@benchmark('serializer')
+def users_many(context):
+    UserSerializer(context.users, many=True).data
+
+
+@benchmark('serializer')
+def books_many(context):
+    BookSerializer(context.books, many=True).data
+
+
+@benchmark('serializer')
+def bookdetails_many(context):
+    BookDetailsSerializer(context.details, many=True).data
+
+
+@benchmark('serializer')
+def books_with_details_many(context):
+    BookWithDetailsSerializer(context.books_with_details, many=True).data
+
+
+@benchmark('serializer')
+def borrowedbooks_many(context):
+    BorrowedBooksSerializer(context.loans, many=True).data
+
+
+@benchmark('serializer')
+def borrowedbooks_expanded_many(context):
+    BorrowedBooksExpandedSerializer(context.expanded_loans, many=True).data
+
+
+@benchmark('serializer')
+def borrowedbooks_render(context):
+    JSONRenderer().render(BorrowedBooksSerializer(context.loans, many=True).data)
+
+
+@benchmark('serializer')
+def borrowedbooks_render_fast(context):
+    rows = [dict(row) for row in context.loan_rows]
+    FastJSONRenderer().render(values_to_data(rows, context.loan_plan[1]))
+
+
+LARGE_PAGE_SIZE = 10000
+
+
+def large_loans(context):
+    """
+    Returns the first LARGE_PAGE_SIZE loans, as instances and as .values() rows, loaded on first use.
+    """
+    if getattr(context, 'large_loans', None) is None:
+        queryset = BorrowedBooks.objects.order_by('pk')[:LARGE_PAGE_SIZE]
+        context.large_loans = list(queryset), list(queryset.values(*context.loan_plan[0]))
+    return context.large_loans
+
+
+@benchmark('serializer')
+def borrowedbooks_render_10k(context):
+    loans, _ = large_loans(context)
+    JSONRenderer().render(BorrowedBooksSerializer(loans, many=True).data)
+
+
+@benchmark('serializer')
+def borrowedbooks_render_fast_10k(context):
+    _, loan_rows = large_loans(context)
+    rows = [dict(row) for row in loan_rows]
+    FastJSONRenderer().render(values_to_data(rows, context.loan_plan[1]))
+
+
+# Endpoint macrobenchmarks
+
+@benchmark('endpoint')
+def users_list(context):
+    context.get('/library/users/')
+
+
+@benchmark('endpoint', setup=clear_cache)
+def books_list_cold(context):
+    context.get('/library/books/')
+
+
+@benchmark('endpoint')
+def books_list_cached(context):
+    context.get('/library/books/')
+
+
+@benchmark('endpoint', setup=clear_cache)
+def books_retrieve_cold(context):
+    context.get('/library/books/{}/'.format(context.books[0].pk))
+
+
+@benchmark('endpoint')
+def books_retrieve_cached(context):
+    context.get('/library/books/{}/'.format(context.books[0].pk))
+
+
+@benchmark('endpoint')
+def books_retrieve_cached_jwt_user(context):
+    with authentication_classes(BookViewSet, [JWTAuthentication]):
+        context.get('/library/books/{}/'.format(context.books[0].pk))
+
+
+@benchmark('endpoint')
+def books_with_details(context):
+    context.get('/library/books/with-details/')
+
+
+@benchmark('endpoint')
+def books_search(context):
+    context.get('/library/books/search/?q={}'.format(context.search_text))
+
+
+@benchmark('endpoint')
+def books_availability(context):
+    context.get('/library/books/availability/?ids={}'.format(','.join(str(book.pk) for book in context.books)))
+
+
+@benchmark('endpoint', setup=clear_cache)
+def bookdetails_list_cold(context):
+    context.get('/library/bookdetails/')
+
+
+@benchmark('endpoint')
+def borrowedbooks_list(context):
+    context.get('/library/borrowedbooks/')
+
+
+@benchmark('endpoint')
+def borrowedbooks_list_large(context):
+    context.get('/library/borrowedbooks/?page_size=1000')
+
+
+@benchmark('endpoint')
+def borrowedbooks_list_large_not_modified(context):
+    url = '/library/borrowedbooks/?page_size=1000'
+    if getattr(context, 'loans_etag', None) is None:
+        context.loans_etag = context.get(url)['ETag']
+    context.get_not_modified(url, context.loans_etag)
+
+
+@benchmark('endpoint')
+def borrowedbooks_current(context):
+    context.get('/library/borrowedbooks/current/')
+
+
+@benchmark('endpoint')
+def borrowedbooks_expanded(context):
+    context.get('/library/borrowedbooks/expanded/')
+
+
+@benchmark('endpoint')
+def borrowedbooks_retrieve(context):
+    context.get('/library/borrowedbooks/{}/'.format(context.loans[0].pk))
+
+
+@benchmark('endpoint')
+def stats_users(context):
+    context.get('/library/stats/users/')
+
+
+@benchmark('endpoint')
+def async_books_list(context):
+    context.get('/library/async/books/')
+
+
+@benchmark('endpoint', rollback=True)
+def borrowedbooks_create(context):
+    data = dict(context.loan_data, BookID=context.available_book_ids[0])
+    context.request('post', '/library/borrowedbooks/', data, expected=201)
+
+
+@benchmark('endpoint', rollback=True)
+def borrowedbooks_return(context):
+    url = '/library/borrowedbooks/{}/'.format(context.open_loan_ids[0])
+    context.request('patch', url, {'ReturnDate': date.today().isoformat()})
+
+
+@benchmark('endpoint', rollback=True)
+def borrowedbooks_bulk_borrow(context):
+    data = [dict(context.loan_data, BookID=book_id) for book_id in context.available_book_ids]
+    context.request('post', '/library/borrowedbooks/bulk/', data, expected=201)
+
+
+@benchmark('endpoint', rollback=True)
+def borrowedbooks_bulk_return(context):
+    data = [{'id': pk, 'ReturnDate': date.today().isoformat()} for pk in context.open_loan_ids]
+    context.request('patch', '/library/borrowedbooks/bulk-return/', data)
+
+
+BURST_SIZE = 20
+
+
+def login_burst_requests(context):
+    for _ in range(BURST_SIZE):
+        response = context.client.post('/library/login/', context.login_data, format='json')
+        if response.status_code not in (401, 429):
+            raise AssertionError('POST /library/login/ returned {}'.format(response.status_code))
+
+
+def signup_burst_requests(context):
+    for number in range(BURST_SIZE):
+        data = {'username': 'benchmark-signup-{}'.format(number), 'password': 'benchmark password'}
+        response = context.client.post('/library/signup/', data, format='json')
+        if response.status_code not in (201, 429):
+            raise AssertionError('POST /library/signup/ returned {}'.format(response.status_code))
+
+
+@benchmark('endpoint', setup=clear_cache, max_rounds=3)
+def login_burst(context):
+    login_burst_requests(context)
+
+
+@benchmark('endpoint', setup=clear_cache, max_rounds=3)
+def login_burst_unthrottled(context):
+    with override_settings(LIBRARY_THROTTLE_RATES={}):
+        login_burst_requests(context)
+
+
+@benchmark('endpoint', setup=clear_cache, rollback=True, max_rounds=3)
+def signup_burst(context):
+    signup_burst_requests(context)
+
+
+@benchmark('endpoint', setup=clear_cache, rollback=True, max_rounds=3)
+def signup_burst_unthrottled(context):
+    with override_settings(LIBRARY_THROTTLE_RATES={}):
+        signup_burst_requests(context)
+
+
+# Authentication benchmarks: database user lookup against a user built from the token claims
+
+@benchmark('auth', number=100)
+def jwt_user(context):
+    JWTAuthentication().authenticate(context.auth_request)
+
+
+@benchmark('auth', number=100)
+def token_user(context):
+    TokenUserAuthentication().authenticate(context.auth_request)
+
+
+# Index benchmarks: the loan and catalog lookups served by the indexes of models.py
+
+def middle_position(context):
+    """
+    Returns the (BorrowDate, id) position of the loan in the middle of the history, for deep keyset pages.
+    """
+    if getattr(context, 'middle_position', None) is None:
+        ordered = BorrowedBooks.objects.order_by(*LOAN_ORDERING).values_list(*LOAN_ORDERING)
+        context.middle_position = ordered[BorrowedBooks.objects.count() // 2]
+    return context.middle_position
+
+
+def user_open_loans_query(context):
+    return BorrowedBooks.objects.filter(UserID=context.users[0].pk, HasBeenReturned=False)
+
+
+def book_open_loans_query(context):
+    return BorrowedBooks.objects.filter(BookID=context.books[0].pk, HasBeenReturned=False)
+
+
+def overdue_loans_query(context):
+    return BorrowedBooks.objects.filter(HasBeenReturned=False, ReturnDate__lt=date.today()).order_by('ReturnDate')[:100]
+
+
+def deep_keyset_page_query(context):
+    return filter_after_cursor(BorrowedBooks.objects.order_by(*LOAN_ORDERING), middle_position(context))[:100]
+
+
+def genre_books_query(context):
+    return Book.objects.filter(Genre=context.books[0].Genre)[:100]
+
+
+@benchmark('index', explain=user_open_loans_query)
+def user_open_loans(context):
+    list(user_open_loans_query(context))
+
+
+@benchmark('index', explain=book_open_loans_query)
+def book_open_loans(context):
+    list(book_open_loans_query(context))
+
+
+@benchmark('index', explain=overdue_loans_query)
+def overdue_loans(context):
+    list(overdue_loans_query(context))
+
+
+@benchmark('index', explain=deep_keyset_page_query)
+def deep_keyset_page(context):
+    list(deep_keyset_page_query(context))
+
+
+@benchmark('index', explain=genre_books_query)
+def genre_books(context):
+    list(genre_books_query(context))
+
+
+# Search benchmarks: full-text search against substring matching over the whole catalog
+
+SEARCH_PAGE_SIZE = 20
+
+
+def rare_search_text(context):
+    """
+    Returns the ISBN of the last book, which a single book matches.
+    """
+    if getattr(context, 'rare_search_text', None) is None:
+        context.rare_search_text = Book.objects.order_by('-pk').values_list('ISBN', flat=True)[0]
+    return context.rare_search_text
+
+
+def fulltext_search_query(text):
+    return search_books(text, {})[:SEARCH_PAGE_SIZE]
+
+
+def icontains_search_query(text):
+    queryset = Book.objects.select_related('bookdetails')
+    return filter_substring(queryset, text).order_by('BookID')[:SEARCH_PAGE_SIZE]
+
+
+def fulltext_common_query(context):
+    return fulltext_search_query(context.search_text)
+
+
+def icontains_common_query(context):
+    return icontains_search_query(context.search_text)
+
+
+def fulltext_rare_query(context):
+    return fulltext_search_query(rare_search_text(context))
+
+
+def icontains_rare_query(context):
+    return icontains_search_query(rare_search_text(context))
+
+
+@benchmark('search', explain=fulltext_common_query, vendors=POSTGRESQL)
+def fulltext_common(context):
+    list(fulltext_common_query(context))
+
+
+@benchmark('search', explain=icontains_common_query, vendors=POSTGRESQL)
+def icontains_common(context):
+    list(icontains_common_query(context))
+
+
+@benchmark('search', explain=fulltext_rare_query, vendors=POSTGRESQL)
+def fulltext_rare(context):
+    list(fulltext_rare_query(context))
+
+
+@benchmark('search', explain=icontains_rare_query, vendors=POSTGRESQL)
+def icontains_rare(context):
+    list(icontains_rare_query(context))
+
+
+PARTITIONED_LOANS = 'benchmark_partitioned_loans'
+MONTH_LOANS_SQL = 'SELECT COUNT(*), SUM("Fee") FROM {} WHERE "BorrowDate" >= %s AND "BorrowDate" < %s'
+RECENT_OPEN_LOANS_SQL = (
+    'SELECT id, "UserID_id", "BookID_id" FROM {} WHERE "BorrowDate" >= %s AND NOT "HasBeenReturned" '
+    'ORDER BY "BorrowDate", id LIMIT 100'
+)
+
+
+def month_params():
+    month = partitioning.add_months(partitioning.month_start(date.today()), -6)
+    return [month, partitioning.add_months(month, 1)]
+
+
+@benchmark('partitioning', setup=create_partitioned_loans, vendors=POSTGRESQL)
+def month_loans_monolithic(context):
+    run_query(MONTH_LOANS_SQL, partitioning.TABLE, month_params())
+
+
+@benchmark('partitioning', setup=create_partitioned_loans, vendors=POSTGRESQL)
+def month_loans_partitioned(context):
+    run_query(MONTH_LOANS_SQL, context.partitioned_loans, month_params())
+
+
+@benchmark('partitioning', setup=create_partitioned_loans, vendors=POSTGRESQL)
+def recent_open_loans_monolithic(context):
+    run_query(RECENT_OPEN_LOANS_SQL, partitioning.TABLE, [date.today() - timedelta(days=30)])
+
+
+@benchmark('partitioning', setup=create_partitioned_loans, vendors=POSTGRESQL)
+def recent_open_loans_partitioned(context):
+    run_query(RECENT_OPEN_LOANS_SQL, context.partitioned_loans, [date.today() - timedelta(days=30)])
+
+
+def run_benchmark(bench, context, rounds=20, warmup=3):
+    """
+    Run one benchmark and return the statistics of the time of one call, in seconds.
+    """
+    if bench.max_rounds is not None:
+        rounds, warmup = min(rounds, bench.max_rounds), min(warmup, bench.max_rounds)
+    timings, cpu_timings = [], []
+    for round_number in range(warmup + rounds):
+        if bench.setup is not None:
+            bench.setup(context)
+        with ExitStack() as stack:
+            if bench.rollback:
+                stack.enter_context(transaction.atomic())
+            started, cpu_started = time.perf_counter(), time.process_time()
+            for _ in range(bench.number):
+                bench.func(context)
+            elapsed = (time.perf_counter() - started) / bench.number
+            cpu_elapsed = (time.process_time() - cpu_started) / bench.number
+            if bench.rollback:
+                transaction.set_rollback(True)
+        if round_number >= warmup:
+            timings.append(elapsed)
+            cpu_timings.append(cpu_elapsed)
+    result = {
+        'rounds': rounds,
+        'number': bench.number,
+        'min': min(timings),
+        'max': max(timings),
+        'mean': statistics.mean(timings),
+        'median': statistics.median(timings),
+        'stddev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        'cpu_median': statistics.median(cpu_timings),
+    }
+    if bench.explain is not None:
+        result['plan'] = bench.explain(context).explain()
+    return result
+
+
+def run_benchmarks(context, rounds=20, warmup=3, select=None, on_result=None):
+    """
+    Run every registered benchmark whose name contains select (all of them by default), except those declaring
+    other database vendors.
+
+    Returns:
+        dict: Statistics per benchmark name.
+    """
+    results = {}
+    for bench in BENCHMARKS:
+        if select and select not in bench.name:
+            continue
+        if bench.vendors is not None and connection.vendor not in bench.vendors:
+            continue
+        results[bench.name] = run_benchmark(bench, context, rounds=rounds, warmup=warmup)
+        if on_result is not None:
+            on_result(bench.name, results[bench.name])
+    return results
+
+
+def compare(results, baseline, threshold=0.1):
+    """
+    Compare the medians of two result sets.
+
+    Returns:
+        tuple: A list of (name, baseline median, current median, relative change) for every benchmark in both
+            sets, and the list of the names whose median grew by more than threshold.
+    """
+    rows, regressions = [], []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        change = current['median'] / previous['median'] - 1 if previous['median'] else 0.0
+        rows.append((name, previous['median'], current['median'], change))
+        if change > threshold:
+            regressions.append(name)
+    return rows, regressions
@@ -0,0 +1,233 @@
+"""
+cache.py
+
+This module contains the read-through cache layer used for the catalog endpoints (Book and BookDetails).
+
+Backend:
+    - Uses the cache configured under settings.LIBRARY_CACHE_ALIAS (default: "default").
+    - The local-memory backend is configured by default; set CACHE_URL to switch to the Redis backend
+      so every worker process shares the same cache.
+
+Keys:
+    - Object payloads: one key per (object version, model instance). Each instance has a version token which is
+      replaced when it changes. A reader that loaded the row before a write committed stores it under the
+      replaced token, where it is never read again, so a stale row cannot re-populate the cache after the
+      invalidation.
+    - List payloads: one key per (list version, query string). Each model has a list version token which is
+      replaced whenever any instance changes, so every cached page of that model is invalidated at once
+      without having to enumerate the page keys.
+
+Entries:
+    - Every entry stores the serialized payload together with its ETag, so conditional requests
+      (If-None-Match) are answered with 304 Not Modified without touching the database or the serializer.
+    - Payloads are always built from the primary database, even for read-only requests (see database.py): a
+      replica lagging behind a write would otherwise store a stale payload under the new version token.
+
+CachedReadMixin:
+    - Viewset mixin that serves retrieve and list through the cache.
+    - List pages are cached per query string, sparse fieldsets included (see fieldsets.py); retrieve requests with a
+      fieldset bypass the cache, as object payloads are cached whole.
+    - The list version tokens also version the listings for conditional GET (see conditional.py), whose ETag
+      replaces the one of the cached list entry.
+
+Per-process caches:
+    - With the local-memory backend (no CACHE_URL), every worker process has its own version tokens and a write
+      only replaces the tokens of the process that handled it. The list version tokens then expire after
+      LIBRARY_LOCAL_LIST_VERSION_TIMEOUT seconds, so the other processes stop answering with the cached pages
+      and 304 responses of before the write within that time. With a shared cache they never expire.
+
+invalidate:
+    - Replaces the object version token of an instance and the list version token of its model.
+    - Called from the post_save/post_delete signal handlers in signals.py.
+    - invalidate_lists only replaces the list version token, for changes made without signals (bulk inserts).
+
+LocalTTLCache:
+    - Small in-process LRU cache whose entries expire after a fixed time to live.
+    - Used for hot per-process lookups that must not pay a network round trip (e.g. active users in authentication.py).
+
+Settings:
+    - LIBRARY_LOCAL_LIST_VERSION_TIMEOUT (float, default: 5): Seconds a list version token lives in a local-memory
+      cache, i.e. the longest a worker process serves listings older than a write handled by another process.
+"""
+
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .database import primary_reads
+from .fieldsets import get_fieldset
+
+
+def get_cache():
+    return caches[getattr(settings, 'LIBRARY_CACHE_ALIAS', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'LIBRARY_CACHE_TIMEOUT', 300)
+
+
+def get_list_version_timeout():
+    """
+    Returns the timeout of the list version tokens: None (never expire) in a cache shared by the worker processes.
+    """
+    if isinstance(get_cache(), LocMemCache):
+        return getattr(settings, 'LIBRARY_LOCAL_LIST_VERSION_TIMEOUT', 5)
+    return None
+
+
+def object_version_key(model, pk):
+    return 'library:{}:object-version:{}'.format(model._meta.model_name, pk)
+
+
+def list_version_key(model):
+    return 'library:{}:list-version'.format(model._meta.model_name)
+
+
+def get_version(key, timeout=None):
+    """
+    Returns the current version token stored under key.
+    A fresh, never used token is created when the key is missing (or was evicted), so entries cached under an
+    older token can never be served again.
+    """
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout)
+        version = cache.get(key)
+    return version
+
+
+def get_list_version(model):
+    """
+    Returns the current list version token of a model.
+    """
+    return get_version(list_version_key(model), get_list_version_timeout())
+
+
+def object_key(model, pk):
+    # Object tokens only need to outlive the entries cached under them
+    version = get_version(object_version_key(model, pk), get_timeout())
+    return 'library:{}:object:{}:{}'.format(model._meta.model_name, pk, version)
+
+
+def list_key(model, query_string):
+    digest = hashlib.md5(query_string.encode('utf-8')).hexdigest()
+    return 'library:{}:list:{}:{}'.format(model._meta.model_name, get_list_version(model), digest)
+
+
+def make_etag(data):
+    content = json.dumps(data, cls=JSONEncoder, separators=(',', ':'), sort_keys=True)
+    return '"{}"'.format(hashlib.md5(content.encode('utf-8')).hexdigest())
+
+
+def invalidate_lists(model):
+    """
+    Invalidates every cached list page of a model, e.g. after rows were inserted in bulk.
+    """
+    get_cache().set(list_version_key(model), time.time_ns(), get_list_version_timeout())
+
+
+def invalidate(model, pk):
+    """
+    Invalidates the cached payload of one instance and every cached list page of its model.
+    """
+    get_cache().set(object_version_key(model, pk), time.time_ns(), get_timeout())
+    invalidate_lists(model)
+
+
+class CachedReadMixin:
+    """
+    Viewset mixin serving retrieve and list from the cache.
+    Cached entries carry an ETag; requests with a matching If-None-Match header get a 304 response.
+    """
+
+    def cached_response(self, request, key, build):
+        """
+        Helper returning the cached payload stored under key, building and storing it with build() on a miss.
+        """
+        cache = get_cache()
+        entry = cache.get(key)
+        if entry is None:
+            with primary_reads():
+                data = build()
+            entry = (make_etag(data), data)
+            cache.set(key, entry, get_timeout())
+        etag, data = entry
+
+        if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        return Response(data, headers={'ETag': etag})
+
+    def retrieve(self, request, *args, **kwargs):
+        if get_fieldset(request) != (None, None):
+            return super().retrieve(request, *args, **kwargs)
+        model = self.get_queryset().model
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            pk = model._meta.pk.to_python(kwargs[lookup_url_kwarg])
+        except DjangoValidationError:
+            return super().retrieve(request, *args, **kwargs)
+        return self.cached_response(
+            request, object_key(model, pk), lambda: self.get_serializer(self.get_object()).data
+        )
+
+    def list(self, request, *args, **kwargs):
+        model = self.get_queryset().model
+        return self.cached_response(
+            request,
+            list_key(model, request.META.get('QUERY_STRING', '')),
+            lambda: super(CachedReadMixin, self).list(request, *args, **kwargs).data,
+        )
+
+
+class LocalTTLCache:
+    """
+    Thread-safe in-process LRU cache with a per-entry time to live (in seconds).
+    """
+    missing = object()
+
+    def __init__(self, maxsize=10000, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key, self.missing)
+            if entry is self.missing:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return default
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
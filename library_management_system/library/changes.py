@@ -0,0 +1,225 @@
+"""
+changes.py
+
+This module contains the transactional outbox of the Library Management System: a ChangeEvent row is written for
+every change of a loan, book, book details or book inventory, in the same transaction as the change itself, and
+served as a change feed (see changes_views.py), so downstream systems pull deltas instead of polling the list
+endpoints.
+
+record_change:
+    - Appends one event (model, object id, action, serialized object) to the outbox. Called by the post_save and
+      post_delete signal handlers of BorrowedBooks, Book, BookDetails and BookInventory (see signals.py);
+      record_changes does the same with a single bulk insert for the writers that bypass the signals: the bulk
+      borrow and return actions and import_catalog.
+    - record_changes_in_sql writes the events of every row of a queryset with one INSERT ... SELECT, the data being
+      built by the database, so set-based writers (the overdue fee job, see overdue.py) never load the rows.
+    - Deletion events carry the last state of the deleted object (e.g. the book of a deleted loan).
+    - Copies taken and put back by borrows and returns are reported through the loan events only: the inventory
+      counters are updated in bulk, without an event per inventory.
+    - The event commits or rolls back with the surrounding transaction: borrows and returns already run in one, and
+      the catalog viewsets use AtomicWritesMixin.
+    - Writes that do not produce events: seed_library (test data for benchmarks) and archive_partitions (see
+      partitioning.py), which detaches whole months of loans at once; consumers keeping archived loans should drop
+      those older than the archived months themselves.
+
+read_changes:
+    - Returns the events following a sequence number, in order. Sequence numbers are allocated at insert time, so a
+      transaction may commit after a later one: the feed stops before a missing number until the event following it
+      is LIBRARY_CHANGES_GAP_TIMEOUT seconds old (numbers of rolled back or compacted events never appear), so
+      consumers never skip an event that is still being committed.
+
+compact_changes:
+    - Bounds the size of the outbox, log-compaction style: events older than LIBRARY_CHANGES_COMPACT_AFTER seconds
+      are deleted when a newer event of the same object exists, and "deleted" events (tombstones) are deleted after
+      LIBRARY_CHANGES_TOMBSTONE_TTL seconds. The outbox then holds about one event per object, and a consumer
+      reading from any sequence number still receives the latest state of every object changed since then.
+      Consumers offline for longer than the tombstone TTL may miss deletions and should resynchronise.
+
+Usage:
+    from library.changes import read_changes
+    events = read_changes(since=0, limit=100)
+"""
+
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import BooleanField, DateTimeField, F, Func, Max, Q, Value
+from django.db.models.functions import JSONObject
+from django.utils import timezone
+
+from .models import Book, BookDetails, BookInventory, BorrowedBooks, ChangeEvent
+from .serializers import BookSerializer, BookDetailsSerializer, BookInventorySerializer, BorrowedBooksSerializer
+
+CREATED, UPDATED, DELETED = 'created', 'updated', 'deleted'
+
+SERIALIZERS = {
+    BorrowedBooks: BorrowedBooksSerializer,
+    Book: BookSerializer,
+    BookDetails: BookDetailsSerializer,
+    BookInventory: BookInventorySerializer,
+}
+
+
+def build_event(instance, action):
+    model = type(instance)
+    return ChangeEvent(
+        Model=model._meta.model_name,
+        ObjectID=instance.pk,
+        Action=action,
+        Data=SERIALIZERS[model](instance).data,
+    )
+
+
+def record_change(instance, action):
+    build_event(instance, action).save()
+
+
+def record_changes(instances, action):
+    ChangeEvent.objects.bulk_create([build_event(instance, action) for instance in instances])
+
+
+class JSONBoolean(Func):
+    """
+    A boolean column as a JSON true/false inside JSONObject (SQLite would store its 0/1 integer).
+    """
+    template = '%(expressions)s'
+    output_field = BooleanField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        template = "json(CASE WHEN %(expressions)s THEN 'true' ELSE 'false' END)"
+        return super().as_sql(compiler, connection, template=template, **extra_context)
+
+
+def data_expression(model):
+    """
+    Returns the expression building the serialized data of a row in SQL, for the serializers of plain columns
+    (numbers, dates, booleans and foreign key ids, e.g. BorrowedBooksSerializer).
+    """
+    fields = {}
+    for name, field in SERIALIZERS[model]().fields.items():
+        model_field = model._meta.get_field(field.source)
+        column = F(model_field.attname)
+        fields[name] = JSONBoolean(column) if isinstance(model_field, BooleanField) else column
+    return JSONObject(**fields)
+
+
+def record_changes_in_sql(queryset, action):
+    """
+    Writes the change event of every row of queryset with a single INSERT ... SELECT, in primary key order.
+    """
+    model = queryset.model
+    using = router.db_for_write(ChangeEvent)
+    events = queryset.using(using).order_by('pk').annotate(
+        event_model=Value(model._meta.model_name),
+        event_object_id=F('pk'),
+        event_action=Value(action),
+        event_data=data_expression(model),
+        event_created_at=Value(timezone.now(), output_field=DateTimeField()),
+    ).values_list('event_model', 'event_object_id', 'event_action', 'event_data', 'event_created_at')
+    connection = connections[using]
+    sql, params = events.query.get_compiler(connection=connection).as_sql()
+    columns = ', '.join(
+        connection.ops.quote_name(ChangeEvent._meta.get_field(name).column)
+        for name in ('Model', 'ObjectID', 'Action', 'Data', 'CreatedAt')
+    )
+    with connection.cursor() as cursor:
+        cursor.execute('INSERT INTO {} ({}) {}'.format(
+            connection.ops.quote_name(ChangeEvent._meta.db_table), columns, sql), params)
+
+
+def event_to_data(event):
+    return {
+        'seq': event.Seq,
+        'model': event.Model,
+        'id': event.ObjectID,
+        'action': event.Action,
+        'data': event.Data,
+        'at': event.CreatedAt,
+    }
+
+
+def contiguous_events(events, since, now):
+    """
+    Keep the events up to the first missing sequence number that may still be committed.
+    """
+    gap_timeout = timedelta(seconds=getattr(settings, 'LIBRARY_CHANGES_GAP_TIMEOUT', 5))
+    result, previous = [], since
+    for event in events:
+        if event.Seq != previous + 1 and event.CreatedAt > now - gap_timeout:
+            break
+        result.append(event)
+        previous = event.Seq
+    return result
+
+
+def changes_queryset(since, limit):
+    return ChangeEvent.objects.filter(Seq__gt=since).order_by('Seq')[:limit]
+
+
+def read_changes(since, limit=100):
+    return contiguous_events(list(changes_queryset(since, limit)), since, timezone.now())
+
+
+async def aread_changes(since, limit=100):
+    """
+    Async version of read_changes.
+    """
+    events = [event async for event in changes_queryset(since, limit)]
+    return contiguous_events(events, since, timezone.now())
+
+
+def compact_changes(batch_size=5000):
+    """
+    Delete the superseded change events and the expired tombstones, walking the outbox in sequence order.
+
+    Returns:
+        int: The number of events deleted.
+    """
+    now = timezone.now()
+    compact_before = now - timedelta(seconds=getattr(settings, 'LIBRARY_CHANGES_COMPACT_AFTER', 3600))
+    tombstones_before = now - timedelta(seconds=getattr(settings, 'LIBRARY_CHANGES_TOMBSTONE_TTL', 30 * 86400))
+    deleted, last_seq = 0, 0
+    while True:
+        batch = list(
+            ChangeEvent.objects.filter(Seq__gt=last_seq, CreatedAt__lt=compact_before).order_by('Seq')
+            .values_list('Seq', 'Model', 'ObjectID', 'Action', 'CreatedAt')[:batch_size]
+        )
+        if not batch:
+            return deleted
+        last_seq = batch[-1][0]
+
+        objects = {(model, object_id) for _, model, object_id, _, _ in batch}
+        condition = Q()
+        for model in {model for model, _ in objects}:
+            condition |= Q(Model=model, ObjectID__in=[object_id for m, object_id in objects if m == model])
+        latest = {
+            (row['Model'], row['ObjectID']): row['latest']
+            for row in ChangeEvent.objects.filter(condition).values('Model', 'ObjectID').annotate(latest=Max('Seq'))
+        }
+        expired = [
+            seq for seq, model, object_id, action, created_at in batch
+            if seq < latest[(model, object_id)] or (action == DELETED and created_at < tombstones_before)
+        ]
+        if expired:
+            with transaction.atomic():
+                deleted += ChangeEvent.objects.filter(Seq__in=expired).delete()[0]
+
+
+class AtomicWritesMixin:
+    """
+    Viewset mixin running perform_create, perform_update and perform_destroy in a transaction, so the change events
+    written by the signal handlers commit together with the row.
+    """
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            super().perform_update(serializer)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            super().perform_destroy(instance)
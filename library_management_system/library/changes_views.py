@@ -0,0 +1,71 @@
+"""
+changes_views.py
+
+This module contains the change feed endpoint of the Library Management System app (see changes.py).
+
+changes_feed:
+    - Endpoint: GET /library/changes/?since=<seq>&limit=<n>&wait=<seconds>
+    - Returns the change events of loans, books, book details and inventories following the sequence number `since`
+      (default: 0, the oldest event kept), at most `limit` of them (default: 100, at most 1000):
+        {"events": [{"seq": 42, "model": "book", "id": 7, "action": "updated", "data": {...}, "at": "..."}],
+         "next": 42}
+    - Consumers store `next` and pass it as `since` on their next call.
+    - Long polling: with wait > 0, a request finding no new event waits for one for up to `wait` seconds
+      (at most LIBRARY_CHANGES_MAX_WAIT), checking the outbox every LIBRARY_CHANGES_POLL_INTERVAL seconds, and
+      returns as soon as events arrive. The view is async, so under an ASGI server waiting consumers do not hold
+      a worker thread.
+    - Authenticated with JWT access tokens like the other async endpoints (see async_views.py).
+
+Usage:
+    - Registered in urls.py as changes/.
+"""
+
+
+import asyncio
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+
+from .async_views import async_api_view, json_response
+from .changes import aread_changes, event_to_data
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def parse_int_param(request, name, default, maximum=None):
+    value = request.GET.get(name)
+    if not value:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        number = -1
+    if number < 0:
+        raise ParseError('{} must be a non-negative integer.'.format(name))
+    return number if maximum is None else min(number, maximum)
+
+
+@async_api_view
+async def changes_feed(request):
+    """
+    Returns the change events after `since`, waiting up to `wait` seconds for new ones.
+    """
+    since = parse_int_param(request, 'since', 0)
+    limit = max(1, parse_int_param(request, 'limit', DEFAULT_LIMIT, MAX_LIMIT))
+    wait = parse_int_param(request, 'wait', 0, getattr(settings, 'LIBRARY_CHANGES_MAX_WAIT', 30))
+    poll_interval = getattr(settings, 'LIBRARY_CHANGES_POLL_INTERVAL', 0.5)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    while True:
+        events = await aread_changes(since, limit)
+        remaining = deadline - loop.time()
+        if events or remaining <= 0:
+            break
+        await asyncio.sleep(min(poll_interval, remaining))
+
+    return json_response({
+        'events': [event_to_data(event) for event in events],
+        'next': events[-1].Seq if events else since,
+    })
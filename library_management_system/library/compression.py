@@ -0,0 +1,132 @@
+"""
+compression.py
+
+This module contains the response compression middleware of the Library Management System.
+
+CompressionMiddleware:
+    - Compresses responses with the best encoding the client accepts (Accept-Encoding): brotli ("br") when the
+      optional brotli package is installed, else gzip. Encodings refused with q=0 are not used.
+    - gzip is delegated to Django's GZipMiddleware, which keeps its BREACH mitigation (random padding).
+    - Brotli output is not padded: the brotli module has no equivalent of the gzip filename padding, so response
+      lengths are not masked. Brotli is therefore only used for GET and HEAD responses, which in this API never
+      carry secrets. Responses to POST and other writes (login, signup and token refresh, which return tokens and
+      echo the submitted data) are gzip compressed with Django's mitigation.
+    - Streaming responses (NDJSON listings, CSV exports) are compressed on the fly, chunk by chunk, so memory stays
+      constant; their Content-Length is dropped and they are sent chunked.
+    - Responses shorter than 200 bytes, responses that already have a Content-Encoding and already compressed
+      files (e.g. the .csv.gz export) are sent as they are. A compressed body that is not smaller is discarded.
+    - Strong ETags are made weak, as the compressed bytes differ from the uncompressed ones, and Vary:
+      Accept-Encoding is added so shared caches keep one copy per encoding.
+
+Settings:
+    - LIBRARY_COMPRESSION_BROTLI_QUALITY (integer, default: 5): Brotli quality (0-11). Higher levels compress
+      slightly better but cost much more CPU per response.
+
+Usage:
+    MIDDLEWARE = [
+        ...
+        'library.compression.CompressionMiddleware',
+        ...
+    ]
+"""
+
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_LENGTH = 200
+COMPRESSED_CONTENT_TYPES = ('application/gzip', 'application/zip', 'application/x-bzip2', 'application/zstd')
+# Methods whose responses may be brotli compressed (see BREACH above)
+BROTLI_METHODS = ('GET', 'HEAD')
+
+
+def accepted_encodings(header):
+    """
+    Returns the content codings accepted by an Accept-Encoding header, leaving out those with q=0.
+    """
+    encodings = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            encodings.add(coding.strip().lower())
+    return encodings
+
+
+def get_brotli_quality():
+    return getattr(settings, 'LIBRARY_COMPRESSION_BROTLI_QUALITY', 5)
+
+
+def brotli_compress_sequence(sequence, quality):
+    compressor = brotli.Compressor(quality=quality)
+    for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def brotli_compress_async_sequence(sequence, quality):
+    compressor = brotli.Compressor(quality=quality)
+    async for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compress responses with brotli or gzip, as negotiated with the client.
+    """
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < MIN_LENGTH:
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+        if response.get('Content-Type', '').split(';')[0].strip() in COMPRESSED_CONTENT_TYPES:
+            return response
+
+        encodings = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and 'br' in encodings and request.method in BROTLI_METHODS:
+            return self.compress_brotli(response)
+        if 'gzip' in encodings:
+            return super().process_response(request, response)
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    def compress_brotli(self, response):
+        patch_vary_headers(response, ('Accept-Encoding',))
+        quality = get_brotli_quality()
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = brotli_compress_async_sequence(response.streaming_content, quality)
+            else:
+                response.streaming_content = brotli_compress_sequence(response.streaming_content, quality)
+            del response.headers['Content-Length']
+        else:
+            compressed_content = brotli.compress(response.content, quality=quality)
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response.headers['Content-Length'] = str(len(response.content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
@@ -0,0 +1,108 @@
+"""
+conditional.py
+
+This module contains conditional GET support for the list endpoints: clients polling a listing send back the ETag
+(If-None-Match) or Last-Modified (If-Modified-Since) of their last response and get 304 Not Modified, without any
+row being read or serialized, while the listed tables have not changed.
+
+Versions:
+    - The version of a table is its list version token (see cache.py): a nanosecond timestamp replaced after every
+      committed write, by the post_save/post_delete signal handlers (see signals.py) and by the bulk writers
+      (bulk borrow and return, overdue fees, seeding, imports, partition archiving).
+    - The ETag of a listing is derived from the versions of every table it shows (e.g. loans, users and books for
+      the expanded loans) and the negotiated format, never from the body; Last-Modified is the most recent version.
+    - Checking a request costs one cache read per table. The versions are read before the listing is built, so a
+      write committed meanwhile makes the next request miss rather than return a stale 304.
+    - The tokens live in the cache configured by LIBRARY_CACHE_ALIAS: with several worker processes, use a shared
+      cache (CACHE_URL). With the local-memory cache, a process does not see the writes handled by the others
+      until its tokens expire (LIBRARY_LOCAL_LIST_VERSION_TIMEOUT, see cache.py), so it may answer 304 for that
+      long after such a write.
+    - Last-Modified has a one-second resolution; If-None-Match takes precedence over If-Modified-Since. A table
+      can change again within the second of its Last-Modified, so If-Modified-Since only gets a 304 when it is
+      later than that second: a client revalidating with the exact Last-Modified it received gets a full
+      response. Clients should prefer the ETag.
+    - Listings of a table written less than LIBRARY_REPLICA_MAX_LAG seconds ago are read from the primary (see
+      database.py), so a lagging replica cannot hand out a stale body under the new ETag.
+
+conditional_list:
+    - Decorator for list actions, given the models the listing depends on.
+
+ConditionalListMixin:
+    - Viewset mixin applying conditional_list to the default list action, for the model of the viewset's queryset
+      (or list_version_models).
+
+Usage:
+    class BorrowedBooksViewSet(ConditionalListMixin, viewsets.ModelViewSet):
+        @action(detail=False, url_path='expanded')
+        @conditional_list(BorrowedBooks, User, Book)
+        def list_expanded(self, request):
+            ...
+"""
+
+
+import functools
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .cache import get_list_version
+from .database import primary_reads, written_recently
+
+
+def get_list_validators(request, models):
+    """
+    Returns the (ETag, most recent version) of a listing of the given models.
+    """
+    versions = [get_list_version(model) for model in models]
+    renderer = getattr(request, 'accepted_renderer', None)
+    key = ','.join('{}:{}'.format(model._meta.label_lower, version) for model, version in zip(models, versions))
+    key += ';' + getattr(renderer, 'format', '')
+    etag = 'W/"{}"'.format(hashlib.md5(key.encode('utf-8')).hexdigest())
+    return etag, max(versions)
+
+
+def conditional_list_response(request, models, build):
+    """
+    Helper answering a list request with 304 Not Modified when its validators match, else with build().
+    """
+    etag, version = get_list_validators(request, models)
+    last_modified = version // 10 ** 9
+    # Compare If-Modified-Since with the end of the second of the version, as a later write in the same second
+    # would have the same Last-Modified
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified + 1)
+    if response is None:
+        if written_recently(version):
+            with primary_reads():
+                response = build()
+        else:
+            response = build()
+    if response.status_code in (200, 304):
+        response.headers['ETag'] = etag
+        response.headers['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def conditional_list(*models):
+    """
+    Decorator adding ETag/Last-Modified validators to a list action over the given models.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            return conditional_list_response(request, models, lambda: handler(self, request, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+class ConditionalListMixin:
+    """
+    Viewset mixin answering unchanged list requests with 304 Not Modified.
+    """
+    list_version_models = None
+
+    def list(self, request, *args, **kwargs):
+        models = self.list_version_models or (self.queryset.model,)
+        return conditional_list_response(
+            request, models, lambda: super(ConditionalListMixin, self).list(request, *args, **kwargs)
+        )
@@ -0,0 +1,140 @@
+"""
+database.py
+
+This module contains the database routing of the Library Management System and its health check.
+
+ReplicaRouter:
+    - Sends reads to the "replica" database alias while a read-only request is being handled, and everything else
+      (writes, reads made by writing requests, management commands) to "default".
+    - Reads of POST/PUT/PATCH/DELETE requests stay on the primary, so rows locked with select_for_update and rows
+      read back after a write are always current.
+    - Does nothing when no replica is configured (settings.DATABASES has no "replica" alias).
+    - Migrations only run on "default"; the replica receives them through replication.
+
+ReplicaRoutingMiddleware:
+    - Marks GET, HEAD and OPTIONS requests as read-only for ReplicaRouter, through a context variable (so the flag
+      also follows the request into async views and sync_to_async calls).
+    - Supports both WSGI and ASGI: on an async middleware chain it runs on the event loop.
+
+primary_reads:
+    - Context manager sending the reads made in its block to the primary. Used by the reads whose result is kept
+      beyond the current response (cached payloads, see cache.py, and listings answered with validators, see
+      conditional.py), so a replica that has not replayed a write yet cannot leave a stale copy behind.
+
+written_recently:
+    - Tells whether a write committed at a given time may not have reached the replica yet, i.e. less than
+      LIBRARY_REPLICA_MAX_LAG seconds ago.
+
+health_view:
+    - Endpoint: /health
+    - Runs SELECT 1 on every configured database and reports {"status": "ok", "databases": {alias: "ok"}},
+      or status 503 with "unavailable" for each database that could not be reached. The endpoint is not
+      authenticated, so the errors (hostnames, driver messages) are only logged on the server.
+
+Usage:
+    - Set DATABASE_ROUTERS = ['library.database.ReplicaRouter'] and add
+      'library.database.ReplicaRoutingMiddleware' to settings.MIDDLEWARE.
+    - Configure the replica with DATABASE_REPLICA_HOST (see settings.py).
+
+Settings:
+    - LIBRARY_REPLICA_MAX_LAG (float, default: 5): Seconds after a write during which the replica is assumed to be
+      behind the primary.
+"""
+
+
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.http import JsonResponse
+
+logger = logging.getLogger(__name__)
+
+REPLICA = 'replica'
+READ_ONLY_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+read_only_request = ContextVar('read_only_request', default=False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if read_only_request.get() and REPLICA in connections.settings:
+            return REPLICA
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+@contextmanager
+def primary_reads():
+    """
+    Context manager sending the reads made in its block to the primary.
+    """
+    token = read_only_request.set(False)
+    try:
+        yield
+    finally:
+        read_only_request.reset(token)
+
+
+def written_recently(timestamp_ns):
+    """
+    Returns whether a write committed at timestamp_ns (nanoseconds since the epoch) may not be on the replica yet.
+    """
+    max_lag = getattr(settings, 'LIBRARY_REPLICA_MAX_LAG', 5)
+    return time.time_ns() - timestamp_ns < max_lag * 10 ** 9
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = read_only_request.set(request.method in READ_ONLY_METHODS)
+        try:
+            return self.get_response(request)
+        finally:
+            read_only_request.reset(token)
+
+    async def __acall__(self, request):
+        token = read_only_request.set(request.method in READ_ONLY_METHODS)
+        try:
+            return await self.get_response(request)
+        finally:
+            read_only_request.reset(token)
+
+
+def health_view(request):
+    databases, healthy = {}, True
+    for alias in connections:
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+            databases[alias] = 'ok'
+        except DatabaseError:
+            logger.exception('Health check of database %r failed.', alias)
+            databases[alias] = 'unavailable'
+            healthy = False
+    return JsonResponse(
+        {'status': 'ok' if healthy else 'unavailable', 'databases': databases},
+        status=200 if healthy else 503,
+    )
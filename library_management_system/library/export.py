@@ -0,0 +1,166 @@
+"""
+export.py
+
+This module contains the constant-memory export of loans and of the catalog, shared by the export endpoint
+(see export_views.py) and the export_data management command.
+
+EXPORTS:
+    - loans: every BorrowedBooks row joined with its user and book. Date filters apply to BorrowDate.
+    - books: every Book row joined with its BookDetails (empty when a book has no details). Date filters apply to
+      PublishedDate.
+
+export_queryset:
+    - Builds a values_list queryset for a dataset, ordered by primary key, with optional filters:
+        - date_from / date_to (inclusive) on the dataset's date field.
+        - since_id: only rows whose primary key is greater, for incremental exports.
+    - Only plain tuples are produced, so no model instances or serializers are involved.
+
+iter_chunks:
+    - Reads the queryset through a server-side cursor with .iterator(chunk_size=...) and yields lists of rows.
+
+csv_chunks / gzip_chunks:
+    - Turn row chunks into CSV text, and CSV text into a gzip stream (one compressor for the whole stream), one
+      chunk at a time.
+
+write_parquet:
+    - Writes row chunks to a Parquet file, one row group per chunk. Requires the optional pyarrow package.
+
+Usage:
+    queryset = export_queryset('loans', since_id=1000)
+    for data in gzip_chunks(csv_chunks('loans', iter_chunks(queryset))):
+        output.write(data)
+"""
+
+
+import csv
+import io
+import zlib
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .models import BorrowedBooks, Book
+
+# Column name, queryset lookup and Parquet type of every exported column
+EXPORTS = {
+    'loans': {
+        'model': BorrowedBooks,
+        'date_field': 'BorrowDate',
+        'columns': [
+            ('id', 'id', 'int'),
+            ('BorrowDate', 'BorrowDate', 'date'),
+            ('ReturnDate', 'ReturnDate', 'date'),
+            ('HasBeenReturned', 'HasBeenReturned', 'bool'),
+            ('Fee', 'Fee', 'int'),
+            ('UserID', 'UserID_id', 'int'),
+            ('UserName', 'UserID__Name', 'str'),
+            ('UserEmail', 'UserID__Email', 'str'),
+            ('BookID', 'BookID_id', 'int'),
+            ('Title', 'BookID__Title', 'str'),
+            ('ISBN', 'BookID__ISBN', 'str'),
+            ('Genre', 'BookID__Genre', 'str'),
+        ],
+    },
+    'books': {
+        'model': Book,
+        'date_field': 'PublishedDate',
+        'columns': [
+            ('BookID', 'BookID', 'int'),
+            ('Title', 'Title', 'str'),
+            ('ISBN', 'ISBN', 'str'),
+            ('PublishedDate', 'PublishedDate', 'date'),
+            ('Genre', 'Genre', 'str'),
+            ('NumberOfPages', 'bookdetails__NumberOfPages', 'int'),
+            ('Publisher', 'bookdetails__Publisher', 'str'),
+            ('Language', 'bookdetails__Language', 'str'),
+        ],
+    },
+}
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def export_queryset(dataset, date_from=None, date_to=None, since_id=None):
+    """
+    Build the values_list queryset of an export, ordered by primary key.
+
+    Raises:
+        KeyError: If the dataset does not exist.
+    """
+    spec = EXPORTS[dataset]
+    queryset = spec['model'].objects.all()
+    if date_from is not None:
+        queryset = queryset.filter(**{spec['date_field'] + '__gte': date_from})
+    if date_to is not None:
+        queryset = queryset.filter(**{spec['date_field'] + '__lte': date_to})
+    if since_id is not None:
+        queryset = queryset.filter(pk__gt=since_id)
+    return queryset.order_by('pk').values_list(*[lookup for _, lookup, _ in spec['columns']])
+
+
+def get_header(dataset):
+    return [name for name, _, _ in EXPORTS[dataset]['columns']]
+
+
+def iter_chunks(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield the rows of the queryset in lists of at most chunk_size rows, using a server-side cursor.
+    """
+    chunk = []
+    for row in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def csv_chunks(dataset, chunks):
+    """
+    Yield the CSV text of the header, then of every chunk of rows.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(get_header(dataset))
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def gzip_chunks(text_chunks):
+    """
+    Compress a stream of text chunks into a single gzip stream.
+    """
+    # wbits=31 makes zlib write the gzip header and trailer
+    compressor = zlib.compressobj(wbits=31)
+    for text in text_chunks:
+        data = compressor.compress(text.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def write_parquet(path, dataset, chunks):
+    """
+    Write chunks of rows to a Parquet file, one row group per chunk.
+
+    Raises:
+        ImproperlyConfigured: If pyarrow is not installed.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImproperlyConfigured('Parquet export requires pyarrow (pip install pyarrow).')
+
+    types = {'int': pa.int64(), 'str': pa.string(), 'date': pa.date32(), 'bool': pa.bool_()}
+    columns = EXPORTS[dataset]['columns']
+    schema = pa.schema([(name, types[type_name]) for name, _, type_name in columns])
+    with pq.ParquetWriter(path, schema, compression='snappy') as writer:
+        for chunk in chunks:
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*chunk), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
@@ -0,0 +1,61 @@
+"""
+export_views.py
+
+This module contains the streaming CSV export endpoint for loans and the catalog (see export.py).
+
+ExportView:
+    - Endpoint: /library/export/loans/ and /library/export/books/
+    - Streams the whole dataset as CSV, reading the database in chunks, so the response size does not affect memory use.
+    - Query parameters:
+        - from / to (YYYY-MM-DD, inclusive): BorrowDate range for loans, PublishedDate range for books.
+        - since_id (integer): Only rows with a greater id (BorrowedBooks id or BookID), for incremental exports.
+        - compress=gzip: Stream a gzip-compressed file (.csv.gz) instead of plain CSV.
+    - Rows are ordered by id, so the id of the last row is the since_id of the next incremental export.
+
+Permissions:
+    - Require JWT authentication and an authenticated user, like the other viewsets.
+"""
+
+
+from datetime import date
+
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+
+from .authentication import TokenUserAuthentication
+from .export import EXPORTS, export_queryset, iter_chunks, csv_chunks, gzip_chunks
+from .stats_views import parse_date_param
+
+
+class ExportView(APIView):
+    authentication_classes = [TokenUserAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, dataset):
+        if dataset not in EXPORTS:
+            raise NotFound('Unknown export: {}'.format(dataset))
+
+        since_id = request.query_params.get('since_id')
+        if since_id is not None:
+            try:
+                since_id = int(since_id)
+            except ValueError:
+                raise ValidationError({'since_id': 'Must be an integer.'})
+
+        queryset = export_queryset(
+            dataset,
+            date_from=parse_date_param(request, 'from', date.fromisoformat),
+            date_to=parse_date_param(request, 'to', date.fromisoformat),
+            since_id=since_id,
+        )
+        content = csv_chunks(dataset, iter_chunks(queryset))
+        filename = '{}.csv'.format(dataset)
+        if request.query_params.get('compress') == 'gzip':
+            response = StreamingHttpResponse(gzip_chunks(content), content_type='application/gzip')
+            filename += '.gz'
+        else:
+            response = StreamingHttpResponse(content, content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="{}"'.format(filename)
+        return response
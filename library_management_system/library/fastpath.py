@@ -0,0 +1,166 @@
+"""
+fastpath.py
+
+This module contains the read-only fast path used by the high-volume list endpoints.
+
+FastListMixin:
+    - Viewset mixin replacing field-by-field serialization of list responses: rows are read with .values() and the
+      resulting dicts are used as the response items directly, with only the date columns converted.
+    - The columns are derived once per serializer class from its fields, so the output has the same keys, order and
+      values as the serializer. Serializers the fast path cannot reproduce exactly (nested or renamed fields,
+      custom to_representation, non-ISO date formats, field types other than the plain ones below) fall back to
+      the regular serializer automatically.
+    - Pagination classes receive the .values() queryset, so paginated responses keep their format. The columns a
+      paginator orders by (its ordering attribute) are always read, and dropped from the response when the
+      serializer does not return them.
+    - Sparse fieldsets (see fieldsets.py) are honoured: the plan is derived from the trimmed serializer and cached
+      per (serializer class, fields, exclude), so only the selected columns are read.
+    - Opt in by adding the mixin to a viewset whose list uses a plain ModelSerializer; call fast_list_response
+      from custom list actions.
+
+FastJSONRenderer:
+    - JSONRenderer rendering with orjson when it is installed, with the exact same bytes as DRF's JSONRenderer:
+      compact separators, UTF-8 output, U+2028/U+2029 escaped, and types orjson does not handle natively
+      (dates, datetimes, lazy strings, decimals...) encoded with DRF's JSONEncoder.
+    - Falls back to JSONRenderer for indented output (e.g. the browsable API), non-default JSON settings or data
+      orjson cannot encode.
+
+Usage:
+    class UserViewSet(FastListMixin, viewsets.ModelViewSet):
+        ...
+"""
+
+
+from rest_framework import ISO_8601, serializers
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .fieldsets import DynamicFieldsMixin, get_fieldset
+from .metrics import measure_serialization
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Fields whose to_representation returns the database value unchanged
+PLAIN_FIELDS = (
+    serializers.IntegerField, serializers.CharField, serializers.EmailField, serializers.BooleanField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+missing = object()
+plans = {}
+
+
+def build_plan(serializer):
+    """
+    Work out the .values() columns and the date columns reproducing the output of a serializer.
+
+    Returns:
+        tuple: (columns, date columns), or None when the serializer cannot be reproduced from .values() rows.
+    """
+    if type(serializer).to_representation is not serializers.Serializer.to_representation:
+        return None
+    columns, date_columns = [], []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if field.source != name:
+            return None
+        if type(field) is serializers.DateField:
+            output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+            if output_format is not None and output_format.lower() != ISO_8601:
+                return None
+            if output_format is not None:
+                date_columns.append(name)
+        elif type(field) not in PLAIN_FIELDS or getattr(field, 'pk_field', None) is not None:
+            return None
+        columns.append(name)
+    return columns, date_columns
+
+
+def values_to_data(rows, date_columns):
+    """
+    Convert .values() rows in place into serializer output.
+    """
+    rows = list(rows)
+    for column in date_columns:
+        for row in rows:
+            value = row[column]
+            if value is not None:
+                row[column] = value.isoformat()
+    return rows
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer producing the same bytes with orjson.
+    """
+    encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (orjson is None or self.ensure_ascii or not self.compact or
+                self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder.default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except (TypeError, orjson.JSONEncodeError):
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class FastListMixin:
+    """
+    Viewset mixin serving list responses from .values() rows, rendered with FastJSONRenderer.
+    """
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def get_fast_list_plan(self):
+        serializer_class = self.get_serializer_class()
+        key = serializer_class
+        if issubclass(serializer_class, DynamicFieldsMixin):
+            fields, exclude = get_fieldset(self.request)
+            if fields is not None or exclude is not None:
+                key = (serializer_class, frozenset(fields or ()), frozenset(exclude or ()))
+        plan = plans.get(key, missing)
+        if plan is missing:
+            plan = plans[key] = build_plan(self.get_serializer())
+        return plan
+
+    def fast_list_response(self, queryset):
+        """
+        Helper returning the (paginated) list response of queryset, or None when the serializer of the current
+        action cannot be reproduced from .values() rows.
+        """
+        plan = self.get_fast_list_plan()
+        if plan is None:
+            return None
+        columns, date_columns = plan
+        extra_columns = [name for name in getattr(self.paginator, 'ordering', ()) if name not in columns]
+        rows = queryset.values(*columns, *extra_columns)
+        page = self.paginate_queryset(rows)
+        with measure_serialization():
+            if page is not None:
+                data = values_to_data(page, date_columns)
+                for row in data:
+                    for name in extra_columns:
+                        del row[name]
+            else:
+                data = values_to_data(rows, date_columns)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def list(self, request, *args, **kwargs):
+        response = self.fast_list_response(self.filter_queryset(self.get_queryset()))
+        if response is None:
+            return super().list(request, *args, **kwargs)
+        return response
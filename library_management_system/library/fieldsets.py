@@ -0,0 +1,129 @@
+"""
+fieldsets.py
+
+This module implements sparse fieldsets: read requests may ask for a subset of the fields of the User, Book,
+BookDetails and BorrowedBooks representations with the fields and exclude query parameters, e.g.
+GET /library/books/?fields=BookID,Title or GET /library/borrowedbooks/all/?exclude=Fee. The embedded listings
+(books/with-details/, books/search/, borrowedbooks/expanded/ and the loans/ of a user or book) accept them too,
+for their top-level fields.
+
+get_fieldset:
+    - Returns the (fields, exclude) names of a request, each a tuple or None when the parameter is absent or empty.
+    - Only GET, HEAD and OPTIONS requests have a fieldset: writes always validate and return every field.
+
+DynamicFieldsMixin:
+    - Serializer mixin removing the fields not selected by the fieldset, passed as fields/exclude keyword arguments
+      or read from the request in the serializer context. Serializers nested in another serializer are not
+      trimmed.
+    - Unknown field names are rejected with 400 Bad Request.
+
+SparseFieldsetMixin:
+    - Viewset mixin pushing the fieldset down into the queryset with .only(), so the columns that are not returned
+      are not read from the database either. The columns the paginator orders by (see LoanCursorPagination) are
+      always read by listings.
+    - Querysets joining related rows with select_related are not projected: the joined rows are read whole.
+    - List responses built from .values() rows (see fastpath.py) read the selected columns only, with or without
+      this mixin.
+    - Querysets built by custom actions are projected with project_queryset.
+
+Usage:
+    class BookSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+        ...
+
+    class BookViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
+        ...
+"""
+
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import BaseSerializer
+
+FIELDS_PARAM = 'fields'
+EXCLUDE_PARAM = 'exclude'
+
+
+def parse_names(value):
+    if value is None:
+        return None
+    names = tuple(name.strip() for name in value.split(',') if name.strip())
+    return names or None
+
+
+def get_fieldset(request):
+    """
+    Returns the (fields, exclude) names requested by a read request.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None, None
+    params = request.query_params
+    return parse_names(params.get(FIELDS_PARAM)), parse_names(params.get(EXCLUDE_PARAM))
+
+
+def get_projection(serializer, required=()):
+    """
+    Returns the model fields read by a serializer, for QuerySet.only(), or None when a field is not a plain model
+    column (nested serializer or source, method, reverse relation...).
+    """
+    opts = serializer.Meta.model._meta
+    columns = list(required)
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if isinstance(field, BaseSerializer):
+            return None
+        try:
+            model_field = opts.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete:
+            return None
+        columns.append(field.source)
+    return columns
+
+
+class DynamicFieldsMixin:
+    """
+    Serializer mixin keeping only the fields selected by the fields/exclude arguments or query parameters.
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        exclude = kwargs.pop('exclude', None)
+        super().__init__(*args, **kwargs)
+        if fields is None and exclude is None:
+            fields, exclude = get_fieldset(self.context.get('request'))
+        if fields is None and exclude is None:
+            return
+
+        for param, names in ((FIELDS_PARAM, fields), (EXCLUDE_PARAM, exclude)):
+            unknown = [name for name in names or () if name not in self.fields]
+            if unknown:
+                raise ValidationError({param: 'Unknown field(s): {}.'.format(', '.join(unknown))})
+        for name in list(self.fields):
+            if (fields is not None and name not in fields) or (exclude is not None and name in exclude):
+                self.fields.pop(name)
+
+
+class SparseFieldsetMixin:
+    """
+    Viewset mixin reading only the columns of the requested fieldset.
+    """
+    def project_queryset(self, queryset):
+        """
+        Helper restricting a queryset with .only() to the columns of the current serializer, when a fieldset is
+        requested.
+        """
+        fields, exclude = get_fieldset(self.request)
+        if fields is None and exclude is None:
+            return queryset
+        if queryset.query.select_related:
+            return queryset
+        if not issubclass(self.get_serializer_class(), DynamicFieldsMixin):
+            return queryset
+        required = () if getattr(self, 'detail', False) else getattr(self.paginator, 'ordering', ())
+        columns = get_projection(self.get_serializer(), required)
+        return queryset if columns is None else queryset.only(*columns)
+
+    def get_queryset(self):
+        return self.project_queryset(super().get_queryset())
@@ -0,0 +1,173 @@
+"""
+idempotency.py
+
+This module implements Idempotency-Key support for the borrow and return endpoints.
+
+Clients retrying a request after a timeout cannot tell whether the first attempt was applied. When a request carries
+an Idempotency-Key header, its response is stored, and any later request of the same account with the same key gets
+the stored response back (with an Idempotent-Replayed: true header) instead of being processed again: no validation,
+no locks and no writes, so a retried borrow never creates a second loan and a retried return is not rejected as
+"already returned".
+
+idempotent:
+    - Decorator for viewset handlers (create, update, custom actions).
+    - Replays are served from an in-process LRU cache when possible, else from the IdempotencyKey table with a
+      single query.
+    - A new key is claimed by inserting its row before the handler runs, in the same transaction as the handler's
+      writes: a concurrent request with the same key waits on the unique constraint until the first one commits,
+      then replays its response. If the first request fails, its key is released with it.
+    - A key reused with a different method, path or body is rejected with 422 Unprocessable Entity.
+    - Responses with status 5xx are not stored, so the request can be retried. Only the status, content type and
+      body of the response are replayed.
+
+purge_expired_keys:
+    - Deletes the keys older than LIBRARY_IDEMPOTENCY_TTL seconds, in batches (see the purge_idempotency_keys
+      command). Expired keys are ignored even before they are purged.
+
+Settings:
+    - LIBRARY_IDEMPOTENCY_TTL (integer, default: 86400): Seconds a key and its response are kept.
+    - LIBRARY_IDEMPOTENCY_CACHE_SIZE (integer, default: 1000): Responses kept in the in-process cache of each worker.
+
+Usage:
+    class BorrowedBooksViewSet(viewsets.ModelViewSet):
+        @idempotent
+        def create(self, request, *args, **kwargs):
+            ...
+"""
+
+
+import functools
+import hashlib
+import json
+import zlib
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .cache import LocalTTLCache
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+StoredResponse = namedtuple('StoredResponse', ['request_hash', 'status_code', 'content_type', 'body'])
+
+stored_responses = LocalTTLCache(
+    maxsize=getattr(settings, 'LIBRARY_IDEMPOTENCY_CACHE_SIZE', 1000),
+    ttl=getattr(settings, 'LIBRARY_IDEMPOTENCY_TTL', 86400),
+)
+
+
+def get_cutoff():
+    return timezone.now() - timedelta(seconds=getattr(settings, 'LIBRARY_IDEMPOTENCY_TTL', 86400))
+
+
+def get_request_hash(request):
+    payload = json.dumps([request.method, request.path, request.data], cls=JSONEncoder, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def to_stored_response(record):
+    return StoredResponse(record.RequestHash, record.StatusCode, record.ContentType, bytes(record.ResponseBody))
+
+
+def load_stored_response(user_id, key):
+    record = IdempotencyKey.objects.filter(
+        AuthUserID=user_id, Key=key, StatusCode__isnull=False, CreatedAt__gte=get_cutoff(),
+    ).first()
+    return to_stored_response(record) if record is not None else None
+
+
+def claim_key(user_id, key, request_hash):
+    """
+    Insert the row of a new key, waiting for a concurrent request holding the same key.
+
+    Returns:
+        tuple: (the new IdempotencyKey, None), or (None, StoredResponse) when the key was used meanwhile.
+    """
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(AuthUserID=user_id, Key=key, RequestHash=request_hash), None
+    except IntegrityError:
+        record = IdempotencyKey.objects.get(AuthUserID=user_id, Key=key)
+    if record.CreatedAt >= get_cutoff():
+        return None, to_stored_response(record)
+    record.delete()
+    return IdempotencyKey.objects.create(AuthUserID=user_id, Key=key, RequestHash=request_hash), None
+
+
+def replay(stored, request_hash):
+    if stored.request_hash != request_hash:
+        return Response(
+            {'error': 'This Idempotency-Key was already used for a different request.'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    response = HttpResponse(zlib.decompress(stored.body), status=stored.status_code,
+                            content_type=stored.content_type)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(handler):
+    """
+    Decorator storing and replaying the responses of a viewset handler for requests with an Idempotency-Key.
+    """
+    @functools.wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return handler(self, request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response({'error': '{} must be 1 to {} characters long.'.format(HEADER, MAX_KEY_LENGTH)},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        user_id = request.user.pk
+        request_hash = get_request_hash(request)
+        stored = stored_responses.get((user_id, key)) or load_stored_response(user_id, key)
+        if stored is not None:
+            stored_responses.set((user_id, key), stored)
+            return replay(stored, request_hash)
+
+        with transaction.atomic():
+            record, stored = claim_key(user_id, key, request_hash)
+            if stored is not None:
+                stored_responses.set((user_id, key), stored)
+                return replay(stored, request_hash)
+
+            response = handler(self, request, *args, **kwargs)
+            if response.status_code >= 500:
+                record.delete()
+                return response
+            response = self.finalize_response(request, response, *args, **kwargs)
+            response.render()
+            stored = StoredResponse(request_hash, response.status_code, response['Content-Type'],
+                                    zlib.compress(response.content))
+            IdempotencyKey.objects.filter(pk=record.pk).update(
+                StatusCode=stored.status_code, ContentType=stored.content_type, ResponseBody=stored.body,
+            )
+            transaction.on_commit(lambda: stored_responses.set((user_id, key), stored))
+        return response
+    return wrapper
+
+
+def purge_expired_keys(batch_size=10000):
+    """
+    Delete the expired idempotency keys.
+
+    Returns:
+        int: The number of keys deleted.
+    """
+    cutoff = get_cutoff()
+    deleted = 0
+    while True:
+        batch = list(IdempotencyKey.objects.filter(CreatedAt__lt=cutoff).values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(pk__in=batch).delete()[0]
@@ -0,0 +1,73 @@
+"""
+inventory.py
+
+This module contains the concurrency-safe copy accounting used when books are borrowed and returned.
+
+All functions must be called inside transaction.atomic(), together with the loan changes they account for.
+AvailableCopies is only ever changed with UPDATE statements that read the current row value (F() expressions) or on
+rows locked with select_for_update, and the database enforces 0 <= AvailableCopies <= TotalCopies, so two concurrent
+borrows can never lend the same last copy. Inventory rows are always locked and updated in BookID order, whatever the
+order of the request, so concurrent batches sharing books wait for each other instead of deadlocking.
+
+reserve_copy:
+    - Takes one copy of a book with a single conditional UPDATE; returns False when no copy is available.
+
+reserve_copies:
+    - Takes one copy for each book id of a batch, locking the affected inventory rows once.
+
+release_copies:
+    - Puts returned copies back on the shelf.
+"""
+
+
+from collections import Counter
+
+from django.db.models import F
+from django.db.models.functions import Least
+
+from .models import BookInventory
+
+
+def reserve_copy(book_id):
+    """
+    Takes one available copy of the book.
+
+    Returns:
+        bool: False if the book has no available copy (or no inventory).
+    """
+    return bool(
+        BookInventory.objects.filter(BookID_id=book_id, AvailableCopies__gt=0)
+        .update(AvailableCopies=F('AvailableCopies') - 1)
+    )
+
+
+def reserve_copies(book_ids):
+    """
+    Takes one available copy for each book id, in order, locking the inventories of the batch until commit.
+
+    Returns:
+        list: One bool per book id, False where no copy was left for that request.
+    """
+    inventories = {
+        inventory.pk: inventory
+        for inventory in BookInventory.objects.select_for_update().filter(pk__in=set(book_ids)).order_by('pk')
+    }
+    granted = []
+    for book_id in book_ids:
+        inventory = inventories.get(book_id)
+        available = inventory is not None and inventory.AvailableCopies > 0
+        if available:
+            inventory.AvailableCopies -= 1
+        granted.append(available)
+    BookInventory.objects.bulk_update(inventories.values(), ['AvailableCopies'])
+    return granted
+
+
+def release_copies(book_ids):
+    """
+    Puts one copy back on the shelf for each book id (repeated ids release several copies).
+    """
+    for book_id, count in sorted(Counter(book_ids).items()):
+        BookInventory.objects.filter(BookID_id=book_id).update(
+            AvailableCopies=Least(F('AvailableCopies') + count, F('TotalCopies'))
+        )
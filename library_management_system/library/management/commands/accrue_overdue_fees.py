@@ -0,0 +1,36 @@
+"""
+accrue_overdue_fees.py
+
+Management command bringing the Fee of every open overdue loan up to date and queuing overdue notices
+(see library/overdue.py).
+
+The command is idempotent: it only changes loans whose fee is out of date and queues one notice per loan, so it can
+be scheduled as often as needed, e.g. daily with cron:
+    5 0 * * * cd /path/to/library_management_system && python manage.py accrue_overdue_fees
+
+Usage:
+    python manage.py accrue_overdue_fees [--date YYYY-MM-DD] [--batch-size 5000]
+"""
+
+
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from library.overdue import accrue_overdue_fees
+
+
+class Command(BaseCommand):
+    help = 'Accrues the fees of open overdue loans and queues overdue notices.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat,
+                            help='Day the fees are computed for (default: today).')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Number of loans updated per transaction.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        result = accrue_overdue_fees(today=options['date'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Updated {} overdue loans across {} due dates in {:.1f}s.'.format(
+            result['loans'], result['due_dates'], time.monotonic() - started)))
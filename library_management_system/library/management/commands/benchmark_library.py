@@ -0,0 +1,119 @@
+"""
+benchmark_library.py
+
+Management command running the benchmark suite (see library/benchmarks.py) and storing the results as JSON.
+
+The benchmarks run in a throwaway test database (created like the one of manage.py test), seeded with synthetic
+data (see library/seeding.py), so the configured database is never modified and every run starts from the same data.
+
+Results:
+    - Written to --output as JSON: the git commit, Python/Django versions, database vendor, seeding parameters and,
+      per benchmark, min/max/mean/median/stddev of the time of one call in seconds and its median CPU time, and the
+      EXPLAIN plan of the index.* queries. --explain also prints these plans.
+    - With --compare, the medians are compared with a previous result file and the benchmarks slower by more than
+      --threshold are reported; --fail-on-regression then exits with an error, for use in CI.
+
+Usage:
+    python manage.py benchmark_library --output before.json
+    python manage.py benchmark_library --output after.json --compare before.json [--fail-on-regression]
+    python manage.py benchmark_library --select endpoint.borrowedbooks --rounds 50
+    python manage.py benchmark_library --select _burst
+    python manage.py benchmark_library --select index. --loans 1000000 --explain
+"""
+
+
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import get_runner
+from django.conf import settings
+
+from library.benchmarks import BenchmarkContext, run_benchmarks, compare
+from library.models import User
+from library.seeding import seed
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Runs the benchmark suite on a seeded test database and stores the results as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Number of users to seed.')
+        parser.add_argument('--books', type=int, default=5000, help='Number of books to seed.')
+        parser.add_argument('--loans', type=int, default=50000, help='Number of loans to seed.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of the generated data.')
+        parser.add_argument('--sample-size', type=int, default=1000,
+                            help='Number of instances serialized by the serializer benchmarks.')
+        parser.add_argument('--rounds', type=int, default=20, help='Measured rounds per benchmark.')
+        parser.add_argument('--warmup', type=int, default=3, help='Unrecorded warmup rounds per benchmark.')
+        parser.add_argument('--select', help='Only run the benchmarks whose name contains this text.')
+        parser.add_argument('--output', default='benchmark-results.json', help='JSON file to write.')
+        parser.add_argument('--compare', help='Previous JSON result file to compare with.')
+        parser.add_argument('--threshold', type=float, default=0.1,
+                            help='Relative slowdown of the median reported as a regression (default: 0.1).')
+        parser.add_argument('--fail-on-regression', action='store_true', help='Exit with an error on regressions.')
+        parser.add_argument('--explain', action='store_true', help='Print the EXPLAIN plans of the index queries.')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Keep the test database between runs and reuse its data.')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)['benchmarks']
+
+        runner = get_runner(settings)(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        runner.setup_test_environment()
+        old_config = runner.setup_databases()
+        try:
+            if not User.objects.exists():
+                self.stdout.write('Seeding the test database...')
+                seed(options['users'], options['books'], options['loans'], random_seed=options['seed'])
+            context = BenchmarkContext(sample_size=options['sample_size'])
+            self.explain = options['explain']
+            results = run_benchmarks(context, rounds=options['rounds'], warmup=options['warmup'],
+                                     select=options['select'], on_result=self.write_result)
+            vendor = connection.vendor
+        finally:
+            runner.teardown_databases(old_config)
+            runner.teardown_test_environment()
+
+        report = {
+            'commit': git_commit(),
+            'date': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': vendor,
+            'data': {name: options[name] for name in ('users', 'books', 'loans', 'seed', 'sample_size')},
+            'benchmarks': results,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS('Results written to {}.'.format(options['output'])))
+
+        if baseline is not None:
+            rows, regressions = compare(results, baseline, threshold=options['threshold'])
+            for name, previous, current, change in rows:
+                line = '{:45} {:10.3f}ms -> {:10.3f}ms {:+7.1%}'.format(name, previous * 1000, current * 1000, change)
+                self.stdout.write(self.style.ERROR(line) if name in regressions else line)
+            if regressions and options['fail_on_regression']:
+                raise CommandError('{} benchmark(s) regressed: {}'.format(len(regressions), ', '.join(regressions)))
+
+    def write_result(self, name, result):
+        self.stdout.write('{:45} median {:10.3f}ms  stddev {:8.3f}ms  cpu {:10.3f}ms'.format(
+            name, result['median'] * 1000, result['stddev'] * 1000, result['cpu_median'] * 1000))
+        if self.explain and 'plan' in result:
+            for line in result['plan'].splitlines():
+                self.stdout.write('    ' + line)
@@ -0,0 +1,33 @@
+"""
+compact_changes.py
+
+Management command compacting the change event outbox (see library/changes.py): superseded events older than
+LIBRARY_CHANGES_COMPACT_AFTER seconds and tombstones older than LIBRARY_CHANGES_TOMBSTONE_TTL seconds are deleted,
+so the outbox holds about one event per object however many changes are made.
+
+Schedule it e.g. hourly:
+    30 * * * * cd /path/to/library_management_system && python manage.py compact_changes
+
+Usage:
+    python manage.py compact_changes [--batch-size 5000]
+"""
+
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from library.changes import compact_changes
+
+
+class Command(BaseCommand):
+    help = 'Deletes superseded change events and expired tombstones from the outbox.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Number of events examined per batch.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        deleted = compact_changes(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Deleted {} change events in {:.1f}s.'.format(
+            deleted, time.monotonic() - started)))
@@ -0,0 +1,266 @@
+"""
+import_catalog.py
+
+Management command importing books and their details in bulk from a CSV or NDJSON file.
+
+Input:
+    - CSV with a header row, or NDJSON with one JSON object per line. NDJSON lines that are not valid JSON or not
+      objects are reported and counted as invalid rows, like rows failing validation.
+    - Book columns (required): Title, ISBN, PublishedDate (YYYY-MM-DD), Genre.
+    - BookDetails columns (optional): NumberOfPages, Publisher, Language. Details are created when any of them is set.
+
+Pipeline:
+    - The file is read lazily and processed in chunks of --batch-size rows, so memory use does not depend on the
+      size of the file.
+    - Every row is validated with the BookSerializer and BookDetailsSerializer field rules. ISBN uniqueness is checked
+      once per chunk with a single query instead of once per row; rows whose ISBN already exists (in the database or
+      earlier in the file) are skipped.
+    - Each chunk is written in its own transaction with bulk_create (or, with --copy on PostgreSQL, with COPY into a
+      temporary table followed by INSERT ... SELECT). Inventories, search documents, change events (see changes.py)
+      and cached catalog lists are updated for the imported books, since bulk inserts do not send post_save signals.
+
+Resuming:
+    - After every committed chunk, the number of processed rows is written to a checkpoint file
+      (default: <file>.checkpoint). With --resume, the rows recorded there are skipped. The checkpoint is removed once
+      the import completes. Because duplicates are skipped, re-importing a partially imported chunk is harmless.
+
+Usage:
+    python manage.py import_catalog books.csv [--format csv|ndjson] [--batch-size 1000] [--copy] [--resume]
+"""
+
+
+import csv
+import io
+import itertools
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from library import cache, changes
+from library.models import Book, BookDetails, BookInventory
+from library.search import update_search_documents
+from library.serializers import BookSerializer, BookDetailsSerializer
+
+BOOK_FIELDS = ['Title', 'ISBN', 'PublishedDate', 'Genre']
+DETAILS_FIELDS = ['NumberOfPages', 'Publisher', 'Language']
+
+
+class ImportBookSerializer(BookSerializer):
+    class Meta(BookSerializer.Meta):
+        fields = BOOK_FIELDS
+        # Uniqueness is checked for the whole chunk at once
+        extra_kwargs = {'ISBN': {'validators': []}}
+
+
+class ImportBookDetailsSerializer(BookDetailsSerializer):
+    class Meta(BookDetailsSerializer.Meta):
+        fields = DETAILS_FIELDS
+
+
+class InvalidRow:
+    """
+    Placeholder for a line of the file that could not be read as a row.
+    """
+    def __init__(self, error):
+        self.error = error
+
+
+def parse_line(line):
+    try:
+        row = json.loads(line)
+    except json.JSONDecodeError as exc:
+        return InvalidRow('Invalid JSON: {} (column {}).'.format(exc.msg, exc.colno))
+    if not isinstance(row, dict):
+        return InvalidRow('Expected a JSON object, got {}.'.format(type(row).__name__))
+    return row
+
+
+def read_rows(path, file_format):
+    """
+    Yields the rows of the file as dicts, one at a time, or InvalidRow for the lines that are not rows.
+    """
+    with open(path, newline='', encoding='utf-8') as source:
+        if file_format == 'csv':
+            yield from csv.DictReader(source)
+        else:
+            for line in source:
+                if line.strip():
+                    yield parse_line(line)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = 'Imports books and book details in bulk from a CSV or NDJSON file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file to import.')
+        parser.add_argument('--format', choices=['csv', 'ndjson'],
+                            help='File format (default: guessed from the file extension).')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of rows per transaction.')
+        parser.add_argument('--copy', action='store_true', help='Load each chunk with PostgreSQL COPY.')
+        parser.add_argument('--resume', action='store_true', help='Skip the rows recorded in the checkpoint file.')
+        parser.add_argument('--checkpoint', help='Checkpoint file (default: <path>.checkpoint).')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError('File not found: {}'.format(path))
+        file_format = options['format'] or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy is only supported on PostgreSQL.')
+
+        checkpoint = options['checkpoint'] or path + '.checkpoint'
+        skipped_rows = self.read_checkpoint(checkpoint) if options['resume'] else 0
+        if skipped_rows:
+            self.stdout.write('Resuming after row {}.'.format(skipped_rows))
+
+        rows = itertools.islice(read_rows(path, file_format), skipped_rows, None)
+        processed, totals = skipped_rows, {'imported': 0, 'duplicates': 0, 'invalid': 0}
+        started = time.monotonic()
+        for chunk in chunked(rows, options['batch_size']):
+            books, details, errors, duplicates = self.validate_chunk(chunk, first_row=processed + 1)
+            for row_number, error in errors:
+                self.stderr.write('Row {}: {}'.format(row_number, json.dumps(error)))
+
+            with transaction.atomic():
+                if options['copy']:
+                    imported = self.copy_books(books, details)
+                else:
+                    imported = self.insert_books(books, details)
+
+            processed += len(chunk)
+            self.write_checkpoint(checkpoint, processed)
+            totals['imported'] += imported
+            totals['duplicates'] += duplicates + len(books) - imported
+            totals['invalid'] += len(errors)
+            elapsed = time.monotonic() - started
+            self.stdout.write('{} rows processed, {} books imported ({:.0f} rows/s)'.format(
+                processed, totals['imported'], (processed - skipped_rows) / elapsed if elapsed else 0))
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        cache.invalidate_lists(Book)
+        cache.invalidate_lists(BookDetails)
+        self.stdout.write(self.style.SUCCESS(
+            'Imported {imported} books; skipped {duplicates} duplicates and {invalid} invalid rows.'.format(**totals)))
+
+    def validate_chunk(self, chunk, first_row):
+        """
+        Validates a chunk of rows and drops duplicate ISBNs.
+
+        Returns:
+            tuple: (books, details, errors, duplicates) where books is a list of validated book data, details maps
+                ISBN to validated details data, errors is a list of (row number, error) pairs and duplicates is the
+                number of rows skipped because their ISBN already exists.
+        """
+        books, details, errors, seen = [], {}, [], set()
+        for row_number, row in enumerate(chunk, start=first_row):
+            if isinstance(row, InvalidRow):
+                errors.append((row_number, {'non_field_errors': [row.error]}))
+                continue
+            book_serializer = ImportBookSerializer(data={field: row.get(field) for field in BOOK_FIELDS})
+            details_data = {field: row.get(field) for field in DETAILS_FIELDS if row.get(field) not in (None, '')}
+            details_serializer = ImportBookDetailsSerializer(data=details_data) if details_data else None
+
+            book_valid = book_serializer.is_valid()
+            details_valid = details_serializer is None or details_serializer.is_valid()
+            if not (book_valid and details_valid):
+                error = dict(book_serializer.errors)
+                if details_serializer is not None:
+                    error.update(details_serializer.errors)
+                errors.append((row_number, error))
+                continue
+
+            isbn = book_serializer.validated_data['ISBN']
+            if isbn in seen:
+                continue
+            seen.add(isbn)
+            books.append(book_serializer.validated_data)
+            if details_serializer is not None:
+                details[isbn] = details_serializer.validated_data
+
+        existing = set(Book.objects.filter(ISBN__in=seen).values_list('ISBN', flat=True))
+        new_books = [book for book in books if book['ISBN'] not in existing]
+        duplicates = len(chunk) - len(errors) - len(new_books)
+        return new_books, details, errors, duplicates
+
+    def insert_books(self, books, details):
+        created = Book.objects.bulk_create([Book(**book) for book in books], batch_size=len(books) or None)
+        BookDetails.objects.bulk_create(
+            [BookDetails(BookID=book, **details[book.ISBN]) for book in created if book.ISBN in details]
+        )
+        book_ids = [book.pk for book in created]
+        self.after_insert(book_ids)
+        return len(book_ids)
+
+    def copy_books(self, books, details):
+        """
+        Loads the books of a chunk with COPY into a temporary table, then moves them into the catalog with
+        INSERT ... SELECT, skipping ISBNs inserted concurrently.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for book in books:
+            book_details = details.get(book['ISBN'], {})
+            writer.writerow([book[field] for field in BOOK_FIELDS] +
+                            [book_details.get(field) for field in DETAILS_FIELDS])
+        buffer.seek(0)
+
+        book_table, details_table = Book._meta.db_table, BookDetails._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                CREATE TEMPORARY TABLE import_catalog_rows (
+                    "Title" varchar(100), "ISBN" varchar(13), "PublishedDate" date, "Genre" varchar(100),
+                    "NumberOfPages" integer, "Publisher" varchar(100), "Language" varchar(100)
+                ) ON COMMIT DROP
+            """)
+            cursor.copy_expert('COPY import_catalog_rows FROM STDIN WITH (FORMAT csv)', buffer)
+            cursor.execute("""
+                INSERT INTO "{book_table}" ("Title", "ISBN", "PublishedDate", "Genre")
+                SELECT "Title", "ISBN", "PublishedDate", "Genre" FROM import_catalog_rows
+                ON CONFLICT ("ISBN") DO NOTHING
+                RETURNING "BookID"
+            """.format(book_table=book_table))
+            book_ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute("""
+                INSERT INTO "{details_table}" ("BookID_id", "NumberOfPages", "Publisher", "Language")
+                SELECT b."BookID", r."NumberOfPages", r."Publisher", r."Language"
+                FROM import_catalog_rows r JOIN "{book_table}" b ON b."ISBN" = r."ISBN"
+                WHERE b."BookID" = ANY(%s) AND r."NumberOfPages" IS NOT NULL
+            """.format(details_table=details_table, book_table=book_table), [book_ids])
+        self.after_insert(book_ids)
+        return len(book_ids)
+
+    def after_insert(self, book_ids):
+        """
+        Does the work of the post_save handlers for books inserted in bulk.
+        """
+        inventories = BookInventory.objects.bulk_create([BookInventory(BookID_id=book_id) for book_id in book_ids])
+        changes.record_changes(Book.objects.filter(pk__in=book_ids).order_by('pk'), changes.CREATED)
+        changes.record_changes(BookDetails.objects.filter(BookID__in=book_ids).order_by('pk'), changes.CREATED)
+        changes.record_changes(inventories, changes.CREATED)
+        update_search_documents(book_ids)
+
+    def read_checkpoint(self, checkpoint):
+        try:
+            with open(checkpoint) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def write_checkpoint(self, checkpoint, processed):
+        temporary = checkpoint + '.tmp'
+        with open(temporary, 'w') as f:
+            f.write(str(processed))
+        os.replace(temporary, checkpoint)
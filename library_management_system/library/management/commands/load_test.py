@@ -0,0 +1,164 @@
+"""
+load_test.py
+
+Management command sending concurrent GET requests to a running server and reporting its throughput and latency
+percentiles, to compare the same endpoints served by a WSGI server (synchronous DRF viewsets, one thread per request)
+and by an ASGI server (native async views, see async_views.py).
+
+Client:
+    - An asyncio client using only the standard library: --concurrency workers send --requests requests in total,
+      each on a new connection (Connection: close), so the client never waits on a thread and does not limit the
+      server it measures.
+    - Requests are authenticated with the access token returned by /library/login/ for --username and --password,
+      or with --token.
+    - Every path given with --path is measured in turn, after --warmup unrecorded requests.
+
+Results:
+    - Per path: requests, non-200 responses, requests per second, and the p50, p99 and maximum latency, printed and
+      optionally written to --output as JSON.
+
+Usage:
+    gunicorn library_management_system.wsgi --workers 1 --threads 8 --bind 127.0.0.1:8001
+    uvicorn library_management_system.asgi:application --workers 1 --port 8002
+
+    python manage.py load_test http://127.0.0.1:8001 --username admin --password secret --path /library/books/
+    python manage.py load_test http://127.0.0.1:8002 --username admin --password secret \\
+        --path /library/books/ --path /library/async/books/ --concurrency 100 --requests 5000
+"""
+
+
+import asyncio
+import json
+import math
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = ['/library/books/', '/library/async/books/']
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[max(math.ceil(fraction * len(sorted_values)) - 1, 0)]
+
+
+def login(base_url, username, password):
+    """
+    Returns the access token of the user.
+    """
+    request = urllib.request.Request(
+        base_url + '/library/login/', data=json.dumps({'username': username, 'password': password}).encode(),
+        headers={'Content-Type': 'application/json'}, method='POST',
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return json.load(response)['access']
+    except (urllib.error.URLError, KeyError, ValueError) as e:
+        raise CommandError('Login failed: {}'.format(e))
+
+
+async def send_request(host, port, raw_request):
+    """
+    Sends one request on a new connection; returns the status code and the latency in seconds.
+    """
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(raw_request)
+        await writer.drain()
+        status_line = await reader.readline()
+        # Read the whole response: the server closes the connection after it
+        while await reader.read(65536):
+            pass
+    finally:
+        writer.close()
+    latency = time.perf_counter() - started
+    parts = status_line.split()
+    return (int(parts[1]) if len(parts) > 1 else 0), latency
+
+
+async def run_load(host, port, raw_request, concurrency, requests):
+    """
+    Sends requests requests from concurrency workers; returns the statuses, the latencies and the elapsed time.
+    """
+    remaining = iter(range(requests))
+    statuses, latencies = [], []
+
+    async def worker():
+        for _ in remaining:
+            try:
+                status, latency = await send_request(host, port, raw_request)
+            except OSError:
+                status, latency = 0, None
+            statuses.append(status)
+            if latency is not None:
+                latencies.append(latency)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return statuses, latencies, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = 'Measures the throughput and latency of a running server under concurrent GET requests.'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Base URL of the running server, e.g. http://127.0.0.1:8000.')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Path to request; repeat for several (default: {}).'.format(
+                                ' and '.join(DEFAULT_PATHS)))
+        parser.add_argument('--username', help='User to log in as.')
+        parser.add_argument('--password', help='Password of --username.')
+        parser.add_argument('--token', help='Access token to send instead of logging in.')
+        parser.add_argument('--concurrency', type=int, default=50, help='Concurrent requests (default: 50).')
+        parser.add_argument('--requests', type=int, default=2000, help='Measured requests per path (default: 2000).')
+        parser.add_argument('--warmup', type=int, default=100, help='Unrecorded requests per path (default: 100).')
+        parser.add_argument('--output', help='JSON file to write the results to.')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError('Only http:// server URLs are supported.')
+        base_url = options['url'].rstrip('/')
+        token = options['token']
+        if token is None:
+            if not (options['username'] and options['password']):
+                raise CommandError('Give --token, or --username and --password.')
+            token = login(base_url, options['username'], options['password'])
+
+        host, port = url.hostname, url.port or 80
+        results = {}
+        for path in options['paths'] or DEFAULT_PATHS:
+            raw_request = (
+                'GET {} HTTP/1.1\r\nHost: {}\r\nAuthorization: Bearer {}\r\nAccept: application/json\r\n'
+                'Connection: close\r\n\r\n'.format(path, url.netloc, token)
+            ).encode()
+            if options['warmup']:
+                asyncio.run(run_load(host, port, raw_request, options['concurrency'], options['warmup']))
+            statuses, latencies, elapsed = asyncio.run(
+                run_load(host, port, raw_request, options['concurrency'], options['requests'])
+            )
+            latencies.sort()
+            results[path] = {
+                'requests': len(statuses),
+                'errors': sum(1 for status in statuses if status != 200),
+                'concurrency': options['concurrency'],
+                'requests_per_second': len(statuses) / elapsed if elapsed else 0.0,
+                'p50': percentile(latencies, 0.5),
+                'p99': percentile(latencies, 0.99),
+                'max': latencies[-1] if latencies else None,
+            }
+            result = results[path]
+            self.stdout.write('{:<40} {:>8.1f} req/s  p50 {:>8.2f}ms  p99 {:>8.2f}ms  errors {}'.format(
+                path, result['requests_per_second'], (result['p50'] or 0) * 1000, (result['p99'] or 0) * 1000,
+                result['errors']))
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'url': base_url, 'results': results}, f, indent=2)
+            self.stdout.write(self.style.SUCCESS('Results written to {}.'.format(options['output'])))
@@ -0,0 +1,78 @@
+"""
+partition_loans.py
+
+Management command managing the monthly partitions of the loans table on PostgreSQL (see library/partitioning.py).
+
+Actions:
+    - status: Lists the partitions with their months and estimated number of rows.
+    - convert: Converts the loans table into a table partitioned by month of BorrowDate (run once, in a maintenance
+      window: the table is locked while its rows are copied).
+    - create: Creates the partitions of the current month and of the next --months-ahead months. Schedule it e.g.
+      monthly so new loans never land in the DEFAULT partition:
+          0 3 1 * * cd /path/to/library_management_system && python manage.py partition_loans create
+    - archive: Detaches the partitions older than --keep-months months and moves them to --schema, or drops them
+      with --drop. Partitions holding open loans are skipped unless --force is given.
+
+Usage:
+    python manage.py partition_loans convert [--months-ahead 3]
+    python manage.py partition_loans create [--months-ahead 3]
+    python manage.py partition_loans archive --keep-months 24 --schema archive
+    python manage.py partition_loans status
+"""
+
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from library import partitioning
+
+
+class Command(BaseCommand):
+    help = 'Converts the loans table to monthly partitions and creates, archives or lists its partitions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['status', 'convert', 'create', 'archive'])
+        parser.add_argument('--months-ahead', type=int, default=3,
+                            help='Number of future months to create partitions for (convert, create).')
+        parser.add_argument('--keep-months', type=int, default=24,
+                            help='Number of recent months whose partitions are kept attached (archive).')
+        parser.add_argument('--schema', default='archive', help='Schema receiving detached partitions (archive).')
+        parser.add_argument('--drop', action='store_true', help='Drop detached partitions instead (archive).')
+        parser.add_argument('--force', action='store_true',
+                            help='Also archive partitions that still hold open loans (archive).')
+
+    def handle(self, *args, **options):
+        try:
+            getattr(self, 'handle_{}'.format(options['action']))(options)
+        except partitioning.PartitioningError as e:
+            raise CommandError(str(e))
+
+    def handle_status(self, options):
+        if not partitioning.is_partitioned():
+            self.stdout.write('{} is not partitioned.'.format(partitioning.TABLE))
+            return
+        for partition in partitioning.list_partitions():
+            months = '{} - {}'.format(partition.start, partition.end) if partition.start else 'DEFAULT'
+            self.stdout.write('{:40} {:25} ~{} rows'.format(partition.name, months, partition.rows))
+
+    def handle_convert(self, options):
+        started = time.monotonic()
+        result = partitioning.convert_to_partitioned(months_ahead=options['months_ahead'])
+        self.stdout.write(self.style.SUCCESS('Copied {} loans into {} monthly partitions in {:.1f}s.'.format(
+            result['rows'], result['partitions'], time.monotonic() - started)))
+
+    def handle_create(self, options):
+        created = partitioning.ensure_future_partitions(months_ahead=options['months_ahead'])
+        for name in created:
+            self.stdout.write('Created {}'.format(name))
+        self.stdout.write(self.style.SUCCESS('{} partitions created.'.format(len(created))))
+
+    def handle_archive(self, options):
+        archived, skipped = partitioning.archive_partitions(
+            options['keep_months'], schema=options['schema'], drop=options['drop'], force=options['force'],
+        )
+        for name in skipped:
+            self.stdout.write(self.style.WARNING('Skipped {}: it holds open loans.'.format(name)))
+        self.stdout.write(self.style.SUCCESS('{} partitions {}.'.format(
+            len(archived), 'dropped' if options['drop'] else 'moved to schema {}'.format(options['schema']))))
@@ -0,0 +1,28 @@
+"""
+purge_idempotency_keys.py
+
+Management command deleting the idempotency keys (stored borrow and return responses) older than
+LIBRARY_IDEMPOTENCY_TTL seconds (see library/idempotency.py).
+
+Expired keys are already ignored by the API, so the command only keeps the table small; schedule it e.g. hourly:
+    0 * * * * cd /path/to/library_management_system && python manage.py purge_idempotency_keys
+
+Usage:
+    python manage.py purge_idempotency_keys [--batch-size 10000]
+"""
+
+
+from django.core.management.base import BaseCommand
+
+from library.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = 'Deletes the expired idempotency keys.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help='Number of keys deleted per statement.')
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_keys(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Deleted {} expired idempotency keys.'.format(deleted)))
@@ -0,0 +1,30 @@
+"""
+rebuild_loan_stats.py
+
+Management command recomputing the loan statistics aggregate tables from BorrowedBooks.
+
+The aggregates are normally maintained incrementally by the borrow and return endpoints. Run this command after
+loans were changed outside the API (deleted loans, imports, manual SQL) or to initialise the tables on an existing
+database. The rebuild runs in a single transaction, so readers never see partially rebuilt statistics.
+
+Usage:
+    python manage.py rebuild_loan_stats [--batch-size 5000]
+"""
+
+
+from django.core.management.base import BaseCommand
+
+from library import stats
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the loan statistics aggregate tables from BorrowedBooks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Number of rows inserted per statement.')
+
+    def handle(self, *args, **options):
+        counts = stats.rebuild(batch_size=options['batch_size'])
+        for name, count in counts.items():
+            self.stdout.write('{}: {} rows'.format(name, count))
+        self.stdout.write(self.style.SUCCESS('Loan statistics rebuilt.'))
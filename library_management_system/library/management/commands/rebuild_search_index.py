@@ -0,0 +1,40 @@
+"""
+rebuild_search_index.py
+
+Management command rebuilding the full-text search documents of the whole Book catalog.
+
+The catalog is processed in BookID ranges of --batch-size books, one INSERT ... SELECT per range,
+so the command runs in bounded memory and each range is committed on its own.
+
+Usage:
+    python manage.py rebuild_search_index [--batch-size 10000]
+"""
+
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from library.models import Book
+from library.search import is_postgresql, update_search_documents
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search documents of every book in the catalog.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help='Number of BookIDs indexed per statement.')
+
+    def handle(self, *args, **options):
+        if not is_postgresql():
+            raise CommandError('Full-text search documents are only maintained on PostgreSQL.')
+
+        bounds = Book.objects.aggregate(first=Min('BookID'), last=Max('BookID'))
+        if bounds['first'] is None:
+            self.stdout.write('The catalog is empty.')
+            return
+
+        batch_size = options['batch_size']
+        written = 0
+        for start in range(bounds['first'], bounds['last'] + 1, batch_size):
+            written += update_search_documents(id_range=(start, start + batch_size))
+        self.stdout.write(self.style.SUCCESS('Indexed {} books.'.format(written)))
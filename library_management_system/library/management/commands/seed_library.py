@@ -0,0 +1,35 @@
+"""
+seed_library.py
+
+Management command filling the database with synthetic users, books, book details, inventories and loans
+(see library/seeding.py).
+
+Usage:
+    python manage.py seed_library [--users 1000] [--books 5000] [--loans 50000] [--seed 0] [--batch-size 5000]
+"""
+
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from library.seeding import seed
+
+
+class Command(BaseCommand):
+    help = 'Fills the database with synthetic users, books and loans.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Number of users to create.')
+        parser.add_argument('--books', type=int, default=5000, help='Number of books to create.')
+        parser.add_argument('--loans', type=int, default=50000, help='Number of loans to create.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed produces the same data.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Number of rows inserted per statement.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        created = seed(options['users'], options['books'], options['loans'],
+                       random_seed=options['seed'], batch_size=options['batch_size'])
+        for name, count in created.items():
+            self.stdout.write('{}: {} rows'.format(name, count))
+        self.stdout.write(self.style.SUCCESS('Seeded in {:.1f}s.'.format(time.monotonic() - started)))
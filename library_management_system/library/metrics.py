@@ -0,0 +1,326 @@
+"""
+metrics.py
+
+This module contains the request-level performance instrumentation of the Library Management System.
+
+PerformanceMetricsMiddleware:
+    - Measures every sampled request and records, per (method, route, status):
+        - total latency,
+        - number and total duration of the database queries (through an execute wrapper installed on every
+          database connection, which records the queries of the request running in the current context),
+        - serialization time: the time spent building serializer.data (serializers using TimedSerializerMixin) or
+          the rows of the fast list path (see fastpath.py), without the queries run meanwhile,
+        - render time: the time spent turning the serializer output into the response body (DRF responses only),
+        - response size in bytes (non-streaming responses only).
+    - Streaming responses (exports, NDJSON listings) read the database while the body is sent, after the middleware
+      has returned, so only the work done before streaming starts is measured for them.
+    - Routes are the URL patterns matched by the resolver (e.g. "library/books/(?P<pk>[^/.]+)/$"), so the number
+      of label values stays bounded no matter which ids are requested. Methods outside the standard HTTP methods
+      are recorded as "other" for the same reason.
+    - Adds a Server-Timing header (db, serialize, render, app and total durations in milliseconds) to sampled
+      responses, which browsers' developer tools display next to the request.
+    - Supports both WSGI and ASGI: under ASGI, requests are measured without leaving the event loop, and the
+      queries of sync views (run in a worker thread) are still attributed to their request.
+    - Disabled when settings.LIBRARY_METRICS_ENABLED is false: Django then drops the middleware at startup, so it
+      costs nothing. settings.LIBRARY_METRICS_SAMPLE_RATE (0 to 1) limits the share of requests measured.
+
+metrics_view:
+    - Endpoint: /metrics
+    - Serves the recorded histograms in the Prometheus text exposition format.
+    - Metrics are kept in memory per worker process; Prometheus adds the instance label needed to tell workers apart.
+
+TimedSerializerMixin:
+    - Serializer mixin recording the time spent in serializer.data, for one instance or a list (many=True).
+
+Usage:
+    - Add 'library.metrics.PerformanceMetricsMiddleware' to settings.MIDDLEWARE, as early as possible so the
+      measured latency includes the other middleware.
+    - Route /metrics to metrics_view and point a Prometheus scrape job at it.
+"""
+
+
+import contextvars
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+from rest_framework.serializers import LIST_SERIALIZER_KWARGS, ListSerializer
+
+METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+
+class Histogram:
+    """
+    Cumulative histogram per label set, in the Prometheus sense.
+    """
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            # One counter per bucket, then the +Inf bucket, the sum and the count
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-3] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def expose(self, label_names):
+        lines = ['# HELP {} {}'.format(self.name, self.help_text), '# TYPE {} histogram'.format(self.name)]
+        for labels, series in sorted(self.series.items()):
+            label_text = ','.join('{}="{}"'.format(name, escape_label(value))
+                                  for name, value in zip(label_names, labels))
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                lines.append('{}_bucket{{{},le="{}"}} {}'.format(self.name, label_text, bound, count))
+            lines.append('{}_sum{{{}}} {}'.format(self.name, label_text, series[-2]))
+            lines.append('{}_count{{{}}} {}'.format(self.name, label_text, series[-1]))
+        return lines
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    """
+    Thread-safe collection of the request histograms of this process.
+    """
+    label_names = ('method', 'route', 'status')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.latency = Histogram(
+                'library_request_duration_seconds', 'Request latency.', LATENCY_BUCKETS)
+            self.db_queries = Histogram(
+                'library_request_db_queries', 'Database queries per request.', QUERY_COUNT_BUCKETS)
+            self.db_time = Histogram(
+                'library_request_db_duration_seconds', 'Database time per request.', LATENCY_BUCKETS)
+            self.serialize_time = Histogram(
+                'library_request_serialize_duration_seconds', 'Serialization time per request.', LATENCY_BUCKETS)
+            self.render_time = Histogram(
+                'library_request_render_duration_seconds', 'Response rendering time per request.', LATENCY_BUCKETS)
+            self.response_size = Histogram(
+                'library_response_size_bytes', 'Response body size.', SIZE_BUCKETS)
+
+    def record(self, labels, timings):
+        with self.lock:
+            self.latency.observe(labels, timings.total)
+            self.db_queries.observe(labels, timings.db_queries)
+            self.db_time.observe(labels, timings.db_time)
+            if timings.serialize_time is not None:
+                self.serialize_time.observe(labels, timings.serialize_time)
+            if timings.render_time is not None:
+                self.render_time.observe(labels, timings.render_time)
+            if timings.response_size is not None:
+                self.response_size.observe(labels, timings.response_size)
+
+    def expose(self):
+        with self.lock:
+            lines = []
+            histograms = (self.latency, self.db_queries, self.db_time, self.serialize_time, self.render_time,
+                          self.response_size)
+            for histogram in histograms:
+                lines.extend(histogram.expose(self.label_names))
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+# Timings of the request handled in the current context; copied into the worker threads running sync code
+current_timings = contextvars.ContextVar('library_timings', default=None)
+
+
+class RequestTimings:
+    """
+    Timings collected for a single request.
+    """
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.serialize_time = None
+        self.render_started = None
+        self.render_time = None
+        self.response_size = None
+        self.total = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Database execute wrapper (see connection.execute_wrapper)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.db_queries += 1
+
+    def rendered(self, response):
+        # Post-render callback of SimpleTemplateResponse (DRF Response)
+        self.render_time = time.perf_counter() - self.render_started
+
+    def server_timing(self):
+        serialize_time = self.serialize_time or 0.0
+        render_time = self.render_time or 0.0
+        app_time = max(self.total - self.db_time - serialize_time - render_time, 0.0)
+        return ('db;dur={:.1f};desc="{} queries", serialize;dur={:.1f}, render;dur={:.1f}, app;dur={:.1f}, '
+                'total;dur={:.1f}').format(self.db_time * 1000, self.db_queries, serialize_time * 1000,
+                                           render_time * 1000, app_time * 1000, self.total * 1000)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper adding the query to the timings of the current request, if it is measured.
+    """
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection, **kwargs):
+    # Insert first: connection.execute_wrapper() blocks pop the last wrapper when they exit
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@contextmanager
+def measure_serialization():
+    """
+    Context manager adding the time spent in its block, minus the queries run meanwhile, to the serialization time
+    of the current request.
+    """
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    started, db_time = time.perf_counter(), timings.db_time
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started - (timings.db_time - db_time)
+        timings.serialize_time = (timings.serialize_time or 0.0) + elapsed
+
+
+class TimedListSerializer(ListSerializer):
+    @property
+    def data(self):
+        with measure_serialization():
+            return super().data
+
+
+class TimedSerializerMixin:
+    """
+    Serializer mixin recording the time spent in serializer.data in the metrics of the current request.
+    """
+    @property
+    def data(self):
+        with measure_serialization():
+            return super().data
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {key: kwargs.pop(key) for key in ('allow_empty', 'max_length', 'min_length') if key in kwargs}
+        list_kwargs['child'] = cls(*args, **kwargs)
+        list_kwargs.update({key: value for key, value in kwargs.items() if key in LIST_SERIALIZER_KWARGS})
+        return TimedListSerializer(*args, **list_kwargs)
+
+
+class PerformanceMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'LIBRARY_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'LIBRARY_METRICS_SAMPLE_RATE', 1.0)
+        self.server_timing = getattr(settings, 'LIBRARY_METRICS_SERVER_TIMING', True)
+        connection_created.connect(install_query_recorder, dispatch_uid='library.metrics')
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Keep the template response hook on the event loop instead of a worker thread
+            self.process_template_response = self.process_template_response_async
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+        timings = request.library_timings = RequestTimings()
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            timings.total = time.perf_counter() - started
+            current_timings.reset(token)
+        return self.record(request, response, timings)
+
+    async def __acall__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return await self.get_response(request)
+
+        timings = request.library_timings = RequestTimings()
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timings.total = time.perf_counter() - started
+            current_timings.reset(token)
+        return self.record(request, response, timings)
+
+    def record(self, request, response, timings):
+        match = request.resolver_match
+        if match is not None and match.url_name == 'metrics':
+            return response
+        if not response.streaming:
+            timings.response_size = len(response.content)
+        route = (match.route or match.view_name) if match is not None else 'unmatched'
+        method = request.method if request.method in METHODS else 'other'
+        registry.record((method, route, response.status_code), timings)
+        if self.server_timing:
+            response['Server-Timing'] = timings.server_timing()
+        return response
+
+    def watch_render(self, request, response):
+        timings = getattr(request, 'library_timings', None)
+        if timings is not None:
+            timings.render_started = time.perf_counter()
+            response.add_post_render_callback(timings.rendered)
+        return response
+
+    def process_template_response(self, request, response):
+        return self.watch_render(request, response)
+
+    async def process_template_response_async(self, request, response):
+        return self.watch_render(request, response)
+
+
+def metrics_view(request):
+    if not getattr(settings, 'LIBRARY_METRICS_ENABLED', False):
+        raise Http404()
+    return HttpResponse(registry.expose(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['Genre'], name='book_genre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrowedbooks',
+            index=models.Index(fields=['UserID', 'HasBeenReturned'], name='loan_user_returned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrowedbooks',
+            index=models.Index(fields=['BookID', 'HasBeenReturned'], name='loan_book_returned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrowedbooks',
+            index=models.Index(fields=['BorrowDate', 'id'], name='loan_borrowdate_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrowedbooks',
+            index=models.Index(condition=models.Q(('HasBeenReturned', False)), fields=['ReturnDate'], name='loan_open_returndate_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:37
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+def build_search_documents(apps, schema_editor):
+    # Index the books that already exist; new and changed books are indexed by the signal handlers
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("""
+        INSERT INTO "library_booksearchindex" ("BookID_id", "Document")
+        SELECT b."BookID",
+               setweight(to_tsvector('english', coalesce(b."Title", '') || ' ' || coalesce(b."ISBN", '')), 'A')
+               || setweight(to_tsvector('english', coalesce(b."Genre", '')), 'B')
+               || setweight(to_tsvector('english', coalesce(d."Publisher", '')), 'C')
+               || setweight(to_tsvector('english', coalesce(d."Language", '')), 'D')
+        FROM "library_book" b
+        LEFT JOIN "library_bookdetails" d ON d."BookID_id" = b."BookID"
+    """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0002_loan_and_genre_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='BookSearchIndex',
+            fields=[
+                ('BookID', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='searchindex', serialize=False, to='library.book')),
+                ('Document', django.contrib.postgres.search.SearchVectorField(null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['Title'], name='book_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='booksearchindex',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['Document'], name='book_search_document_idx'),
+        ),
+        migrations.RunPython(build_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0003_book_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyLoanVolume',
+            fields=[
+                ('Day', models.DateField(primary_key=True, serialize=False)),
+                ('Borrowed', models.IntegerField(default=0)),
+                ('Returned', models.IntegerField(default=0)),
+                ('FeesCharged', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserLoanStats',
+            fields=[
+                ('UserID', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='loanstats', serialize=False, to='library.user')),
+                ('TotalLoans', models.IntegerField(default=0)),
+                ('OpenLoans', models.IntegerField(default=0)),
+                ('AccruedFees', models.IntegerField(default=0)),
+                ('OutstandingFees', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BookLoanStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('Month', models.DateField()),
+                ('BorrowCount', models.IntegerField(default=0)),
+                ('BookID', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='library.book')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GenreLoanStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('Genre', models.CharField(max_length=100)),
+                ('Month', models.DateField()),
+                ('BorrowCount', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['Month', '-BorrowCount'], name='genreloanstats_month_count_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='genreloanstats',
+            constraint=models.UniqueConstraint(fields=('Genre', 'Month'), name='genreloanstats_genre_month_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='bookloanstats',
+            index=models.Index(fields=['Month', '-BorrowCount'], name='bookloanstats_month_count_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='bookloanstats',
+            constraint=models.UniqueConstraint(fields=('BookID', 'Month'), name='bookloanstats_book_month_uniq'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def create_inventories(apps, schema_editor):
+    # One copy per existing book; books already lent more than once get as many copies as their open loans
+    Book = apps.get_model('library', 'Book')
+    BookInventory = apps.get_model('library', 'BookInventory')
+    books = Book.objects.annotate(open_loans=Count('borrowedbooks', filter=Q(borrowedbooks__HasBeenReturned=False)))
+    inventories = []
+    for book_id, open_loans in books.values_list('BookID', 'open_loans').iterator():
+        total = max(1, open_loans)
+        inventories.append(BookInventory(BookID_id=book_id, TotalCopies=total, AvailableCopies=total - open_loans))
+        if len(inventories) >= 5000:
+            BookInventory.objects.bulk_create(inventories)
+            inventories = []
+    BookInventory.objects.bulk_create(inventories)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0004_loan_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookInventory',
+            fields=[
+                ('BookID', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='inventory', serialize=False, to='library.book')),
+                ('TotalCopies', models.IntegerField(default=1)),
+                ('AvailableCopies', models.IntegerField(default=1)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='bookinventory',
+            constraint=models.CheckConstraint(check=models.Q(('AvailableCopies__gte', 0), ('AvailableCopies__lte', models.F('TotalCopies'))), name='bookinventory_available_copies_range'),
+        ),
+        migrations.RunPython(create_inventories, migrations.RunPython.noop),
+    ]
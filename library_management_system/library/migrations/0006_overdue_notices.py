@@ -0,0 +1,28 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0005_book_inventory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OverdueNotice',
+            fields=[
+                ('LoanID', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='overduenotice', serialize=False, to='library.borrowedbooks')),
+                ('DaysOverdue', models.IntegerField()),
+                ('Fee', models.IntegerField()),
+                ('CreatedAt', models.DateTimeField(auto_now_add=True)),
+                ('SentAt', models.DateTimeField(blank=True, null=True)),
+                ('UserID', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='library.user')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('SentAt__isnull', True)), fields=['CreatedAt'], name='overdue_notice_unsent_idx')],
+            },
+        ),
+    ]
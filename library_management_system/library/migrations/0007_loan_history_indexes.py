@@ -0,0 +1,21 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0006_overdue_notices'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='borrowedbooks',
+            index=models.Index(fields=['UserID', 'BorrowDate', 'id'], name='loan_user_borrowdate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrowedbooks',
+            index=models.Index(fields=['BookID', 'BorrowDate', 'id'], name='loan_book_borrowdate_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-18 15:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0007_loan_history_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('AuthUserID', models.IntegerField()),
+                ('Key', models.CharField(max_length=255)),
+                ('RequestHash', models.CharField(max_length=64)),
+                ('StatusCode', models.IntegerField(null=True)),
+                ('ContentType', models.CharField(blank=True, max_length=100)),
+                ('ResponseBody', models.BinaryField(default=b'')),
+                ('CreatedAt', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['CreatedAt'], name='idempotency_key_created_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='idempotencykey',
+            constraint=models.UniqueConstraint(fields=('AuthUserID', 'Key'), name='idempotency_key_uniq'),
+        ),
+    ]
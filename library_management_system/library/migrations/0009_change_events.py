@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-18 15:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0008_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeEvent',
+            fields=[
+                ('Seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('Model', models.CharField(max_length=50)),
+                ('ObjectID', models.BigIntegerField()),
+                ('Action', models.CharField(max_length=10)),
+                ('Data', models.JSONField(null=True)),
+                ('CreatedAt', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['Model', 'ObjectID', 'Seq'], name='changeevent_object_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-18 15:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0009_change_events'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='overduenotice',
+            name='LoanID',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='overduenotice', serialize=False, to='library.borrowedbooks'),
+        ),
+    ]
@@ -19,6 +19,9 @@ Book Model:
         - ISBN (CharField): International Standard Book Number of the book (unique).
         - PublishedDate (DateField): Date when the book was published.
         - Genre (CharField): Genre of the book.
+    - Indexes:
+        - Genre, for genre filtering and per-genre lookups.
+        - GIN trigram index on Title (PostgreSQL pg_trgm), for fuzzy title search.
 
 BookDetails Model:
     - Represents additional details about a book.
@@ -39,6 +42,87 @@ BorrowedBooks Model:
 
         - HasBeenReturned (BooleanField): Indicates whether the book has been returned (default: False).
         - Fee (IntegerField): Fee charged if the book is returned after the expected return date (default: 0).
+          For open overdue loans, Fee holds the fee accrued so far (see the accrue_overdue_fees command).
+    - Indexes:
+        - (UserID, HasBeenReturned) and (BookID, HasBeenReturned), for per-user and per-book loan lookups.
+        - (BorrowDate, id), matching the keyset pagination order of the loan listings.
+        - (UserID, BorrowDate, id) and (BookID, BorrowDate, id), for the paginated loan history of a user or a book.
+        - Partial index on ReturnDate WHERE HasBeenReturned = false, covering open (and overdue) loans only.
+    - On PostgreSQL, the table can be partitioned by month of BorrowDate with the partition_loans command
+      (see partitioning.py); the model and its queries are the same either way.
+
+BookSearchIndex Model:
+    - Holds the full-text search document of a book (see search.py).
+    - Fields:
+        - BookID (OneToOneField to Book, primary key): Reference to the indexed book.
+        - Document (SearchVectorField): Weighted tsvector built from the book and its details.
+    - Indexes:
+        - GIN index on Document.
+
+BookInventory Model:
+    - Represents the physical copies of a book.
+    - Fields:
+        - BookID (OneToOneField to Book, primary key): Reference to the book.
+        - TotalCopies (IntegerField): Number of copies owned by the library (default: 1).
+        - AvailableCopies (IntegerField): Number of copies currently on the shelf (default: 1).
+    - Constraints:
+        - 0 <= AvailableCopies <= TotalCopies, enforced by the database so concurrent borrows can never oversell.
+    - An inventory with one copy is created automatically for every new book (see signals.py).
+
+Loan statistics models:
+    - Aggregate tables maintained incrementally in the same transaction as every borrow and return (see stats.py),
+      and rebuilt in bulk with the rebuild_loan_stats management command.
+    - UserLoanStats: one row per user that has borrowed a book.
+        - UserID (OneToOneField to User, primary key), TotalLoans, OpenLoans (IntegerFields).
+        - AccruedFees (IntegerField): Total fees charged on returned loans.
+        - OutstandingFees (IntegerField): Total fees recorded on loans that have not been returned yet.
+    - BookLoanStats: number of loans of a book per month (BookID, Month, BorrowCount).
+    - GenreLoanStats: number of loans of a genre per month (Genre, Month, BorrowCount).
+    - DailyLoanVolume: loans borrowed and returned per day (Day, Borrowed, Returned, FeesCharged).
+    - Month is the first day of the month of the BorrowDate.
+
+OverdueNotice Model:
+    - Queue of overdue notifications, filled by the accrue_overdue_fees command (see overdue.py).
+    - Fields:
+        - LoanID (OneToOneField to BorrowedBooks, primary key): The overdue loan; a loan is notified once.
+          Declared without a database foreign key (db_constraint=False) so the loans table can be partitioned
+          (see partitioning.py); deleting a loan through the ORM still deletes its notice.
+        - UserID (ForeignKey to User): The user to notify.
+        - DaysOverdue (IntegerField), Fee (IntegerField): Days past ReturnDate and fee accrued when the notice
+          was queued.
+        - CreatedAt (DateTimeField): When the notice was queued.
+        - SentAt (DateTimeField, nullable): When the notice was sent; null while it is waiting in the queue.
+    - Indexes:
+        - Partial index on CreatedAt WHERE SentAt IS NULL, so senders find pending notices without scanning sent ones.
+
+IdempotencyKey Model:
+    - Stored response of a borrow or return request sent with an Idempotency-Key header (see idempotency.py).
+    - Fields:
+        - AuthUserID (IntegerField): id of the authenticated account that sent the request; keys are per account.
+        - Key (CharField): The Idempotency-Key header value.
+        - RequestHash (CharField): SHA-256 of the method, path and body, to detect a key reused for another request.
+        - StatusCode (IntegerField, nullable), ContentType (CharField), ResponseBody (BinaryField): The response,
+          with the body zlib-compressed; StatusCode is null while the first request is still being processed.
+        - CreatedAt (DateTimeField): When the key was first used; keys expire after LIBRARY_IDEMPOTENCY_TTL seconds.
+    - Constraints:
+        - (AuthUserID, Key) is unique, so concurrent requests with the same key wait for the first one.
+    - Indexes:
+        - CreatedAt, for purging expired keys (purge_idempotency_keys command).
+
+ChangeEvent Model:
+    - Transactional outbox of the changes of loans, books, book details and inventories, served by the change feed
+      (see changes.py).
+    - Fields:
+        - Seq (BigAutoField, primary key): Sequence number of the event; consumers read the events after the last
+          number they processed.
+        - Model (CharField), ObjectID (BigIntegerField): The changed object ("borrowedbooks", "book", "bookdetails"
+          or "bookinventory").
+        - Action (CharField): "created", "updated" or "deleted".
+        - Data (JSONField, nullable): The object as returned by the API after the change; for deletions, the last
+          state of the object.
+        - CreatedAt (DateTimeField): When the event was written.
+    - Indexes:
+        - (Model, ObjectID, Seq), to find the superseded events of an object when compacting the outbox.
 
 Usage:
     - Integrate these models into your Django app for managing user and book-related data.
@@ -49,8 +133,12 @@ Author: Suyamoon Pathak
 Date: 01-02-2024
 """
 
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
+OVERDUE_FEE_PER_DAY = 10  # Fee (in rupees) charged for every day a book is returned past its ReturnDate
+
 class User(models.Model):
     UserID = models.AutoField(primary_key=True)
     Name = models.CharField(max_length=100)
@@ -64,6 +152,12 @@ class Book(models.Model):
     PublishedDate = models.DateField()
     Genre = models.CharField(max_length=100)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['Genre'], name='book_genre_idx'),
+            GinIndex(fields=['Title'], name='book_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
+
 class BookDetails(models.Model):
     DetailsID = models.AutoField(primary_key=True)
     BookID = models.OneToOneField(Book, on_delete=models.CASCADE)
@@ -79,3 +173,126 @@ class BorrowedBooks(models.Model):
     #fields added on my own
     HasBeenReturned = models.BooleanField(default=False) #if the book has not be returned, this field is false, if it has been returned, it is true
     Fee = models.IntegerField(default=0) #If the day the user returned the book is past the returnDate he set while borrowing, user will be charge 10 rupees per day for the due period
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['UserID', 'HasBeenReturned'], name='loan_user_returned_idx'),
+            models.Index(fields=['BookID', 'HasBeenReturned'], name='loan_book_returned_idx'),
+            models.Index(fields=['BorrowDate', 'id'], name='loan_borrowdate_id_idx'),
+            models.Index(fields=['UserID', 'BorrowDate', 'id'], name='loan_user_borrowdate_idx'),
+            models.Index(fields=['BookID', 'BorrowDate', 'id'], name='loan_book_borrowdate_idx'),
+            models.Index(
+                fields=['ReturnDate'],
+                condition=models.Q(HasBeenReturned=False),
+                name='loan_open_returndate_idx',
+            ),
+        ]
+
+class BookSearchIndex(models.Model):
+    BookID = models.OneToOneField(Book, on_delete=models.CASCADE, primary_key=True, related_name='searchindex')
+    Document = SearchVectorField(null=True)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['Document'], name='book_search_document_idx'),
+        ]
+
+class BookInventory(models.Model):
+    BookID = models.OneToOneField(Book, on_delete=models.CASCADE, primary_key=True, related_name='inventory')
+    TotalCopies = models.IntegerField(default=1)
+    AvailableCopies = models.IntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(AvailableCopies__gte=0) & models.Q(AvailableCopies__lte=models.F('TotalCopies')),
+                name='bookinventory_available_copies_range',
+            ),
+        ]
+
+class UserLoanStats(models.Model):
+    UserID = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='loanstats')
+    TotalLoans = models.IntegerField(default=0)
+    OpenLoans = models.IntegerField(default=0)
+    AccruedFees = models.IntegerField(default=0)
+    OutstandingFees = models.IntegerField(default=0)
+
+class BookLoanStats(models.Model):
+    BookID = models.ForeignKey(Book, on_delete=models.CASCADE)
+    Month = models.DateField()
+    BorrowCount = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['BookID', 'Month'], name='bookloanstats_book_month_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['Month', '-BorrowCount'], name='bookloanstats_month_count_idx'),
+        ]
+
+class GenreLoanStats(models.Model):
+    Genre = models.CharField(max_length=100)
+    Month = models.DateField()
+    BorrowCount = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['Genre', 'Month'], name='genreloanstats_genre_month_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['Month', '-BorrowCount'], name='genreloanstats_month_count_idx'),
+        ]
+
+class DailyLoanVolume(models.Model):
+    Day = models.DateField(primary_key=True)
+    Borrowed = models.IntegerField(default=0)
+    Returned = models.IntegerField(default=0)
+    FeesCharged = models.IntegerField(default=0)
+
+class OverdueNotice(models.Model):
+    LoanID = models.OneToOneField(BorrowedBooks, on_delete=models.CASCADE, primary_key=True,
+                                  related_name='overduenotice', db_constraint=False)
+    UserID = models.ForeignKey(User, on_delete=models.CASCADE)
+    DaysOverdue = models.IntegerField()
+    Fee = models.IntegerField()
+    CreatedAt = models.DateTimeField(auto_now_add=True)
+    SentAt = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['CreatedAt'],
+                condition=models.Q(SentAt__isnull=True),
+                name='overdue_notice_unsent_idx',
+            ),
+        ]
+
+class IdempotencyKey(models.Model):
+    AuthUserID = models.IntegerField()
+    Key = models.CharField(max_length=255)
+    RequestHash = models.CharField(max_length=64)
+    StatusCode = models.IntegerField(null=True)
+    ContentType = models.CharField(max_length=100, blank=True)
+    ResponseBody = models.BinaryField(default=b'')
+    CreatedAt = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['AuthUserID', 'Key'], name='idempotency_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['CreatedAt'], name='idempotency_key_created_idx'),
+        ]
+
+class ChangeEvent(models.Model):
+    Seq = models.BigAutoField(primary_key=True)
+    Model = models.CharField(max_length=50)
+    ObjectID = models.BigIntegerField()
+    Action = models.CharField(max_length=10)
+    Data = models.JSONField(null=True)
+    CreatedAt = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['Model', 'ObjectID', 'Seq'], name='changeevent_object_idx'),
+        ]
@@ -0,0 +1,90 @@
+"""
+overdue.py
+
+This module accrues the fees of open overdue loans and queues overdue notices (see the accrue_overdue_fees command).
+
+accrue_overdue_fees:
+    - Finds open loans whose ReturnDate has passed through the partial index on ReturnDate WHERE
+      HasBeenReturned = false, so returned loans are never scanned.
+    - Open overdue loans are processed one due date at a time: all loans due on the same day owe the same fee,
+      (today - ReturnDate) * OVERDUE_FEE_PER_DAY, so each batch is written with a single set-based UPDATE.
+    - Batches hold at most batch_size loans and are committed one by one, so row locks are held briefly and the job
+      runs in time proportional to the number of fees that change, however many loans are open.
+    - Loans whose Fee is already up to date are skipped, so running the job several times a day (or again after a
+      failure) changes nothing; loans locked by a concurrent return are skipped and picked up by the next run.
+    - In the same transaction as each batch:
+        - the users' OutstandingFees statistics are increased by the change of their fees (see stats.py),
+        - an OverdueNotice is queued for every loan that did not have one yet,
+        - an "updated" change event is written for every updated loan, with a single INSERT ... SELECT that
+          builds the loan data in the database (see changes.py), so the loans are never loaded either.
+    - The loan listings' version (see conditional.py) is replaced after each batch commits.
+
+Usage:
+    from library.overdue import accrue_overdue_fees
+    accrue_overdue_fees()
+"""
+
+
+from collections import Counter
+from datetime import date
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from . import cache, changes, stats
+from .models import BorrowedBooks, OverdueNotice, OVERDUE_FEE_PER_DAY
+
+
+def accrue_batch(due_date, fee, days_overdue, batch_size):
+    """
+    Updates the fee of up to batch_size open loans due on due_date whose fee is not up to date yet.
+
+    Returns:
+        int: The number of loans updated.
+    """
+    with transaction.atomic():
+        loans = BorrowedBooks.objects.filter(HasBeenReturned=False, ReturnDate=due_date).exclude(Fee=fee)
+        locked = loans.select_for_update(skip_locked=connection.features.has_select_for_update_skip_locked)
+        loan_ids = list(locked.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not loan_ids:
+            return 0
+
+        batch = BorrowedBooks.objects.filter(pk__in=loan_ids)
+        fee_changes = Counter()
+        for row in batch.order_by().values('UserID').annotate(count=Count('pk'), fees=Sum('Fee')):
+            fee_changes[row['UserID']] = row['count'] * fee - row['fees']
+        user_ids = dict(batch.values_list('pk', 'UserID'))
+
+        batch.update(Fee=fee)
+        changes.record_changes_in_sql(batch, changes.UPDATED)
+        stats.record_fee_accruals(fee_changes)
+        OverdueNotice.objects.bulk_create(
+            [OverdueNotice(LoanID_id=loan_id, UserID_id=user_ids[loan_id], DaysOverdue=days_overdue, Fee=fee)
+             for loan_id in loan_ids],
+            ignore_conflicts=True,
+        )
+        transaction.on_commit(lambda: cache.invalidate_lists(BorrowedBooks))
+    return len(loan_ids)
+
+
+def accrue_overdue_fees(today=None, batch_size=5000):
+    """
+    Brings the Fee of every open overdue loan up to date and queues overdue notices.
+
+    Returns:
+        dict: Number of distinct due dates processed and of loans updated.
+    """
+    today = today or date.today()
+    open_overdue = BorrowedBooks.objects.filter(HasBeenReturned=False, ReturnDate__lt=today)
+    due_dates = open_overdue.order_by('ReturnDate').values_list('ReturnDate', flat=True).distinct()
+    result = Counter(due_dates=0, loans=0)
+    for due_date in list(due_dates):
+        days_overdue = (today - due_date).days
+        fee = days_overdue * OVERDUE_FEE_PER_DAY
+        result['due_dates'] += 1
+        while True:
+            updated = accrue_batch(due_date, fee, days_overdue, batch_size)
+            result['loans'] += updated
+            if updated < batch_size:
+                break
+    return dict(result)
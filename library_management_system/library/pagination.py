@@ -0,0 +1,166 @@
+"""
+pagination.py
+
+This module contains pagination and streaming helpers for the large BorrowedBooks and catalog listings.
+
+LoanCursorPagination:
+    - Keyset (cursor) pagination over the (BorrowDate, id) ordering.
+    - Each page is fetched with a range condition on the last seen (BorrowDate, id) pair instead of an OFFSET,
+      so the cost of a page does not depend on how deep into the loan history the client is.
+    - Query parameters:
+        - cursor (string): Opaque cursor taken from the "next" link of the previous page.
+        - page_size (integer): Number of loans per page (default: 100, maximum: 1000).
+    - Response:
+        - {"next": <url or null>, "results": [...]}
+    - Pages can hold model instances or .values() rows that include BorrowDate and id; the ordering attribute
+      lists these columns, so callers projecting the queryset keep them.
+
+SearchResultsPagination:
+    - Page number pagination for ranked search results, where a keyset cursor cannot be used.
+    - Query parameters:
+        - page (integer): Page number (default: 1).
+        - page_size (integer): Number of results per page (default: 20, maximum: 100).
+
+stream_ndjson:
+    - Streams a queryset as newline-delimited JSON (one object per line, serialized by the given serializer).
+    - Rows are read through a server-side cursor with .iterator(chunk_size=...), so memory stays constant
+      no matter how many rows are exported.
+
+Usage:
+    - Set LoanCursorPagination as the pagination_class of a viewset whose queryset has BorrowDate and id fields.
+    - Return stream_ndjson(queryset, serializer) from a view for a full export.
+"""
+
+
+import base64
+import json
+from datetime import date
+
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import replace_query_param
+
+LOAN_ORDERING = ('BorrowDate', 'id')
+
+
+def encode_cursor(borrow_date, pk):
+    """
+    Encode a (BorrowDate, id) position into an opaque, URL-safe cursor string.
+    """
+    raw = '{}:{}'.format(borrow_date.isoformat(), pk)
+    return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor back into a (BorrowDate, id) position.
+
+    Raises:
+        NotFound: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('ascii')
+        borrow_date, pk = raw.split(':')
+        return date.fromisoformat(borrow_date), int(pk)
+    except (TypeError, ValueError, UnicodeError):
+        raise NotFound('Invalid cursor')
+
+
+def filter_after_cursor(queryset, position):
+    """
+    Restrict an (BorrowDate, id) ordered queryset to the rows strictly after the given position.
+    The leading BorrowDate__gte condition lets the database use the (BorrowDate, id) index as a range scan.
+    """
+    borrow_date, pk = position
+    return queryset.filter(BorrowDate__gte=borrow_date).filter(
+        Q(BorrowDate__gt=borrow_date) | Q(id__gt=pk)
+    )
+
+
+def get_position(loan):
+    """
+    Return the (BorrowDate, id) position of a loan instance or of a .values() row.
+    """
+    if isinstance(loan, dict):
+        return loan['BorrowDate'], loan['id']
+    return loan.BorrowDate, loan.pk
+
+
+class LoanCursorPagination(BasePagination):
+    """
+    Keyset pagination over the (BorrowDate, id) ordering of BorrowedBooks querysets.
+    """
+    page_size = 100
+    max_page_size = 1000
+    ordering = LOAN_ORDERING
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*LOAN_ORDERING)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = filter_after_cursor(queryset, decode_cursor(cursor))
+
+        # Fetch one extra row to find out whether another page follows.
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        self.next_position = get_position(results[-1]) if self.has_next else None
+        return results
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(*self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class SearchResultsPagination(PageNumberPagination):
+    """
+    Page number pagination for ranked search results.
+    """
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+
+
+def stream_ndjson(queryset, serializer, chunk_size=2000):
+    """
+    Stream every row of the queryset as newline-delimited JSON using a server-side cursor.
+    """
+
+    def rows():
+        for instance in queryset.iterator(chunk_size=chunk_size):
+            yield json.dumps(
+                serializer.to_representation(instance), cls=JSONEncoder, separators=(',', ':')
+            ) + '\n'
+
+    return StreamingHttpResponse(rows(), content_type='application/x-ndjson')
@@ -0,0 +1,298 @@
+"""
+partitioning.py
+
+This module manages the PostgreSQL declarative range partitioning of the loans table (BorrowedBooks) by BorrowDate,
+with one partition per month (see the partition_loans management command).
+
+Nearly every loan query touches recent or open loans, while the table grows forever. With monthly partitions,
+queries filtered on BorrowDate (loan listings and histories with from/to, exports, statistics rebuilds) only scan
+the matching partitions, each partition has its own small indexes, and old months can be detached in one statement
+instead of being deleted row by row. The BorrowedBooks model is unchanged, so the ORM code keeps working as is.
+
+Layout:
+    - library_borrowedbooks is partitioned by RANGE ("BorrowDate"); partitions are named library_borrowedbooks_pYYYY_MM
+      and a DEFAULT partition (library_borrowedbooks_default) receives rows outside every monthly range.
+    - The primary key becomes (id, "BorrowDate"), as PostgreSQL requires the partition key in unique constraints;
+      ids still come from one sequence, so they stay unique and the ORM keeps addressing loans by id.
+    - Tables referencing loans cannot have a database foreign key to a partitioned table: OverdueNotice.LoanID is
+      declared with db_constraint=False and the ORM still cascades deletions.
+
+convert_to_partitioned:
+    - One-time conversion of the existing table: the rows are copied into a new partitioned table with the same
+      columns, indexes and foreign keys, in a single transaction holding an exclusive lock on the loans table
+      (run it in a maintenance window; it takes about as long as copying the table).
+
+create_partitions / ensure_future_partitions:
+    - Create the monthly partitions of a range of months, e.g. the next three months, ahead of time. Creating a
+      partition scans the DEFAULT partition, which stays small as long as future partitions exist.
+
+archive_partitions:
+    - Detaches the partitions of the months older than keep_months, and moves them to another schema (kept for
+      reference, out of every query) or drops them. Partitions still holding open loans are skipped unless forced.
+      The loan statistics tables are aggregates and are not affected; the loan listings' version (see
+      conditional.py) is replaced.
+
+Usage:
+    from library.partitioning import convert_to_partitioned, ensure_future_partitions
+    convert_to_partitioned(months_ahead=3)
+    ensure_future_partitions(months_ahead=3)
+"""
+
+
+import re
+from collections import namedtuple
+from datetime import date
+
+from django.db import connection, transaction
+
+from . import cache
+from .models import BorrowedBooks
+
+TABLE = BorrowedBooks._meta.db_table
+PARTITION_KEY = 'BorrowDate'
+
+Partition = namedtuple('Partition', ['name', 'start', 'end', 'rows'])
+
+BOUND_RE = re.compile(r"FROM \('(\d{4}-\d{2}-\d{2})'\) TO \('(\d{4}-\d{2}-\d{2})'\)")
+
+
+class PartitioningError(Exception):
+    pass
+
+
+def qn(name):
+    return connection.ops.quote_name(name)
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(month, months):
+    years, month_index = divmod(month.month - 1 + months, 12)
+    return date(month.year + years, month_index + 1, 1)
+
+
+def partition_name(table, month):
+    return '{}_p{:%Y_%m}'.format(table, month)
+
+
+def check_postgresql():
+    if connection.vendor != 'postgresql':
+        raise PartitioningError('Table partitioning requires PostgreSQL.')
+
+
+def is_partitioned(table=TABLE):
+    check_postgresql()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s)", [table])
+        row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def list_partitions(table=TABLE):
+    """
+    Returns the partitions of a table, ordered by month, with the DEFAULT partition (start and end None) last.
+    """
+    check_postgresql()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(%s)",
+            [table],
+        )
+        rows = cursor.fetchall()
+    partitions = []
+    for name, bound, estimated_rows in rows:
+        match = BOUND_RE.search(bound)
+        start, end = (date.fromisoformat(match[1]), date.fromisoformat(match[2])) if match else (None, None)
+        partitions.append(Partition(name, start, end, max(estimated_rows, 0)))
+    partitions.sort(key=lambda partition: (partition.start is None, partition.start))
+    return partitions
+
+
+def create_partitions(first_month, last_month, table=TABLE, cursor=None):
+    """
+    Create the missing monthly partitions from first_month to last_month (inclusive).
+
+    Returns:
+        list: The names of the partitions created.
+    """
+    if cursor is None:
+        check_postgresql()
+        with connection.cursor() as cursor:
+            return create_partitions(first_month, last_month, table, cursor)
+    cursor.execute("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                   "WHERE i.inhparent = to_regclass(%s)", [table])
+    existing = {name for name, in cursor.fetchall()}
+    created = []
+    month = month_start(first_month)
+    while month <= last_month:
+        name = partition_name(table, month)
+        if name not in existing:
+            cursor.execute("CREATE TABLE {} PARTITION OF {} FOR VALUES FROM ('{}') TO ('{}')".format(
+                qn(name), qn(table), month.isoformat(), add_months(month, 1).isoformat()))
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def ensure_future_partitions(months_ahead=3, table=TABLE, today=None):
+    """
+    Create the partitions of the current month and of the next months_ahead months.
+    """
+    if not is_partitioned(table):
+        raise PartitioningError('{} is not partitioned; run the conversion first.'.format(table))
+    this_month = month_start(today or date.today())
+    with transaction.atomic():
+        return create_partitions(this_month, add_months(this_month, months_ahead), table)
+
+
+def get_index_definitions(cursor, table):
+    cursor.execute(
+        "SELECT indexrelid::regclass::text, indisunique, pg_get_indexdef(indexrelid) FROM pg_index "
+        "WHERE indrelid = %s::regclass AND NOT indisprimary ORDER BY indexrelid",
+        [table],
+    )
+    definitions = []
+    for name, unique, definition in cursor.fetchall():
+        if unique:
+            raise PartitioningError(
+                'Unique index {} of {} does not include {}, which partitioned tables require.'.format(
+                    name, table, PARTITION_KEY))
+        definitions.append((name, definition))
+    return definitions
+
+
+def get_foreign_keys(cursor, table):
+    cursor.execute("SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                   "WHERE conrelid = %s::regclass AND contype = 'f' ORDER BY conname", [table])
+    return cursor.fetchall()
+
+
+def build_partitioned_table(cursor, source, target, months_ahead=3):
+    """
+    Create target as a partitioned table with the columns of source, with monthly partitions covering the rows of
+    source and the next months_ahead months plus a DEFAULT partition, and copy the rows of source into it.
+
+    Returns:
+        tuple: (number of monthly partitions, number of rows copied).
+    """
+    cursor.execute('SELECT MIN({0}), MAX({0}) FROM {1}'.format(qn(PARTITION_KEY), qn(source)))
+    first, last = cursor.fetchone()
+    this_month = month_start(date.today())
+    first = month_start(first) if first else this_month
+    last = add_months(this_month, months_ahead) if last is None else max(last, add_months(this_month, months_ahead))
+    cursor.execute('CREATE TABLE {} (LIKE {}) PARTITION BY RANGE ({})'.format(
+        qn(target), qn(source), qn(PARTITION_KEY)))
+    partitions = create_partitions(first, last, target, cursor)
+    cursor.execute('CREATE TABLE {} PARTITION OF {} DEFAULT'.format(qn(target + '_default'), qn(target)))
+    cursor.execute('INSERT INTO {} SELECT * FROM {}'.format(qn(target), qn(source)))
+    return len(partitions), cursor.rowcount
+
+
+def add_keys(cursor, table, index_definitions, foreign_keys):
+    pk = BorrowedBooks._meta.pk.column
+    cursor.execute('ALTER TABLE {} ADD CONSTRAINT {} PRIMARY KEY ({}, {})'.format(
+        qn(table), qn(table + '_pkey'), qn(pk), qn(PARTITION_KEY)))
+    for _, definition in index_definitions:
+        cursor.execute(definition)
+    for name, definition in foreign_keys:
+        cursor.execute('ALTER TABLE {} ADD CONSTRAINT {} {}'.format(qn(table), qn(name), definition))
+
+
+def convert_to_partitioned(months_ahead=3, table=TABLE):
+    """
+    Convert the loans table into a table partitioned by month of BorrowDate, keeping its rows, indexes, foreign
+    keys and ids.
+
+    Returns:
+        dict: Number of monthly partitions created and of rows copied.
+    """
+    if is_partitioned(table):
+        raise PartitioningError('{} is already partitioned.'.format(table))
+    pk = BorrowedBooks._meta.pk.column
+    sequence = '{}_{}_seq'.format(table, pk)
+    monolithic = table + '_monolithic'
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('LOCK TABLE {} IN ACCESS EXCLUSIVE MODE'.format(qn(table)))
+        cursor.execute("SELECT conrelid::regclass::text FROM pg_constraint WHERE confrelid = %s::regclass "
+                       "AND contype = 'f'", [table])
+        referencing = [name for name, in cursor.fetchall()]
+        if referencing:
+            raise PartitioningError(
+                'Foreign keys of {} reference {}; apply the library migrations, which remove them.'.format(
+                    ', '.join(referencing), table))
+        index_definitions = get_index_definitions(cursor, table)
+        foreign_keys = get_foreign_keys(cursor, table)
+        cursor.execute('SELECT MAX({}) FROM {}'.format(qn(pk), qn(table)))
+        last_id = cursor.fetchone()[0]
+
+        cursor.execute('ALTER TABLE {} RENAME TO {}'.format(qn(table), qn(monolithic)))
+        partitions, rows = build_partitioned_table(cursor, monolithic, table, months_ahead)
+        # Drops the old indexes and id sequence, whose names are reused below
+        cursor.execute('DROP TABLE {}'.format(qn(monolithic)))
+        add_keys(cursor, table, index_definitions, foreign_keys)
+
+        cursor.execute('CREATE SEQUENCE {} OWNED BY {}.{}'.format(qn(sequence), qn(table), qn(pk)))
+        cursor.execute('SELECT setval(%s, %s, %s)', [sequence, last_id or 1, last_id is not None])
+        cursor.execute("ALTER TABLE {} ALTER COLUMN {} SET DEFAULT nextval('{}')".format(
+            qn(table), qn(pk), sequence))
+        cursor.execute('ANALYZE {}'.format(qn(table)))
+    return {'partitions': partitions, 'rows': rows}
+
+
+def create_partitioned_copy(target, months_ahead=3, source=TABLE):
+    """
+    Create target as a partitioned copy of the (unpartitioned) loans table with equivalent indexes, to compare both
+    layouts on the same data (see benchmarks.py).
+    """
+    check_postgresql()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('DROP TABLE IF EXISTS {}'.format(qn(target)))
+        index_definitions = [
+            (None, re.sub(r'^CREATE INDEX \S+ ON \S+ ',
+                          'CREATE INDEX {} ON {} '.format(qn('{}_idx{}'.format(target, number)), qn(target)),
+                          definition))
+            for number, (_, definition) in enumerate(get_index_definitions(cursor, source))
+        ]
+        build_partitioned_table(cursor, source, target, months_ahead)
+        add_keys(cursor, target, index_definitions, [])
+        cursor.execute('ANALYZE {}'.format(qn(target)))
+
+
+def archive_partitions(keep_months, schema=None, drop=False, force=False, table=TABLE, today=None):
+    """
+    Detach the monthly partitions ending before the first of the keep_months most recent months, then move them to
+    schema or drop them.
+
+    Returns:
+        tuple: The names of the partitions archived and of those skipped because they hold open loans.
+    """
+    if not is_partitioned(table):
+        raise PartitioningError('{} is not partitioned; run the conversion first.'.format(table))
+    if not drop and not schema:
+        raise PartitioningError('Pass the schema to move detached partitions to, or drop them.')
+    cutoff = add_months(month_start(today or date.today()), -keep_months)
+    archived, skipped = [], []
+    with connection.cursor() as cursor:
+        if schema and not drop:
+            cursor.execute('CREATE SCHEMA IF NOT EXISTS {}'.format(qn(schema)))
+        for partition in list_partitions(table):
+            if partition.end is None or partition.end > cutoff:
+                continue
+            with transaction.atomic():
+                cursor.execute('SELECT EXISTS (SELECT 1 FROM {} WHERE NOT {})'.format(
+                    qn(partition.name), qn('HasBeenReturned')))
+                if cursor.fetchone()[0] and not force:
+                    skipped.append(partition.name)
+                    continue
+                cursor.execute('ALTER TABLE {} DETACH PARTITION {}'.format(qn(table), qn(partition.name)))
+                if drop:
+                    cursor.execute('DROP TABLE {}'.format(qn(partition.name)))
+                else:
+                    cursor.execute('ALTER TABLE {} SET SCHEMA {}'.format(qn(partition.name), qn(schema)))
+            archived.append(partition.name)
+    if archived and table == TABLE:
+        cache.invalidate_lists(BorrowedBooks)
+    return archived, skipped
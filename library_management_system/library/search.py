@@ -0,0 +1,133 @@
+"""
+search.py
+
+This module contains the full-text search engine over the Book catalog.
+
+Search documents:
+    - Every book has one BookSearchIndex row holding a weighted tsvector built from
+      Title and ISBN (weight A), Genre (weight B), and the Publisher (weight C) and Language (weight D) of its BookDetails.
+    - The tsvector column is GIN indexed, so matching a query does not scan the catalog.
+    - Documents are refreshed by the post_save/post_delete handlers in signals.py and can be rebuilt in bulk
+      with the rebuild_search_index management command.
+
+search_books:
+    - Ranks books matching a websearch-style query with SearchRank.
+    - Falls back to trigram similarity on Title (GIN trigram index) when the full-text query matches nothing,
+      so misspelled titles still find their book.
+    - Supports exact filters on genre, language and publisher.
+    - On databases other than PostgreSQL, falls back to case-insensitive substring matching.
+
+Usage:
+    - Requires 'django.contrib.postgres' in INSTALLED_APPS and the pg_trgm extension (created by the migrations).
+"""
+
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connection
+from django.db.models import F, Q
+
+from .models import Book, BookDetails, BookSearchIndex
+
+TRIGRAM_THRESHOLD = 0.3
+
+
+def get_search_config():
+    return getattr(settings, 'LIBRARY_SEARCH_CONFIG', 'english')
+
+
+def is_postgresql():
+    return connection.vendor == 'postgresql'
+
+
+def update_search_documents(book_ids=None, id_range=None):
+    """
+    Builds the search documents of the given books (or of every book in the [start, end) id range)
+    with a single INSERT ... SELECT, creating missing documents and replacing existing ones.
+    Does nothing on databases other than PostgreSQL.
+
+    Returns:
+        int: The number of documents written.
+    """
+    if not is_postgresql():
+        return 0
+
+    book_table = Book._meta.db_table
+    details_table = BookDetails._meta.db_table
+    index_table = BookSearchIndex._meta.db_table
+    if book_ids is not None:
+        where, params = 'b."BookID" = ANY(%s)', [list(book_ids)]
+    elif id_range is not None:
+        where, params = 'b."BookID" >= %s AND b."BookID" < %s', list(id_range)
+    else:
+        where, params = 'TRUE', []
+
+    config = get_search_config()
+    sql = """
+        INSERT INTO "{index_table}" ("BookID_id", "Document")
+        SELECT b."BookID",
+               setweight(to_tsvector(%s, coalesce(b."Title", '') || ' ' || coalesce(b."ISBN", '')), 'A')
+               || setweight(to_tsvector(%s, coalesce(b."Genre", '')), 'B')
+               || setweight(to_tsvector(%s, coalesce(d."Publisher", '')), 'C')
+               || setweight(to_tsvector(%s, coalesce(d."Language", '')), 'D')
+        FROM "{book_table}" b
+        LEFT JOIN "{details_table}" d ON d."BookID_id" = b."BookID"
+        WHERE {where}
+        ON CONFLICT ("BookID_id") DO UPDATE SET "Document" = EXCLUDED."Document"
+    """.format(index_table=index_table, book_table=book_table, details_table=details_table, where=where)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [config] * 4 + params)
+        return cursor.rowcount
+
+
+def apply_filters(queryset, params):
+    """
+    Applies the exact-match catalog filters (genre, language, publisher, isbn) found in params.
+    """
+    filters = {
+        'genre': 'Genre__iexact',
+        'language': 'bookdetails__Language__iexact',
+        'publisher': 'bookdetails__Publisher__iexact',
+        'isbn': 'ISBN',
+    }
+    for param, lookup in filters.items():
+        value = params.get(param)
+        if value:
+            queryset = queryset.filter(**{lookup: value})
+    return queryset
+
+
+def filter_substring(queryset, text):
+    """
+    Restricts a Book queryset to the books containing text in any searched field (case-insensitive substring
+    match, which no index serves).
+    """
+    return queryset.filter(
+        Q(Title__icontains=text) | Q(ISBN__icontains=text) | Q(Genre__icontains=text)
+        | Q(bookdetails__Publisher__icontains=text) | Q(bookdetails__Language__icontains=text)
+    )
+
+
+def search_books(text, params):
+    """
+    Returns a queryset of books matching text, ordered by relevance, restricted by the filters in params.
+    Without text, returns the filtered catalog ordered by BookID.
+    """
+    queryset = apply_filters(Book.objects.select_related('bookdetails'), params)
+    if not text:
+        return queryset.order_by('BookID')
+
+    if not is_postgresql():
+        return filter_substring(queryset, text).order_by('BookID')
+
+    query = SearchQuery(text, config=get_search_config(), search_type='websearch')
+    ranked = queryset.filter(searchindex__Document=query).annotate(
+        rank=SearchRank(F('searchindex__Document'), query)
+    ).order_by('-rank', 'BookID')
+    if ranked.exists():
+        return ranked
+
+    # Nothing matched the full-text query: look for similar titles instead (typos, partial words)
+    return queryset.filter(Title__trigram_similar=text).annotate(
+        rank=TrigramSimilarity('Title', text)
+    ).filter(rank__gte=TRIGRAM_THRESHOLD).order_by('-rank', 'BookID')
@@ -0,0 +1,129 @@
+"""
+seeding.py
+
+This module generates synthetic library data in bulk, for benchmarks and for trying the API on a realistic volume.
+
+seed:
+    - Creates the requested number of users, books (with BookDetails for most of them and a BookInventory for each)
+      and loans with bulk_create, in batches, so millions of rows can be generated in minutes.
+    - The data is reproducible: the same counts and random seed always produce the same rows (apart from the
+      auto-generated ids when the tables are not empty).
+    - Loans borrowed more than 30 days before today are returned (some of them late, with the matching fee); newer
+      loans are left open as long as the book has a copy available.
+    - Bulk inserts do not send signals, so the search documents, inventories, loan statistics, cached catalog
+      lists and list versions (see conditional.py) are brought up to date at the end, like after the import_catalog
+      command.
+
+Usage:
+    from library.seeding import seed
+    seed(users=1000, books=5000, loans=50000, random_seed=42)
+"""
+
+
+import random
+from collections import Counter
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Max
+
+from . import cache, stats
+from .models import User, Book, BookDetails, BookInventory, BorrowedBooks, OVERDUE_FEE_PER_DAY
+from .search import update_search_documents
+
+WORDS = [
+    'river', 'shadow', 'garden', 'empire', 'winter', 'silent', 'golden', 'journey', 'secret', 'ocean',
+    'forest', 'city', 'night', 'storm', 'memory', 'light', 'stone', 'crown', 'letter', 'island',
+]
+GENRES = ['Fiction', 'Mystery', 'Science Fiction', 'Fantasy', 'Biography', 'History', 'Science', 'Poetry']
+PUBLISHERS = ['Penguin', 'HarperCollins', 'Macmillan', 'Hachette', 'Simon & Schuster', 'Scholastic']
+LANGUAGES = ['English', 'Hindi', 'French', 'German', 'Spanish']
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def random_date(rng, start, days):
+    return start + timedelta(days=rng.randrange(days))
+
+
+def batches(count, batch_size):
+    for start in range(0, count, batch_size):
+        yield range(start, min(start + batch_size, count))
+
+
+def seed(users, books, loans, random_seed=0, batch_size=5000, details_ratio=0.8):
+    """
+    Generate users, books (with details and inventories) and loans.
+
+    Returns:
+        dict: The number of rows created per model.
+    """
+    rng = random.Random(random_seed)
+    today = date.today()
+    created = Counter(dict.fromkeys(['User', 'Book', 'BookDetails', 'BorrowedBooks'], 0))
+
+    with transaction.atomic():
+        user_ids = []
+        first = next_id(User)
+        for batch in batches(users, batch_size):
+            objs = User.objects.bulk_create([
+                User(Name='User {}'.format(first + i), Email='user{}@example.com'.format(first + i),
+                     MembershipDate=random_date(rng, today - timedelta(days=3650), 3650))
+                for i in batch
+            ])
+            user_ids.extend(obj.pk for obj in objs)
+        created['User'] = len(user_ids)
+
+        book_ids, copies = [], {}
+        first = next_id(Book)
+        for batch in batches(books, batch_size):
+            objs = Book.objects.bulk_create([
+                Book(Title=' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title(),
+                     ISBN='9{:012d}'.format(first + i), Genre=rng.choice(GENRES),
+                     PublishedDate=random_date(rng, date(1950, 1, 1), 365 * 70))
+                for i in batch
+            ])
+            details = BookDetails.objects.bulk_create([
+                BookDetails(BookID=obj, NumberOfPages=rng.randint(50, 1200), Publisher=rng.choice(PUBLISHERS),
+                            Language=rng.choice(LANGUAGES))
+                for obj in objs if rng.random() < details_ratio
+            ])
+            for obj in objs:
+                copies[obj.pk] = rng.randint(1, 5)
+            book_ids.extend(obj.pk for obj in objs)
+            created['BookDetails'] += len(details)
+        created['Book'] = len(book_ids)
+
+        open_loans = Counter()
+        for batch in batches(loans if user_ids and book_ids else 0, batch_size):
+            objs = []
+            for _ in batch:
+                book_id = rng.choice(book_ids)
+                borrow_date = random_date(rng, today - timedelta(days=730), 730)
+                return_date = borrow_date + timedelta(days=rng.randint(1, 30))
+                loan = BorrowedBooks(UserID_id=rng.choice(user_ids), BookID_id=book_id,
+                                     BorrowDate=borrow_date, ReturnDate=return_date)
+                if borrow_date >= today - timedelta(days=30) and open_loans[book_id] < copies[book_id]:
+                    open_loans[book_id] += 1
+                else:
+                    late_days = rng.choice([0, 0, 0, rng.randint(1, 20)])
+                    loan.ReturnDate = return_date + timedelta(days=late_days)
+                    loan.Fee = late_days * OVERDUE_FEE_PER_DAY
+                    loan.HasBeenReturned = True
+                objs.append(loan)
+            created['BorrowedBooks'] += len(BorrowedBooks.objects.bulk_create(objs))
+
+        BookInventory.objects.bulk_create([
+            BookInventory(BookID_id=book_id, TotalCopies=copies[book_id],
+                          AvailableCopies=copies[book_id] - open_loans[book_id])
+            for book_id in book_ids
+        ], batch_size=batch_size)
+        if book_ids:
+            update_search_documents(id_range=(book_ids[0], book_ids[-1] + 1))
+        stats.rebuild(batch_size=batch_size)
+
+    for model in (User, Book, BookDetails, BorrowedBooks):
+        cache.invalidate_lists(model)
+    return dict(created)
@@ -7,26 +7,57 @@ UserSerializer:
     - Serializes User model instances.
     - Inherits from serializers.ModelSerializer.
     - Meta class specifies the model and fields to include in the serialization.
+    - Supports sparse fieldsets (fields/exclude query parameters) through DynamicFieldsMixin (see fieldsets.py).
 
 BookSerializer:
     - Serializes Book model instances.
     - Inherits from serializers.ModelSerializer.
     - Meta class specifies the model and fields to include in the serialization.
+    - Supports sparse fieldsets (fields/exclude query parameters) through DynamicFieldsMixin (see fieldsets.py).
 
 BookDetailsSerializer:
     - Serializes BookDetails model instances.
     - Inherits from serializers.ModelSerializer.
     - Meta class specifies the model and fields to include in the serialization.
+    - Supports sparse fieldsets (fields/exclude query parameters) through DynamicFieldsMixin (see fieldsets.py).
 
 BorrowedBooksSerializer:
     - Serializes BorrowedBooks model instances.
     - Inherits from serializers.ModelSerializer.
     - Meta class specifies the model and fields to include in the serialization.
+    - Supports sparse fieldsets (fields/exclude query parameters) through DynamicFieldsMixin (see fieldsets.py).
     - Includes custom validation to ensure a valid timeframe between BorrowDate and ReturnDate.
 
+BookWithDetailsSerializer:
+    - Read-only serializer for Book model instances with their BookDetails embedded under "BookDetails".
+    - "BookDetails" is null for books without details.
+    - Expects querysets built with select_related('bookdetails') so no extra query is issued per book.
+    - Supports sparse fieldsets of its top-level fields through DynamicFieldsMixin (see fieldsets.py).
+
+BorrowedBooksExpandedSerializer:
+    - Read-only serializer for BorrowedBooks model instances with the User and Book embedded in place of their ids.
+    - Expects querysets built with select_related('UserID', 'BookID') so no extra query is issued per loan.
+    - Supports sparse fieldsets of its top-level fields through DynamicFieldsMixin (see fieldsets.py).
+
+BookInventorySerializer:
+    - Serializes BookInventory model instances.
+    - Only TotalCopies is writable; AvailableCopies is maintained by borrows and returns.
+
+UserLoanStatsSerializer, BookLoanStatsSerializer, GenreLoanStatsSerializer, DailyLoanVolumeSerializer:
+    - Serialize the loan statistics aggregate rows.
+    - Inherit from serializers.ModelSerializer with all fields included.
+
+LoginSerializer:
+    - Inherits from TokenObtainPairSerializer provided by the rest_framework_simplejwt library.
+    - Adds the username claim to the issued tokens (user_id is embedded by default), so authenticated requests
+      can build the user from the token alone.
+    - Adds user_id to the response data, taken from the user authenticated during validation.
+
 Usage:
     - Integrate these serializers into your Django app for converting model instances to and from JSON.
     - Use these serializers in conjunction with Django REST Framework views to handle data serialization and deserialization.
+    - The model serializers record the time spent in serializer.data in the request metrics through
+      TimedSerializerMixin (see metrics.py).
 
 Author: Suyamoon Pathak
 Date: 01-02-2024
@@ -35,25 +66,29 @@ Date: 01-02-2024
 
 
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .fieldsets import DynamicFieldsMixin
+from .metrics import TimedSerializerMixin
 from .models import User, Book, BookDetails, BorrowedBooks
+from .models import BookInventory, UserLoanStats, BookLoanStats, GenreLoanStats, DailyLoanVolume
 from datetime import timedelta
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = '__all__'
 
-class BookSerializer(serializers.ModelSerializer):
+class BookSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Book
         fields = '__all__'
 
-class BookDetailsSerializer(serializers.ModelSerializer):
+class BookDetailsSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = BookDetails
         fields = '__all__'
 
-class BorrowedBooksSerializer(serializers.ModelSerializer):
+class BorrowedBooksSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = BorrowedBooks
         fields = '__all__'
@@ -77,4 +112,60 @@ class BorrowedBooksSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("ReturnDate cannot be more than a month far from the BorrowDate.")
         return data
 
+class BookWithDetailsSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
+    BookDetails = BookDetailsSerializer(source='bookdetails', read_only=True, allow_null=True)
+
+    class Meta:
+        model = Book
+        fields = ['BookID', 'Title', 'ISBN', 'PublishedDate', 'Genre', 'BookDetails']
+
+class BorrowedBooksExpandedSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
+    UserID = UserSerializer(read_only=True)
+    BookID = BookSerializer(read_only=True)
+
+    class Meta:
+        model = BorrowedBooks
+        fields = ['id', 'BorrowDate', 'ReturnDate', 'HasBeenReturned', 'Fee', 'UserID', 'BookID']
+
+class BookInventorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = BookInventory
+        fields = '__all__'
+        read_only_fields = ['BookID', 'AvailableCopies']
+
+    def validate_TotalCopies(self, value):
+        if value < 0:
+            raise serializers.ValidationError("TotalCopies cannot be negative.")
+        return value
+
+class UserLoanStatsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = UserLoanStats
+        fields = '__all__'
+
+class BookLoanStatsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = BookLoanStats
+        fields = '__all__'
 
+class GenreLoanStatsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = GenreLoanStats
+        fields = '__all__'
+
+class DailyLoanVolumeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = DailyLoanVolume
+        fields = '__all__'
+
+class LoginSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['username'] = user.get_username()
+        return token
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        data['user_id'] = self.user.id
+        return data
@@ -0,0 +1,78 @@
+"""
+signals.py
+
+This module contains the signal handlers of the Library Management System app.
+
+invalidate_catalog_cache:
+    - Connected to post_save and post_delete of Book and BookDetails.
+    - Drops the cached payload of the changed instance and invalidates the cached list pages of its model
+      once the surrounding transaction has committed, so a concurrent reader cannot cache the old row again.
+
+refresh_search_document:
+    - Connected to post_save of Book and to post_save and post_delete of BookDetails.
+    - Rebuilds the full-text search document of the affected book once the transaction has committed.
+
+create_book_inventory:
+    - Connected to post_save of Book.
+    - Creates the BookInventory (one copy) of every new book, in the same transaction as the book.
+
+invalidate_list_version:
+    - Connected to post_save and post_delete of User and BorrowedBooks.
+    - Replaces the list version of the model once the transaction has committed, so conditional list requests
+      (see conditional.py) see the change.
+
+record_change_event:
+    - Connected to post_save and post_delete of BorrowedBooks, Book, BookDetails and BookInventory.
+    - Writes the change event of the instance to the outbox (see changes.py), in the transaction of the change.
+
+Usage:
+    - The handlers are connected when the app is ready (see LibraryConfig.ready in apps.py).
+"""
+
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache, changes
+from .search import update_search_documents
+from .models import User, Book, BookDetails, BookInventory, BorrowedBooks
+
+
+@receiver([post_save, post_delete], sender=Book)
+@receiver([post_save, post_delete], sender=BookDetails)
+def invalidate_catalog_cache(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: cache.invalidate(sender, pk))
+
+
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=BorrowedBooks)
+def invalidate_list_version(sender, **kwargs):
+    transaction.on_commit(lambda: cache.invalidate_lists(sender))
+
+
+@receiver(post_save, sender=Book)
+@receiver([post_save, post_delete], sender=BookDetails)
+def refresh_search_document(sender, instance, **kwargs):
+    book_id = instance.pk if sender is Book else instance.BookID_id
+    transaction.on_commit(lambda: update_search_documents([book_id]))
+
+
+@receiver(post_save, sender=Book)
+def create_book_inventory(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        BookInventory.objects.get_or_create(BookID=instance)
+
+
+@receiver([post_save, post_delete], sender=BorrowedBooks)
+@receiver([post_save, post_delete], sender=Book)
+@receiver([post_save, post_delete], sender=BookDetails)
+@receiver([post_save, post_delete], sender=BookInventory)
+def record_change_event(sender, instance, signal, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    if signal is post_delete:
+        changes.record_change(instance, changes.DELETED)
+    else:
+        changes.record_change(instance, changes.CREATED if created else changes.UPDATED)
@@ -0,0 +1,192 @@
+"""
+stats.py
+
+This module maintains the loan statistics aggregate tables (UserLoanStats, BookLoanStats, GenreLoanStats and
+DailyLoanVolume) incrementally, so dashboards read a handful of precomputed rows instead of aggregating the whole
+BorrowedBooks table.
+
+record_borrows:
+    - Adds newly created loans to the aggregates.
+
+record_returns:
+    - Moves returned loans from the open to the returned aggregates and adds the fees charged on return.
+
+record_fee_accruals:
+    - Adds the fees accrued on open overdue loans (see overdue.py) to the users' outstanding fees.
+
+record_deletions:
+    - Removes deleted loans, open or returned, from the aggregates.
+
+rebuild:
+    - Recomputes every aggregate table from BorrowedBooks with a few grouped queries (see the rebuild_loan_stats
+      management command). Use it after changes made outside the API (e.g. raw SQL updates).
+
+Usage:
+    - Call record_borrows/record_returns inside the transaction that creates or returns the loans, so the
+      aggregates are committed (or rolled back) together with them.
+    - Changes from several loans are grouped first, so one UPDATE is issued per affected aggregate row. Rows are
+      updated in key order, so concurrent transactions lock them in the same order and cannot deadlock.
+"""
+
+
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+
+from .models import BorrowedBooks, BookLoanStats, DailyLoanVolume, GenreLoanStats, UserLoanStats
+
+
+def month_of(day):
+    return day.replace(day=1)
+
+
+def increment(model, lookup, **deltas):
+    """
+    Adds deltas to the counters of the aggregate row identified by lookup, creating the row if needed.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Created concurrently by another transaction in the meantime
+        model.objects.filter(**lookup).update(**changes)
+
+
+def record_borrows(loans):
+    """
+    Adds newly created loans to the aggregates.
+    The BookID of every loan must be a loaded Book instance (as in validated serializer data), to read its Genre.
+    """
+    users, books, genres, days = Counter(), Counter(), Counter(), Counter()
+    for loan in loans:
+        month = month_of(loan.BorrowDate)
+        users[loan.UserID_id] += 1
+        books[(loan.BookID_id, month)] += 1
+        genres[(loan.BookID.Genre, month)] += 1
+        days[loan.BorrowDate] += 1
+
+    for user_id, count in sorted(users.items()):
+        increment(UserLoanStats, {'UserID_id': user_id}, TotalLoans=count, OpenLoans=count)
+    for (book_id, month), count in sorted(books.items()):
+        increment(BookLoanStats, {'BookID_id': book_id, 'Month': month}, BorrowCount=count)
+    for (genre, month), count in sorted(genres.items()):
+        increment(GenreLoanStats, {'Genre': genre, 'Month': month}, BorrowCount=count)
+    for day, count in sorted(days.items()):
+        increment(DailyLoanVolume, {'Day': day}, Borrowed=count)
+
+
+def record_returns(returns):
+    """
+    Updates the aggregates for returned loans.
+
+    Parameters:
+        returns: Iterable of (loan, previous_fee) pairs, where loan has already been marked as returned
+            and previous_fee is the Fee it carried while it was still open.
+    """
+    users = defaultdict(Counter)
+    days = defaultdict(Counter)
+    for loan, previous_fee in returns:
+        users[loan.UserID_id].update(OpenLoans=-1, AccruedFees=loan.Fee, OutstandingFees=-previous_fee)
+        days[loan.ReturnDate].update(Returned=1, FeesCharged=loan.Fee)
+
+    for user_id, deltas in sorted(users.items()):
+        increment(UserLoanStats, {'UserID_id': user_id}, **deltas)
+    for day, deltas in sorted(days.items()):
+        increment(DailyLoanVolume, {'Day': day}, **deltas)
+
+
+def record_fee_accruals(fee_changes):
+    """
+    Updates the outstanding fees of users whose open loans accrued overdue fees.
+
+    Parameters:
+        fee_changes: Mapping of user id to the increase of the fees of their open loans.
+    """
+    for user_id, delta in sorted(fee_changes.items()):
+        increment(UserLoanStats, {'UserID_id': user_id}, OutstandingFees=delta)
+
+
+def record_deletions(loans):
+    """
+    Removes deleted loans from the aggregates.
+    The BookID of every loan must be a loaded Book instance, to read its Genre.
+    """
+    users = defaultdict(Counter)
+    books, genres = Counter(), Counter()
+    days = defaultdict(Counter)
+    for loan in loans:
+        month = month_of(loan.BorrowDate)
+        books[(loan.BookID_id, month)] -= 1
+        genres[(loan.BookID.Genre, month)] -= 1
+        days[loan.BorrowDate].update(Borrowed=-1)
+        if loan.HasBeenReturned:
+            users[loan.UserID_id].update(TotalLoans=-1, AccruedFees=-loan.Fee)
+            days[loan.ReturnDate].update(Returned=-1, FeesCharged=-loan.Fee)
+        else:
+            users[loan.UserID_id].update(TotalLoans=-1, OpenLoans=-1, OutstandingFees=-loan.Fee)
+
+    for user_id, deltas in sorted(users.items()):
+        increment(UserLoanStats, {'UserID_id': user_id}, **deltas)
+    for (book_id, month), count in sorted(books.items()):
+        increment(BookLoanStats, {'BookID_id': book_id, 'Month': month}, BorrowCount=count)
+    for (genre, month), count in sorted(genres.items()):
+        increment(GenreLoanStats, {'Genre': genre, 'Month': month}, BorrowCount=count)
+    for day, deltas in sorted(days.items()):
+        increment(DailyLoanVolume, {'Day': day}, **deltas)
+
+
+@transaction.atomic
+def rebuild(batch_size=5000):
+    """
+    Recomputes every aggregate table from BorrowedBooks.
+
+    Returns:
+        dict: Number of rows written per aggregate model name.
+    """
+    returned, still_open = Q(HasBeenReturned=True), Q(HasBeenReturned=False)
+    loans = BorrowedBooks.objects.order_by()
+    for model in (UserLoanStats, BookLoanStats, GenreLoanStats, DailyLoanVolume):
+        model.objects.all().delete()
+
+    users = loans.values('UserID').annotate(
+        TotalLoans=Count('id'),
+        OpenLoans=Count('id', filter=still_open),
+        AccruedFees=Coalesce(Sum('Fee', filter=returned), 0),
+        OutstandingFees=Coalesce(Sum('Fee', filter=still_open), 0),
+    )
+    books = loans.annotate(month=TruncMonth('BorrowDate')).values('BookID', 'month').annotate(count=Count('id'))
+    genres = loans.annotate(month=TruncMonth('BorrowDate')).values('BookID__Genre', 'month').annotate(count=Count('id'))
+
+    days = defaultdict(Counter)
+    for row in loans.values('BorrowDate').annotate(count=Count('id')).iterator():
+        days[row['BorrowDate']]['Borrowed'] += row['count']
+    returned_rows = loans.filter(returned).values('ReturnDate').annotate(count=Count('id'), fees=Sum('Fee'))
+    for row in returned_rows.iterator():
+        days[row['ReturnDate']].update(Returned=row['count'], FeesCharged=row['fees'])
+
+    UserLoanStats.objects.bulk_create(
+        (UserLoanStats(UserID_id=row.pop('UserID'), **row) for row in users.iterator()), batch_size=batch_size
+    )
+    BookLoanStats.objects.bulk_create(
+        (BookLoanStats(BookID_id=row['BookID'], Month=row['month'], BorrowCount=row['count'])
+         for row in books.iterator()),
+        batch_size=batch_size,
+    )
+    GenreLoanStats.objects.bulk_create(
+        (GenreLoanStats(Genre=row['BookID__Genre'], Month=row['month'], BorrowCount=row['count'])
+         for row in genres.iterator()),
+        batch_size=batch_size,
+    )
+    DailyLoanVolume.objects.bulk_create(
+        (DailyLoanVolume(Day=day, **counts) for day, counts in days.items()), batch_size=batch_size
+    )
+    return {model.__name__: model.objects.count()
+            for model in (UserLoanStats, BookLoanStats, GenreLoanStats, DailyLoanVolume)}
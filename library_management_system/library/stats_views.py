@@ -0,0 +1,114 @@
+"""
+stats_views.py
+
+This module contains read-only viewsets exposing the loan statistics aggregates (see stats.py).
+Every endpoint reads precomputed rows, so its cost does not grow with the size of the BorrowedBooks table.
+
+UserLoanStatsViewSet:
+    - Endpoint: /library/stats/users/ and /library/stats/users/{user id}/
+    - Per-user total and open loans, accrued fees and outstanding fees.
+    - Ordered by OutstandingFees (highest first).
+
+BookLoanStatsViewSet:
+    - Endpoint: /library/stats/books/?month=YYYY-MM
+    - Per-book borrow counts per month, most borrowed first. Without month, the current month is used.
+
+GenreLoanStatsViewSet:
+    - Endpoint: /library/stats/genres/?month=YYYY-MM
+    - Per-genre borrow counts per month, most borrowed first. Without month, the current month is used.
+
+DailyLoanVolumeViewSet:
+    - Endpoint: /library/stats/daily/?from=YYYY-MM-DD&to=YYYY-MM-DD
+    - Loans borrowed and returned, and fees charged, per day (both bounds optional and inclusive).
+
+Permissions:
+    - Require JWT authentication and an authenticated user, like the other viewsets.
+"""
+
+
+from datetime import date
+
+from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.permissions import IsAuthenticated
+
+from .authentication import TokenUserAuthentication
+from .models import UserLoanStats, BookLoanStats, GenreLoanStats, DailyLoanVolume
+from .serializers import (
+    UserLoanStatsSerializer, BookLoanStatsSerializer, GenreLoanStatsSerializer, DailyLoanVolumeSerializer,
+)
+
+
+class StatsPagination(PageNumberPagination):
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+
+
+def parse_date_param(request, name, parse):
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        return parse(value)
+    except ValueError:
+        raise ValidationError({name: 'Invalid date: {}'.format(value)})
+
+
+def parse_month(value):
+    return date.fromisoformat(value + '-01')
+
+
+class StatsViewSet(viewsets.ReadOnlyModelViewSet):
+    authentication_classes = [TokenUserAuthentication]
+    permission_classes = [IsAuthenticated]
+    pagination_class = StatsPagination
+
+
+class UserLoanStatsViewSet(StatsViewSet):
+    """
+    Per-user loan and fee totals, highest outstanding fees first.
+    """
+    queryset = UserLoanStats.objects.order_by('-OutstandingFees', 'UserID')
+    serializer_class = UserLoanStatsSerializer
+
+
+class MonthlyStatsViewSet(StatsViewSet):
+    def get_queryset(self):
+        month = parse_date_param(self.request, 'month', parse_month) or date.today().replace(day=1)
+        return super().get_queryset().filter(Month=month)
+
+
+class BookLoanStatsViewSet(MonthlyStatsViewSet):
+    """
+    Most borrowed books of a month.
+    """
+    queryset = BookLoanStats.objects.order_by('-BorrowCount', 'BookID')
+    serializer_class = BookLoanStatsSerializer
+
+
+class GenreLoanStatsViewSet(MonthlyStatsViewSet):
+    """
+    Most borrowed genres of a month.
+    """
+    queryset = GenreLoanStats.objects.order_by('-BorrowCount', 'Genre')
+    serializer_class = GenreLoanStatsSerializer
+
+
+class DailyLoanVolumeViewSet(StatsViewSet):
+    """
+    Daily loan volume over an optional date range.
+    """
+    queryset = DailyLoanVolume.objects.order_by('Day')
+    serializer_class = DailyLoanVolumeSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        start = parse_date_param(self.request, 'from', date.fromisoformat)
+        end = parse_date_param(self.request, 'to', date.fromisoformat)
+        if start:
+            queryset = queryset.filter(Day__gte=start)
+        if end:
+            queryset = queryset.filter(Day__lte=end)
+        return queryset
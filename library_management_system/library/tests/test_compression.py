@@ -0,0 +1,64 @@
+import gzip
+from unittest import skipIf
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from library.compression import CompressionMiddleware, accepted_encodings, brotli
+
+BODY = b'{"Title": "The Left Hand of Darkness"}' * 50
+
+
+class AcceptedEncodingsTests(SimpleTestCase):
+    def test_quality_values(self):
+        self.assertEqual(accepted_encodings('gzip, deflate, br'), {'gzip', 'deflate', 'br'})
+        self.assertEqual(accepted_encodings('br;q=0, GZIP;q=0.5'), {'gzip'})
+        self.assertEqual(accepted_encodings('br;q=invalid, gzip'), {'gzip'})
+        self.assertEqual(accepted_encodings(''), set())
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    def respond(self, response, accept_encoding=None, method='get'):
+        extra = {} if accept_encoding is None else {'HTTP_ACCEPT_ENCODING': accept_encoding}
+        request = getattr(RequestFactory(), method)('/library/books/', **extra)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    @skipIf(brotli is None, 'brotli is not installed')
+    def test_brotli_is_preferred(self):
+        response = self.respond(HttpResponse(BODY, headers={'ETag': '"abc"'}), 'gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), BODY)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertEqual(response['ETag'], 'W/"abc"')
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    @skipIf(brotli is None, 'brotli is not installed')
+    def test_brotli_streaming(self):
+        response = self.respond(StreamingHttpResponse(iter([BODY, BODY])), 'br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertFalse(response.has_header('Content-Length'))
+        self.assertEqual(brotli.decompress(b''.join(response.streaming_content)), BODY * 2)
+
+    def test_writes_are_not_brotli_compressed(self):
+        response = self.respond(HttpResponse(BODY), 'br, gzip', method='post')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), BODY)
+
+    def test_gzip_when_brotli_is_refused(self):
+        response = self.respond(HttpResponse(BODY, headers={'ETag': '"abc"'}), 'br;q=0, gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), BODY)
+        self.assertEqual(response['ETag'], 'W/"abc"')
+
+    def test_identity(self):
+        response = self.respond(HttpResponse(BODY))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, BODY)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_small_and_compressed_responses_are_sent_as_they_are(self):
+        response = self.respond(HttpResponse(b'{}'), 'br, gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response = self.respond(HttpResponse(BODY, content_type='application/gzip'), 'br, gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, BODY)
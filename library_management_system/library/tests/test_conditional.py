@@ -0,0 +1,120 @@
+import tempfile
+import time
+from datetime import date
+
+from django.contrib.auth.models import User as AuthUser
+from django.test import TestCase, override_settings
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from library import cache
+from library.models import User
+
+
+class ConditionalListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.auth_user = AuthUser.objects.create_user('librarian', password='secret')
+        User.objects.create(Name='Reader', Email='reader@example.com', MembershipDate=date(2024, 1, 1))
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.auth_user)
+
+    def set_version(self, version):
+        cache.get_cache().set(cache.list_version_key(User), version, None)
+
+    def test_list_has_validators(self):
+        self.set_version(1700000000 * 10 ** 9)
+        response = self.client.get('/library/users/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertEqual(response['Last-Modified'], http_date(1700000000))
+
+    def test_if_none_match_returns_304_without_queries(self):
+        etag = self.client.get('/library/users/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/library/users/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_write_changes_etag(self):
+        etag = self.client.get('/library/users/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create(Name='Other', Email='other@example.com', MembershipDate=date(2024, 1, 1))
+        response = self.client.get('/library/users/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data), 2)
+
+    def test_etag_depends_on_format(self):
+        json_etag = self.client.get('/library/users/?format=json')['ETag']
+        api_etag = self.client.get('/library/users/?format=api')['ETag']
+        self.assertNotEqual(json_etag, api_etag)
+
+    def test_if_modified_since(self):
+        second = 1700000000
+        self.set_version(second * 10 ** 9 + 5)
+        response = self.client.get('/library/users/', HTTP_IF_MODIFIED_SINCE=http_date(second + 1))
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get('/library/users/', HTTP_IF_MODIFIED_SINCE=http_date(second - 1))
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since_within_the_same_second(self):
+        # A second write within the second of the Last-Modified a client holds must not be answered with 304
+        second = 1700000000
+        self.set_version(second * 10 ** 9 + 5)
+        last_modified = self.client.get('/library/users/')['Last-Modified']
+        self.set_version(second * 10 ** 9 + 900)
+        response = self.client.get('/library/users/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Last-Modified'], last_modified)
+
+
+LOCMEM = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+# Two worker processes, each with its own local-memory cache
+@override_settings(
+    CACHES={
+        'default': {'BACKEND': LOCMEM, 'LOCATION': 'default'},
+        'worker-1': {'BACKEND': LOCMEM, 'LOCATION': 'worker-1'},
+        'worker-2': {'BACKEND': LOCMEM, 'LOCATION': 'worker-2'},
+    },
+    LIBRARY_LOCAL_LIST_VERSION_TIMEOUT=0.5,
+)
+class PerProcessCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.auth_user = AuthUser.objects.create_user('librarian', password='secret')
+        User.objects.create(Name='Reader', Email='reader@example.com', MembershipDate=date(2024, 1, 1))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.auth_user)
+
+    def get(self, worker, **headers):
+        with override_settings(LIBRARY_CACHE_ALIAS=worker):
+            return self.client.get('/library/users/', **headers)
+
+    def test_write_in_another_worker_is_seen_after_the_timeout(self):
+        etag = self.get('worker-2')['ETag']
+        with override_settings(LIBRARY_CACHE_ALIAS='worker-1'), self.captureOnCommitCallbacks(execute=True):
+            User.objects.create(Name='Other', Email='other@example.com', MembershipDate=date(2024, 1, 1))
+        self.assertNotEqual(self.get('worker-1', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # worker-2 did not see the write: its stale answers last until its version token expires
+        self.assertEqual(self.get('worker-2', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        time.sleep(0.6)
+        response = self.get('worker-2', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 2)
+
+    def test_shared_cache_versions_do_not_expire(self):
+        self.assertEqual(cache.get_list_version_timeout(), 0.5)
+        with tempfile.TemporaryDirectory() as location:
+            shared = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+            with override_settings(CACHES={'default': shared}):
+                self.assertIsNone(cache.get_list_version_timeout())
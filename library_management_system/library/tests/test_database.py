@@ -0,0 +1,129 @@
+from datetime import date
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User as AuthUser
+from django.db import OperationalError, connection, connections
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from library import cache
+from library.database import REPLICA, ReplicaRouter, read_only_request
+from library.models import Book, BookInventory, BorrowedBooks, User
+from library.serializers import LoginSerializer
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Routing of a replica configured as a test mirror of the default database, as settings.py configures it when
+    DATABASE_REPLICA_HOST is set.
+    """
+    # Resolved when the class is set up, once the replica alias exists
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        connections.settings[REPLICA] = dict(connections['default'].settings_dict, TEST={'MIRROR': 'default'})
+        cls.addClassCleanup(cls.remove_replica)
+        super().setUpClass()
+
+    @classmethod
+    def remove_replica(cls):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.client = APIClient()
+        self.auth_user = AuthUser.objects.create_user('librarian', password='secret')
+        self.client.force_authenticate(self.auth_user)
+        self.user = User.objects.create(Name='Reader', Email='reader@example.com', MembershipDate=date(2024, 1, 1))
+        self.book = Book.objects.create(Title='Dune', ISBN='9780441013593', PublishedDate=date(1965, 8, 1),
+                                        Genre='Science Fiction')
+        BookInventory.objects.filter(BookID=self.book).update(TotalCopies=1, AvailableCopies=1)
+
+    def request(self, method, path, data=None):
+        """
+        Sends a request and returns (response, queries run on the primary, queries run on the replica).
+        """
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = getattr(self.client, method)(path, data, format='json')
+        return response, primary.captured_queries, replica.captured_queries
+
+    def test_router_uses_primary_outside_read_only_requests(self):
+        self.assertEqual(ReplicaRouter().db_for_read(Book), 'default')
+        token = read_only_request.set(True)
+        try:
+            self.assertEqual(ReplicaRouter().db_for_read(Book), REPLICA)
+            self.assertEqual(ReplicaRouter().db_for_write(Book), 'default')
+        finally:
+            read_only_request.reset(token)
+
+    @override_settings(LIBRARY_REPLICA_MAX_LAG=0)
+    def test_get_reads_from_replica(self):
+        response, primary, replica = self.request('get', '/library/users/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([user['Email'] for user in response.data], ['reader@example.com'])
+        self.assertEqual(primary, [])
+        self.assertNotEqual(replica, [])
+
+    @override_settings(LIBRARY_REPLICA_MAX_LAG=0)
+    def test_async_get_reads_from_replica(self):
+        token = str(LoginSerializer.get_token(self.auth_user).access_token)
+        client = AsyncClient()
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = async_to_sync(client.get)('/library/users/', headers={'Authorization': 'Bearer ' + token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(primary.captured_queries, [])
+        self.assertNotEqual(replica.captured_queries, [])
+
+    def test_get_after_recent_write_reads_from_primary(self):
+        response, primary, replica = self.request('get', '/library/users/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(primary, [])
+        self.assertEqual(replica, [])
+
+    @override_settings(LIBRARY_REPLICA_MAX_LAG=0)
+    def test_cached_payload_is_built_from_primary(self):
+        response, primary, replica = self.request('get', '/library/books/{}/'.format(self.book.pk))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(primary, [])
+        self.assertEqual(replica, [])
+
+    def test_writes_and_locks_go_to_primary(self):
+        response, primary, replica = self.request('post', '/library/borrowedbooks/', {
+            'UserID': self.user.pk, 'BookID': self.book.pk, 'BorrowDate': '2024-02-01', 'ReturnDate': '2024-02-10',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(replica, [])
+        self.assertTrue(any(query['sql'].startswith('INSERT') for query in primary))
+
+        loan = BorrowedBooks.objects.get()
+        response, primary, replica = self.request(
+            'put', '/library/borrowedbooks/{}/'.format(loan.pk), {'ReturnDate': '2024-02-08'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(replica, [])
+        self.assertTrue(any(query['sql'].startswith('UPDATE') for query in primary))
+        if connection.features.has_select_for_update:
+            self.assertTrue(any('FOR UPDATE' in query['sql'] for query in primary))
+
+
+class HealthViewTests(TestCase):
+    def test_healthy(self):
+        response = self.client.get('/health')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok', 'databases': {'default': 'ok'}})
+
+    def test_unreachable_database_hides_the_error(self):
+        error = OperationalError('could not connect to server "db.internal" (10.0.0.5), port 5432')
+        with mock.patch.object(connection, 'cursor', side_effect=error), \
+                self.assertLogs('library.database', 'ERROR'):
+            response = self.client.get('/health')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {'status': 'unavailable', 'databases': {'default': 'unavailable'}})
+        self.assertNotIn(b'db.internal', response.content)
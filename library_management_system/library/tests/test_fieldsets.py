@@ -0,0 +1,80 @@
+import re
+from datetime import date
+
+from django.contrib.auth.models import User as AuthUser
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from library import cache
+from library.models import Book, BookDetails, BorrowedBooks, User
+
+
+def selected_columns(sql):
+    """
+    Returns the column names of the SELECT list of a query.
+    """
+    select_list = re.match(r'SELECT (.*?) FROM ', sql).group(1)
+    return [column.split('.')[-1].strip('"') for column in select_list.split(', ')]
+
+
+class SparseFieldsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.auth_user = AuthUser.objects.create_user('librarian', password='secret')
+        cls.user = User.objects.create(Name='Reader', Email='reader@example.com', MembershipDate=date(2024, 1, 1))
+        cls.book = Book.objects.create(Title='Dune', ISBN='9780441013593', PublishedDate=date(1965, 8, 1),
+                                       Genre='Science Fiction')
+        BookDetails.objects.create(BookID=cls.book, NumberOfPages=412, Publisher='Chilton', Language='English')
+        cls.loan = BorrowedBooks.objects.create(UserID=cls.user, BookID=cls.book, BorrowDate=date(2024, 2, 1),
+                                                ReturnDate=date(2024, 2, 10))
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.auth_user)
+
+    def get(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response, [query['sql'] for query in queries.captured_queries]
+
+    def test_list_reads_selected_columns_only(self):
+        response, queries = self.get('/library/books/?fields=BookID,Title')
+        self.assertEqual(response.json(), [{'BookID': self.book.pk, 'Title': 'Dune'}])
+        self.assertEqual(selected_columns(queries[-1]), ['BookID', 'Title'])
+
+    def test_paginated_list_also_reads_ordering_columns(self):
+        response, queries = self.get('/library/borrowedbooks/all/?fields=id,Fee')
+        self.assertEqual(response.json()['results'], [{'id': self.loan.pk, 'Fee': 0}])
+        self.assertEqual(selected_columns(queries[-1]), ['id', 'Fee', 'BorrowDate'])
+
+    def test_exclude_on_retrieve(self):
+        response, queries = self.get('/library/borrowedbooks/{}/?exclude=UserID,BookID,HasBeenReturned'.format(
+            self.loan.pk))
+        self.assertEqual(set(response.json()), {'id', 'BorrowDate', 'ReturnDate', 'Fee'})
+        self.assertEqual(sorted(selected_columns(queries[-1])), ['BorrowDate', 'Fee', 'ReturnDate', 'id'])
+
+    def test_embedded_listings_accept_fieldsets(self):
+        response, _ = self.get('/library/books/with-details/?fields=BookID,BookDetails')
+        self.assertEqual(set(response.json()[0]), {'BookID', 'BookDetails'})
+
+        response, _ = self.get('/library/books/search/?genre=Science%20Fiction&exclude=BookDetails,ISBN')
+        self.assertEqual(set(response.json()['results'][0]), {'BookID', 'Title', 'PublishedDate', 'Genre'})
+
+        response, _ = self.get('/library/borrowedbooks/expanded/?fields=id,UserID')
+        loan = response.json()['results'][0]
+        self.assertEqual(set(loan), {'id', 'UserID'})
+        self.assertEqual(loan['UserID']['Name'], 'Reader')
+
+        response, _ = self.get('/library/users/{}/loans/?fields=id,BookID'.format(self.user.pk))
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'BookID'})
+
+    def test_unknown_fields_are_rejected(self):
+        for path in ('/library/books/?fields=Author', '/library/books/with-details/?exclude=Author',
+                     '/library/books/search/?fields=Author', '/library/borrowedbooks/expanded/?fields=Author'):
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 400, path)
+            self.assertIn('Author', str(response.json()))
@@ -0,0 +1,126 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from django.contrib.auth.models import User as AuthUser
+from django.db import connection
+from django.test import TransactionTestCase, skipUnlessDBFeature
+from rest_framework.test import APIClient
+
+from library.models import Book, BookInventory, BorrowedBooks, User, UserLoanStats
+
+COPIES = 5
+REQUESTS = 200
+THREADS = 20
+UNAVAILABLE = 'No copy of this book is available.'
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentBorrowTests(TransactionTestCase):
+    """
+    Many clients borrowing the last copies of a book at the same time: exactly as many loans as copies are created.
+    Needs row locks: SQLite locks the whole database, so concurrent writers fail instead of waiting.
+    """
+    def setUp(self):
+        self.auth_user = AuthUser.objects.create_user('librarian', password='secret')
+        self.user = User.objects.create(Name='Reader', Email='reader@example.com', MembershipDate=date(2024, 1, 1))
+        self.book = Book.objects.create(Title='Dune', ISBN='9780441013593', PublishedDate=date(1965, 8, 1),
+                                        Genre='Science Fiction')
+        BookInventory.objects.filter(BookID=self.book).update(TotalCopies=COPIES, AvailableCopies=COPIES)
+        self.loan = {'UserID': self.user.pk, 'BookID': self.book.pk,
+                     'BorrowDate': '2024-02-01', 'ReturnDate': '2024-02-10'}
+
+    def run_concurrently(self, send, count):
+        """
+        Calls send(client) count times from THREADS threads started together; returns the responses.
+        """
+        barrier = threading.Barrier(THREADS)
+        local = threading.local()
+
+        def start(_):
+            local.client = APIClient()
+            local.client.force_authenticate(self.auth_user)
+            barrier.wait()
+
+        def call(_):
+            try:
+                return send(local.client)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=THREADS) as executor:
+            list(executor.map(start, range(THREADS)))
+            return list(executor.map(call, range(count)))
+
+    def take_in_turn(self, items):
+        """
+        Returns a function handing out the items one by one to the threads calling it.
+        """
+        items, lock = iter(items), threading.Lock()
+
+        def take():
+            with lock:
+                return next(items)
+        return take
+
+    def assert_inventory_exhausted(self):
+        inventory = BookInventory.objects.get(BookID=self.book)
+        self.assertEqual(inventory.AvailableCopies, 0)
+        self.assertEqual(BorrowedBooks.objects.filter(BookID=self.book).count(), COPIES)
+        self.assertEqual(UserLoanStats.objects.get(UserID=self.user).OpenLoans, COPIES)
+
+    def test_concurrent_borrows(self):
+        responses = self.run_concurrently(
+            lambda client: client.post('/library/borrowedbooks/', self.loan, format='json'), REQUESTS
+        )
+        statuses = [response.status_code for response in responses]
+        self.assertEqual(statuses.count(201), COPIES)
+        self.assertEqual(statuses.count(400), REQUESTS - COPIES)
+        for response in responses:
+            if response.status_code == 400:
+                self.assertIn(UNAVAILABLE, response.data['error'])
+        self.assert_inventory_exhausted()
+
+    def test_concurrent_bulk_borrows(self):
+        batch = 10
+        responses = self.run_concurrently(
+            lambda client: client.post('/library/borrowedbooks/bulk/', [self.loan] * batch, format='json'),
+            REQUESTS // batch,
+        )
+        created = sum(len(response.data['created']) for response in responses)
+        errors = [error for response in responses for error in response.data['errors']]
+        self.assertEqual(created, COPIES)
+        self.assertEqual(len(errors), REQUESTS - COPIES)
+        self.assertTrue(all(error['error'] == [UNAVAILABLE] for error in errors))
+        self.assert_inventory_exhausted()
+
+    def test_overlapping_bulk_requests_in_reverse_order(self):
+        books = [self.book] + [
+            Book.objects.create(Title='Volume {}'.format(number), ISBN='97800000000{:02d}'.format(number),
+                                PublishedDate=date(2000, 1, 1), Genre='Reference')
+            for number in range(9)
+        ]
+        book_ids = [book.pk for book in books]
+        BookInventory.objects.filter(pk__in=book_ids).update(TotalCopies=REQUESTS, AvailableCopies=REQUESTS)
+        loans = [dict(self.loan, BookID=book_id) for book_id in book_ids]
+        # Every other request lists the same books in reverse order
+        borrows = self.take_in_turn([loans if number % 2 else loans[::-1] for number in range(2 * THREADS)])
+        responses = self.run_concurrently(
+            lambda client: client.post('/library/borrowedbooks/bulk/', borrows(), format='json'), 2 * THREADS
+        )
+        self.assertEqual({response.status_code for response in responses}, {201})
+        batches = [[item['loan']['id'] for item in response.data['created']] for response in responses]
+        self.assertEqual(sum(map(len, batches)), 2 * THREADS * len(loans))
+
+        returns = self.take_in_turn([
+            [{'id': loan_id, 'ReturnDate': '2024-02-10'} for loan_id in (batch if number % 2 else batch[::-1])]
+            for number, batch in enumerate(batches)
+        ])
+        responses = self.run_concurrently(
+            lambda client: client.patch('/library/borrowedbooks/bulk-return/', returns(), format='json'),
+            len(batches),
+        )
+        self.assertEqual({response.status_code for response in responses}, {200})
+        for inventory in BookInventory.objects.filter(pk__in=book_ids):
+            self.assertEqual(inventory.AvailableCopies, REQUESTS)
+        self.assertEqual(UserLoanStats.objects.get(UserID=self.user).OpenLoans, 0)
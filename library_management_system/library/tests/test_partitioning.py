@@ -0,0 +1,30 @@
+from datetime import date
+
+from django.test import SimpleTestCase
+
+from library.partitioning import BOUND_RE, TABLE, add_months, month_start, partition_name
+
+
+class PartitionHelpersTests(SimpleTestCase):
+    def test_add_months(self):
+        self.assertEqual(add_months(date(2024, 1, 1), 1), date(2024, 2, 1))
+        self.assertEqual(add_months(date(2024, 11, 1), 2), date(2025, 1, 1))
+        self.assertEqual(add_months(date(2024, 12, 1), 13), date(2026, 1, 1))
+        self.assertEqual(add_months(date(2024, 1, 1), -1), date(2023, 12, 1))
+        self.assertEqual(add_months(date(2024, 3, 1), -27), date(2021, 12, 1))
+        self.assertEqual(add_months(date(2024, 5, 1), 0), date(2024, 5, 1))
+
+    def test_add_months_of_month_start(self):
+        # Partitions are computed from any day of the month
+        self.assertEqual(add_months(month_start(date(2024, 1, 31)), 1), date(2024, 2, 1))
+
+    def test_partition_name(self):
+        self.assertEqual(partition_name(TABLE, date(2024, 3, 1)), 'library_borrowedbooks_p2024_03')
+        self.assertEqual(partition_name('loans', date(1999, 12, 1)), 'loans_p1999_12')
+
+    def test_bound_parsing(self):
+        # Bounds as returned by pg_get_expr(relpartbound, oid)
+        match = BOUND_RE.search("FOR VALUES FROM ('2024-03-01') TO ('2024-04-01')")
+        self.assertEqual((match[1], match[2]), ('2024-03-01', '2024-04-01'))
+        self.assertIsNone(BOUND_RE.search('DEFAULT'))
+        self.assertIsNone(BOUND_RE.search("FOR VALUES FROM (MINVALUE) TO ('2024-04-01')"))
@@ -0,0 +1,61 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User as AuthUser
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from library import cache
+from library.models import Book, BookDetails, BorrowedBooks, User
+
+
+class ListQueryCountTests(TestCase):
+    """
+    The embedded listings read their related rows with select_related, so the number of queries does not depend on
+    the number of rows returned.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.auth_user = AuthUser.objects.create_user('librarian', password='secret')
+        users = [User.objects.create(Name='Reader {}'.format(i), Email='reader{}@example.com'.format(i),
+                                     MembershipDate=date(2024, 1, 1)) for i in range(5)]
+        books = []
+        for i in range(40):
+            book = Book.objects.create(Title='Book {}'.format(i), ISBN='978000000{:04d}'.format(i),
+                                       PublishedDate=date(2000, 1, 1), Genre='Fiction')
+            if i % 2:
+                BookDetails.objects.create(BookID=book, NumberOfPages=100 + i, Publisher='Publisher',
+                                           Language='English')
+            books.append(book)
+        for i in range(60):
+            borrowed = date(2024, 1, 1) + timedelta(days=i)
+            BorrowedBooks.objects.create(UserID=users[i % len(users)], BookID=books[i % len(books)],
+                                         BorrowDate=borrowed, ReturnDate=borrowed + timedelta(days=14))
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.auth_user)
+
+    def get(self, path, num_queries):
+        with self.assertNumQueries(num_queries):
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_books_with_details_query_count(self):
+        response = self.get('/library/books/with-details/', 1)
+        self.assertEqual(len(response.data), 40)
+        self.assertIsNone(response.data[0]['BookDetails'])
+        self.assertEqual(response.data[1]['BookDetails']['NumberOfPages'], 101)
+
+        Book.objects.filter(BookID__in=[book.BookID for book in Book.objects.order_by('-BookID')[:30]]).delete()
+        response = self.get('/library/books/with-details/', 1)
+        self.assertEqual(len(response.data), 10)
+
+    def test_expanded_loans_query_count_does_not_depend_on_page_size(self):
+        for page_size in (5, 50):
+            response = self.get('/library/borrowedbooks/expanded/?page_size={}'.format(page_size), 1)
+            self.assertEqual(len(response.data['results']), page_size)
+            loan = response.data['results'][0]
+            self.assertEqual(set(loan['UserID']), {'UserID', 'Name', 'Email', 'MembershipDate'})
+            self.assertEqual(set(loan['BookID']), {'BookID', 'Title', 'ISBN', 'PublishedDate', 'Genre'})
@@ -0,0 +1,132 @@
+"""
+throttling.py
+
+This module contains the token-bucket throttles protecting the login and signup endpoints.
+
+Password hashing (authenticating a login, creating a user) is deliberately CPU-expensive, so these endpoints are the
+cheapest way to saturate the workers. DRF runs throttles in APIView.initial(), before the handler, so a throttled
+request is answered with 429 Too Many Requests (and a Retry-After header) without hashing anything.
+
+TokenBucketThrottle:
+    - Every client key has a bucket of `burst` tokens refilled at a constant rate; a request takes one token and is
+      throttled when the bucket is empty. Throttled requests do not take a token.
+    - The bucket is a single integer in the shared cache: the time (in milliseconds) at which it will be full again.
+      A request adds the cost of one token to it with cache.incr, which is atomic on the Redis backend, so every
+      worker process sees the same buckets. A full bucket (a time in the past, or an expired key) starts again from
+      now with a plain set; requests racing that reset may each be counted once, so the error is bounded by the
+      number of concurrent requests, never by the bucket size.
+    - The key expires once the bucket is full again, so idle clients cost nothing.
+    - The bucket of a view is configured by its throttle_scope and the throttle's suffix (e.g. "login.ip"); views
+      whose scope has no bucket configured are not throttled.
+
+IPTokenBucketThrottle:
+    - One bucket per client IP address (REMOTE_ADDR, or X-Forwarded-For when REST_FRAMEWORK["NUM_PROXIES"] is set).
+
+UsernameTokenBucketThrottle:
+    - One bucket per username sent in the request body, whatever the client IP, against credential stuffing
+      from many addresses. Requests without a username are left to the IP throttle.
+
+Settings:
+    - LIBRARY_THROTTLE_RATES (dict): "<scope>.<suffix>" -> (rate, burst), where rate is "<tokens>/<period>" with the
+      period in s, min, hour or day, as in DRF's throttle rates.
+    - LIBRARY_THROTTLE_CACHE_ALIAS (string, default: "default"): Cache holding the buckets. Use a cache shared by all
+      worker processes (CACHE_URL) in production; the local-memory cache only limits each process separately.
+
+Usage:
+    class LoginView(TokenObtainPairView):
+        throttle_classes = (IPTokenBucketThrottle, UsernameTokenBucketThrottle)
+        throttle_scope = 'login'
+"""
+
+
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def get_cache():
+    return caches[getattr(settings, 'LIBRARY_THROTTLE_CACHE_ALIAS', 'default')]
+
+
+def parse_rate(rate):
+    """
+    Returns the number of milliseconds needed to refill one token for a rate such as "10/min".
+    """
+    tokens, period = rate.split('/')
+    return DURATIONS[period[0]] * 1000 / int(tokens)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Base class of the token-bucket throttles; subclasses return the client key of a request from get_ident_key.
+    """
+    suffix = None
+
+    def __init__(self):
+        self.retry_after = None
+
+    def get_bucket(self, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope is None:
+            return None
+        return getattr(settings, 'LIBRARY_THROTTLE_RATES', {}).get('{}.{}'.format(scope, self.suffix))
+
+    def get_ident_key(self, request, view):
+        raise NotImplementedError('.get_ident_key() must be overridden')
+
+    def allow_request(self, request, view):
+        bucket = self.get_bucket(view)
+        ident = self.get_ident_key(request, view) if bucket is not None else None
+        if ident is None:
+            return True
+
+        rate, burst = bucket
+        cost = math.ceil(parse_rate(rate))
+        capacity = cost * burst
+        timeout = math.ceil(capacity / 1000)
+        key = 'library:throttle:{}.{}:{}'.format(view.throttle_scope, self.suffix, ident)
+        cache = get_cache()
+        now = int(time.time() * 1000)
+
+        try:
+            full_at = cache.incr(key, cost)
+        except ValueError:
+            full_at = None
+        if full_at is None or full_at - cost < now:
+            cache.set(key, now + cost, timeout)
+            return True
+        if full_at > now + capacity:
+            cache.decr(key, cost)
+            self.retry_after = (full_at - now - capacity) / 1000
+            return False
+        cache.touch(key, timeout)
+        return True
+
+    def wait(self):
+        return self.retry_after
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    suffix = 'ip'
+
+    def get_ident_key(self, request, view):
+        return self.get_ident(request)
+
+
+class UsernameTokenBucketThrottle(TokenBucketThrottle):
+    suffix = 'username'
+
+    def get_ident_key(self, request, view):
+        try:
+            username = request.data.get('username')
+        except AttributeError:
+            return None
+        if not isinstance(username, str) or not username:
+            return None
+        return hashlib.sha256(username.encode()).hexdigest()[:32]
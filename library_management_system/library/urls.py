@@ -4,8 +4,12 @@ urls.py
 This module contains URL configurations for the Library Management System app.
 
 - DefaultRouter is used to automatically generate URL patterns for the viewsets.
-- URLs include endpoints for managing users, books, book details, and borrowed books.
+- URLs include endpoints for managing users, books, book details, borrowed books and book inventories.
 - Additional URLs are provided for user authentication: login and signup.
+- Read-only loan statistics endpoints are registered under stats/ (see stats_views.py).
+- Streaming CSV exports of loans and of the catalog are served under export/ (see export_views.py).
+- Native async read endpoints for books, book details and current loans are served under async/ (see async_views.py).
+- The change feed of loans, books and book details is served under changes/, with long polling (see changes_views.py).
 
 Usage:
     - Include these URLs in your Django app's main URL configuration.
@@ -17,8 +21,12 @@ Date: 01-02-2024
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import UserViewSet, BookViewSet, BookDetailsViewSet, BorrowedBooksViewSet
+from .views import UserViewSet, BookViewSet, BookDetailsViewSet, BorrowedBooksViewSet, BookInventoryViewSet
+from .stats_views import UserLoanStatsViewSet, BookLoanStatsViewSet, GenreLoanStatsViewSet, DailyLoanVolumeViewSet
 from .auth_views import LoginView, SignupView
+from .export_views import ExportView
+from .changes_views import changes_feed
+from . import async_views
 
 # Creating a router to automatically generate URL patterns for viewsets
 router = DefaultRouter()
@@ -26,6 +34,11 @@ router.register(r'users', UserViewSet)
 router.register(r'books', BookViewSet)
 router.register(r'bookdetails', BookDetailsViewSet)
 router.register(r'borrowedbooks', BorrowedBooksViewSet)
+router.register(r'inventory', BookInventoryViewSet)
+router.register(r'stats/users', UserLoanStatsViewSet)
+router.register(r'stats/books', BookLoanStatsViewSet)
+router.register(r'stats/genres', GenreLoanStatsViewSet)
+router.register(r'stats/daily', DailyLoanVolumeViewSet)
 
 urlpatterns = [
     # Include the automatically generated URLs from the router
@@ -34,4 +47,17 @@ urlpatterns = [
     # Additional URLs for user authentication
     path('login/', LoginView.as_view(), name='login'),
     path('signup/', SignupView.as_view(), name='signup'),
+
+    # Streaming exports
+    path('export/<str:dataset>/', ExportView.as_view(), name='export'),
+
+    # Async read endpoints
+    path('async/books/', async_views.book_list, name='async-book-list'),
+    path('async/books/<int:pk>/', async_views.book_detail, name='async-book-detail'),
+    path('async/bookdetails/', async_views.bookdetails_list, name='async-bookdetails-list'),
+    path('async/bookdetails/<int:pk>/', async_views.bookdetails_detail, name='async-bookdetails-detail'),
+    path('async/borrowedbooks/current/', async_views.borrowedbooks_current, name='async-borrowedbooks-current'),
+
+    # Change feed
+    path('changes/', changes_feed, name='changes'),
 ]
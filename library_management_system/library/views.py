@@ -8,18 +8,43 @@ UserViewSet:
     - Handles CRUD operations for the User model.
     - Requires JWT authentication for access.
     - Requires the user to be authenticated.
+    - Builds list responses from .values() rows instead of serializing every instance (see fastpath.py).
+    - Read requests accept the fields and exclude parameters (sparse fieldsets); only the selected columns are
+      read from the database (see fieldsets.py).
+    - List responses carry ETag and Last-Modified headers derived from the version of the listed tables; polling
+      clients get 304 Not Modified while nothing changed (see conditional.py).
+    - Provides an additional action (loans/) listing the loans of a user, filtered and cursor paginated.
 
 BookViewSet:
     - Inherits from viewsets.ModelViewSet.
     - Handles CRUD operations for the Book model.
     - Requires JWT authentication for access.
     - Requires the user to be authenticated.
+    - Serves retrieve and list through the catalog cache (see cache.py), with ETag support.
+    - Builds list responses from .values() rows instead of serializing every instance (see fastpath.py).
+    - Read requests accept the fields and exclude parameters (sparse fieldsets); only the selected columns are
+      read from the database (see fieldsets.py).
+    - List responses carry ETag and Last-Modified headers derived from the version of the listed tables; polling
+      clients get 304 Not Modified while nothing changed (see conditional.py).
+    - Writes run in a transaction together with their change event (see changes.py).
+    - Provides an additional action (with-details/) listing books with their BookDetails embedded, in a single query.
+    - Provides an additional action (search/) for ranked full-text search over the catalog (see search.py).
+    - Provides an additional action (loans/) listing the loans of a book, filtered and cursor paginated.
+    - Provides an additional action (availability/) returning the number of available copies of many books at once,
+      answered from the in-memory availability index (see availability.py) without querying the database.
 
 BookDetailsViewSet:
     - Inherits from viewsets.ModelViewSet.
     - Handles CRUD operations for the BookDetails model.
     - Requires JWT authentication for access.
     - Requires the user to be authenticated.
+    - Serves retrieve and list through the catalog cache (see cache.py), with ETag support.
+    - Builds list responses from .values() rows instead of serializing every instance (see fastpath.py).
+    - Read requests accept the fields and exclude parameters (sparse fieldsets); only the selected columns are
+      read from the database (see fieldsets.py).
+    - List responses carry ETag and Last-Modified headers derived from the version of the listed tables; polling
+      clients get 304 Not Modified while nothing changed (see conditional.py).
+    - Writes run in a transaction together with their change event (see changes.py).
 
 BorrowedBooksViewSet:
     - Inherits from viewsets.ModelViewSet.
@@ -28,10 +53,34 @@ BorrowedBooksViewSet:
     - Requires the user to be authenticated.
     - Includes custom create and update methods for handling borrowing and returning books.
     - Provides additional actions for listing all borrowed books and currently borrowed books.
+    - Provides an additional action (expanded/) listing borrowed books with their User and Book embedded.
+    - Provides bulk actions for borrowing (POST bulk/) and returning (PATCH bulk-return/) many books in one request.
+    - Borrows are rejected when no copy of the book is available (see inventory.py); loans being returned are
+      locked with select_for_update so the same loan cannot be returned twice.
+    - Borrows and returns update the loan statistics aggregates (see stats.py) and write their change events to the
+      outbox (see changes.py) in the same transaction.
+    - Borrows, returns and the bulk actions accept an Idempotency-Key header: a retried request with the same key
+      gets the stored response of the first one instead of being processed again (see idempotency.py).
+    - Listings are paginated with a keyset cursor on (BorrowDate, id); pass stream=true to receive the
+      complete listing as a constant-memory NDJSON stream instead.
+    - Pages of the all/, current/ and default listings are built from .values() rows (see fastpath.py).
+    - Read requests accept the fields and exclude parameters (sparse fieldsets); only the selected columns are
+      read from the database (see fieldsets.py).
+    - List responses carry ETag and Last-Modified headers derived from the version of the listed tables; polling
+      clients get 304 Not Modified while nothing changed (see conditional.py).
+
+BookInventoryViewSet:
+    - Inherits from the list, retrieve and update mixins of viewsets.GenericViewSet.
+    - Lists and updates the number of copies of each book; inventories are created automatically with their book.
+    - Changing TotalCopies adjusts AvailableCopies by the same amount, under a row lock.
+    - Requires JWT authentication for access.
+    - Requires the user to be authenticated.
 
 Usage:
     - Integrate these viewsets into your Django app's URL configuration.
     - Ensure that JWT authentication is set up in your Django project.
+    - Requests are authenticated with TokenUserAuthentication (see authentication.py), which builds request.user
+      from the token claims instead of loading it from the database.
     - Use these viewsets with Django REST Framework views to handle CRUD operations on your models.
 
 Author: Suyamoon Pathak
@@ -39,17 +88,85 @@ Date: 01-02-2024
 """
 
 
-from rest_framework import viewsets,status
+from rest_framework import mixins, viewsets, status
 from rest_framework.response import Response
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import ValidationError, NotFound
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from .models import User, Book, BookDetails, BorrowedBooks
+from django.conf import settings
+from django.db import transaction
+from .models import User, Book, BookDetails, BorrowedBooks, BookInventory, OVERDUE_FEE_PER_DAY
 from .serializers import UserSerializer, BookSerializer, BookDetailsSerializer, BorrowedBooksSerializer
+from .serializers import BookWithDetailsSerializer, BorrowedBooksExpandedSerializer, BookInventorySerializer
+from .authentication import TokenUserAuthentication
+from .availability import availability_index
+from .cache import CachedReadMixin
+from .changes import AtomicWritesMixin
+from .conditional import ConditionalListMixin, conditional_list
+from .fastpath import FastListMixin
+from .fieldsets import SparseFieldsetMixin
+from .idempotency import idempotent
+from .pagination import LoanCursorPagination, SearchResultsPagination, LOAN_ORDERING, stream_ndjson
+from .search import search_books
+from .stats_views import parse_date_param
+from . import cache, changes, inventory, stats
 from datetime import date
 
-class UserViewSet(viewsets.ModelViewSet):
+
+def apply_return(instance, new_return_date):
+    """
+    Applies the return rules to a BorrowedBooks instance without saving it.
+    Charges OVERDUE_FEE_PER_DAY for every day the book is returned past its ReturnDate.
+
+    Raises:
+        ValidationError: If the book has already been returned or the return date is before the BorrowDate.
+    """
+    if instance.HasBeenReturned:
+        raise ValidationError("This book has already been returned.")
+    if new_return_date < instance.BorrowDate:
+        raise ValidationError("ReturnDate cannot be before BorrowDate.")
+    if new_return_date > instance.ReturnDate:
+        overdue_days = (new_return_date - instance.ReturnDate).days
+        instance.Fee = overdue_days * OVERDUE_FEE_PER_DAY
+    else:
+        # Drop any fee accrued while the loan was open (see overdue.py)
+        instance.Fee = 0
+    instance.ReturnDate = new_return_date
+    instance.HasBeenReturned = True
+
+
+def filter_loans(queryset, request):
+    """
+    Applies the loan history filters of the request to a BorrowedBooks queryset.
+      - status: "open" (not returned yet) or "returned".
+      - from / to (YYYY-MM-DD): inclusive BorrowDate range.
+      - overdue=true: only open loans whose ReturnDate has passed.
+
+    Raises:
+        ValidationError: If a filter value is invalid.
+    """
+    params = request.query_params
+    loan_status = params.get('status')
+    if loan_status == 'open':
+        queryset = queryset.filter(HasBeenReturned=False)
+    elif loan_status == 'returned':
+        queryset = queryset.filter(HasBeenReturned=True)
+    elif loan_status:
+        raise ValidationError({'status': 'Must be "open" or "returned".'})
+
+    date_from = parse_date_param(request, 'from', date.fromisoformat)
+    if date_from is not None:
+        queryset = queryset.filter(BorrowDate__gte=date_from)
+    date_to = parse_date_param(request, 'to', date.fromisoformat)
+    if date_to is not None:
+        queryset = queryset.filter(BorrowDate__lte=date_to)
+
+    if params.get('overdue', '').lower() in ('true', '1'):
+        queryset = queryset.filter(HasBeenReturned=False, ReturnDate__lt=date.today())
+    return queryset
+
+
+class UserViewSet(ConditionalListMixin, SparseFieldsetMixin, FastListMixin, viewsets.ModelViewSet):
     """
     UserViewSet handles CRUD operations for the User model.
     Requires JWT authentication for access.
@@ -57,81 +174,218 @@ class UserViewSet(viewsets.ModelViewSet):
     """
     queryset = User.objects.all()
     serializer_class = UserSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [TokenUserAuthentication]
     permission_classes = [IsAuthenticated]
 
+    @action(detail=True, url_path='loans', serializer_class=BorrowedBooksExpandedSerializer,
+            pagination_class=LoanCursorPagination)
+    def loans(self, request, pk=None):
+        """
+        Custom action to list the loans of a user, with the user and book embedded.
+        Supports the status, from, to and overdue filters (see filter_loans), and is cursor paginated on
+        (BorrowDate, id) using the (UserID, BorrowDate, id) index.
+        """
+        user = self.get_object()
+        queryset = filter_loans(BorrowedBooks.objects.filter(UserID=user).select_related('UserID', 'BookID'), request)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(AtomicWritesMixin, ConditionalListMixin, CachedReadMixin, SparseFieldsetMixin, FastListMixin,
+                  viewsets.ModelViewSet):
     """
     BookViewSet handles CRUD operations for the Book model.
     Requires JWT authentication for access.
     Requires the user to be authenticated.
+    Retrieve and list responses are served from the catalog cache.
+    Provides additional actions for listing books together with their details and for searching the catalog.
     """
     queryset = Book.objects.all()
     serializer_class = BookSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [TokenUserAuthentication]
     permission_classes = [IsAuthenticated]
+
+    @action(detail=False, url_path='with-details', serializer_class=BookWithDetailsSerializer)
+    @conditional_list(Book, BookDetails)
+    def list_with_details(self, request):
+        """
+        Custom action to list books with their BookDetails embedded.
+        The details are joined with select_related, so the whole listing is fetched in a single query.
+        """
+        queryset = Book.objects.select_related('bookdetails').order_by('BookID')
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    @action(detail=True, url_path='loans', serializer_class=BorrowedBooksExpandedSerializer,
+            pagination_class=LoanCursorPagination)
+    def loans(self, request, pk=None):
+        """
+        Custom action to list the loans of a book, with the user and book embedded.
+        Supports the status, from, to and overdue filters (see filter_loans), and is cursor paginated on
+        (BorrowDate, id) using the (BookID, BorrowDate, id) index.
+        """
+        book = self.get_object()
+        queryset = filter_loans(BorrowedBooks.objects.filter(BookID=book).select_related('UserID', 'BookID'), request)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, url_path='search', serializer_class=BookWithDetailsSerializer,
+            pagination_class=SearchResultsPagination)
+    def search(self, request):
+        """
+        Custom action to search the catalog.
+        Matches q against Title, ISBN, Genre, Publisher and Language, ranked by relevance, with a fuzzy
+        title match as fallback. The genre, language, publisher and isbn parameters filter the results.
+        """
+        queryset = search_books(request.query_params.get('q', '').strip(), request.query_params)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, url_path='availability')
+    def availability(self, request):
+        """
+        Custom action returning the number of available copies of the books listed in ids (comma-separated).
+        Answered from the in-memory availability index; unknown ids map to null.
+        """
+        max_ids = getattr(settings, 'LIBRARY_AVAILABILITY_MAX_IDS', 10000)
+        try:
+            book_ids = [int(value) for value in request.query_params.get('ids', '').split(',') if value.strip()]
+        except ValueError:
+            raise ValidationError({'ids': 'Must be a comma-separated list of book ids.'})
+        if not book_ids:
+            raise ValidationError({'ids': 'This parameter is required.'})
+        if len(book_ids) > max_ids:
+            raise ValidationError({'ids': 'At most {} book ids can be requested at once.'.format(max_ids)})
+        available = availability_index.get_many(book_ids)
+        return Response({'available_copies': {str(book_id): count for book_id, count in available.items()}})
     
 
-class BookDetailsViewSet(viewsets.ModelViewSet):
+class BookDetailsViewSet(AtomicWritesMixin, ConditionalListMixin, CachedReadMixin, SparseFieldsetMixin, FastListMixin,
+                         viewsets.ModelViewSet):
     """
     BookDetailsViewSet handles CRUD operations for the BookDetails model.
     Requires JWT authentication for access.
     Requires the user to be authenticated.
+    Retrieve and list responses are served from the catalog cache.
     """
     queryset = BookDetails.objects.all()
     serializer_class = BookDetailsSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [TokenUserAuthentication]
     permission_classes = [IsAuthenticated]
 
-class BorrowedBooksViewSet(viewsets.ModelViewSet):
+class BookInventoryViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.UpdateModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    BookInventoryViewSet lists and updates the number of copies of each book.
+    Requires JWT authentication for access.
+    Requires the user to be authenticated.
+    Changing TotalCopies adjusts AvailableCopies by the same amount.
+    """
+    queryset = BookInventory.objects.all()
+    serializer_class = BookInventorySerializer
+    authentication_classes = [TokenUserAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().update(request, *args, **kwargs)
+
+    def perform_update(self, serializer):
+        """
+        Applies the change of TotalCopies to AvailableCopies on the locked inventory row.
+        Copies that are currently on loan cannot be removed.
+        """
+        current = BookInventory.objects.select_for_update().get(pk=serializer.instance.pk)
+        added = serializer.validated_data.get('TotalCopies', current.TotalCopies) - current.TotalCopies
+        if current.AvailableCopies + added < 0:
+            raise ValidationError({'TotalCopies': 'Cannot remove copies that are currently on loan.'})
+        serializer.save(AvailableCopies=current.AvailableCopies + added)
+
+class BorrowedBooksViewSet(ConditionalListMixin, SparseFieldsetMixin, FastListMixin, viewsets.ModelViewSet):
     """
     BorrowedBooksViewSet handles CRUD operations for the BorrowedBooks model.
     Requires JWT authentication for access.
     Requires the user to be authenticated.
     Includes custom create and update methods for handling borrowing and returning books.
     Provides additional actions for listing all borrowed books and currently borrowed books.
+    Listings are cursor paginated on (BorrowDate, id) and can be streamed as NDJSON with stream=true.
+    Borrows take a copy from the BookInventory and returns put it back, atomically with the loan change.
+    Borrows and returns sent with an Idempotency-Key header are processed once and replayed on retries.
     """
     queryset = BorrowedBooks.objects.all()
     serializer_class = BorrowedBooksSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [TokenUserAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = LoanCursorPagination
+    stream_chunk_size = 2000
+    bulk_batch_size = 1000
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('update', 'partial_update', 'destroy'):
+            # Lock the loan until the surrounding transaction commits, so it cannot be returned twice
+            queryset = queryset.select_for_update()
+        return queryset
+
+    def list_loans(self, queryset):
+        """
+        Helper to render a BorrowedBooks queryset either as a cursor paginated page
+        or, when stream=true is passed, as a complete NDJSON stream.
+        """
+        if self.request.query_params.get('stream', '').lower() in ('true', '1'):
+            return stream_ndjson(self.project_queryset(queryset).order_by(*LOAN_ORDERING), self.get_serializer(),
+                                 chunk_size=self.stream_chunk_size)
+        response = self.fast_list_response(queryset)
+        if response is not None:
+            return response
+        page = self.paginate_queryset(self.project_queryset(queryset))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @idempotent
     def create(self, request, *args, **kwargs):
         """
         Custom method to handle the creation of a BorrowedBooks instance (borrowing a book).
         Sets HasBeenReturned to False when borrowing a book.
+        Rejects the loan when no copy of the book is available.
         """
         try:
             data = request.data.copy()
             data['HasBeenReturned'] = False  # Set HasBeenReturned as False when borrowing a book
             serializer = self.get_serializer(data=data)
             serializer.is_valid(raise_exception=True)
-            self.perform_create(serializer)
+            with transaction.atomic():
+                if not inventory.reserve_copy(serializer.validated_data['BookID'].pk):
+                    raise ValidationError("No copy of this book is available.")
+                self.perform_create(serializer)
+                stats.record_borrows([serializer.instance])
             headers = self.get_success_headers(serializer.data)
             return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
         except ValidationError as ve:
             return Response({'error': str(ve)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+    @idempotent
     def update(self, request, *args, **kwargs):
         """
         Custom method to handle the update of a BorrowedBooks instance (returning a book).
         Updates ReturnDate, Fee, and HasBeenReturned fields based on the return date provided.
+        The loan row stays locked until the return is committed, so concurrent returns cannot both succeed.
         """
         try:
-            instance = self.get_object()
-            if instance.HasBeenReturned:
-                raise ValidationError("This book has already been returned.")
-            new_return_date = date.fromisoformat(request.data.get('ReturnDate'))
-            if new_return_date < instance.BorrowDate:
-                raise ValidationError("ReturnDate cannot be before BorrowDate.")
-            if new_return_date > instance.ReturnDate:
-                overdue_days = (new_return_date - instance.ReturnDate).days
-                instance.Fee = overdue_days * 10
-            instance.ReturnDate = new_return_date
-            instance.HasBeenReturned = True
-            instance.save()
+            with transaction.atomic():
+                instance = self.get_object()
+                if instance.HasBeenReturned:
+                    raise ValidationError("This book has already been returned.")
+                new_return_date = date.fromisoformat(request.data.get('ReturnDate'))
+                previous_fee = instance.Fee
+                apply_return(instance, new_return_date)
+                instance.save()
+                inventory.release_copies([instance.BookID_id])
+                stats.record_returns([(instance, previous_fee)])
 
             serializer = self.get_serializer(instance)
             return Response(serializer.data)
@@ -139,28 +393,168 @@ class BorrowedBooksViewSet(viewsets.ModelViewSet):
             return Response({'error': str(ve)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+    def destroy(self, request, *args, **kwargs):
+        """
+        Deletes a loan; deleting a loan that has not been returned puts its copy back on the shelf.
+        The loan is removed from the statistics aggregates in the same transaction.
+        """
+        with transaction.atomic():
+            return super().destroy(request, *args, **kwargs)
+
+    def perform_destroy(self, instance):
+        if not instance.HasBeenReturned:
+            inventory.release_copies([instance.BookID_id])
+        stats.record_deletions([instance])
+        instance.delete()
+
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    @idempotent
+    def bulk_borrow(self, request):
+        """
+        Custom action to borrow many books in one request.
+        Expects a list of loans; every item is validated with BorrowedBooksSerializer(many=True) rules and
+        all valid items are inserted with a single bulk_create inside one transaction.
+        Items for which no copy of the book is left are rejected.
+        Invalid items are reported by their index in the request without aborting the rest of the batch.
+        """
+        if not isinstance(request.data, list):
+            return Response({'error': 'Expected a list of borrowed books.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = [dict(item, HasBeenReturned=False) if isinstance(item, dict) else item for item in request.data]
+        serializer = self.get_serializer(data=data, many=True)
+        indexes, loans, errors = [], [], []
+        for index, item in enumerate(serializer.initial_data):
+            try:
+                loans.append(BorrowedBooks(**serializer.child.run_validation(item)))
+                indexes.append(index)
+            except ValidationError as ve:
+                errors.append({'index': index, 'error': ve.detail})
+
+        with transaction.atomic():
+            granted = inventory.reserve_copies([loan.BookID_id for loan in loans])
+            lent = []
+            for index, loan, available in zip(indexes, loans, granted):
+                if available:
+                    lent.append((index, loan))
+                else:
+                    errors.append({'index': index, 'error': ["No copy of this book is available."]})
+            indexes, loans = [index for index, _ in lent], [loan for _, loan in lent]
+            BorrowedBooks.objects.bulk_create(loans, batch_size=self.bulk_batch_size)
+            stats.record_borrows(loans)
+            changes.record_changes(loans, changes.CREATED)
+            transaction.on_commit(lambda: cache.invalidate_lists(BorrowedBooks))
+
+        errors.sort(key=lambda error: error['index'])
+        created = [
+            {'index': index, 'loan': serializer.child.to_representation(loan)}
+            for index, loan in zip(indexes, loans)
+        ]
+        response_status = status.HTTP_201_CREATED if created or not errors else status.HTTP_400_BAD_REQUEST
+        return Response({'created': created, 'errors': errors}, status=response_status)
+
+
+    @action(detail=False, methods=['patch'], url_path='bulk-return')
+    @idempotent
+    def bulk_return(self, request):
+        """
+        Custom action to return many books in one request.
+        Expects a list of {"id": <loan id>, "ReturnDate": <date>} items. The loans are loaded with a single query,
+        the overdue fee rule is applied to each of them in memory and all returns are written with one bulk_update
+        inside a transaction. Invalid items are reported by their index without aborting the rest of the batch.
+        """
+        if not isinstance(request.data, list):
+            return Response({'error': 'Expected a list of returns.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        returns, errors = [], []
+        for index, item in enumerate(request.data):
+            try:
+                if not isinstance(item, dict):
+                    raise ValidationError("Expected an object with id and ReturnDate.")
+                returns.append((index, int(item.get('id')), date.fromisoformat(item.get('ReturnDate'))))
+            except (TypeError, ValueError):
+                errors.append({'index': index, 'error': ["A valid id and ReturnDate (YYYY-MM-DD) are required."]})
+            except ValidationError as ve:
+                errors.append({'index': index, 'error': ve.detail})
+
+        serializer = self.get_serializer()
+        returned = []
+        with transaction.atomic():
+            # Lock the loans in id order, so concurrent batches sharing loans cannot deadlock
+            loans = {
+                loan.pk: loan for loan in BorrowedBooks.objects.select_for_update()
+                .filter(pk__in=[loan_id for _, loan_id, _ in returns]).order_by('pk')
+            }
+            for index, loan_id, new_return_date in returns:
+                instance = loans.get(loan_id)
+                try:
+                    if instance is None:
+                        raise ValidationError("No borrowed book found with id {}.".format(loan_id))
+                    previous_fee = instance.Fee
+                    apply_return(instance, new_return_date)
+                    returned.append((index, instance, previous_fee))
+                except ValidationError as ve:
+                    errors.append({'index': index, 'error': ve.detail})
+            BorrowedBooks.objects.bulk_update(
+                [instance for _, instance, _ in returned],
+                ['ReturnDate', 'Fee', 'HasBeenReturned'],
+                batch_size=self.bulk_batch_size,
+            )
+            inventory.release_copies([instance.BookID_id for _, instance, _ in returned])
+            stats.record_returns((instance, previous_fee) for _, instance, previous_fee in returned)
+            changes.record_changes([instance for _, instance, _ in returned], changes.UPDATED)
+            transaction.on_commit(lambda: cache.invalidate_lists(BorrowedBooks))
+
+        errors.sort(key=lambda error: error['index'])
+        returned = [
+            {'index': index, 'loan': serializer.to_representation(instance)} for index, instance, _ in returned
+        ]
+        response_status = status.HTTP_200_OK if returned or not errors else status.HTTP_400_BAD_REQUEST
+        return Response({'returned': returned, 'errors': errors}, status=response_status)
+
+
+    @action(detail=False, url_path='expanded', serializer_class=BorrowedBooksExpandedSerializer)
+    @conditional_list(BorrowedBooks, User, Book)
+    def list_expanded(self, request):
+        """
+        Custom action to list borrowed books with their User and Book embedded.
+        Users and books are joined with select_related, so each page is fetched in a single query.
+        """
+        try:
+            queryset = BorrowedBooks.objects.select_related('UserID', 'BookID')
+            return self.list_loans(queryset)
+        except (NotFound, ValidationError):
+            raise
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
     @action(detail=False, url_path='all')
+    @conditional_list(BorrowedBooks)
     def list_all(self, request):
         """
         Custom action to list all borrowed books.
         """
         try:
             queryset = BorrowedBooks.objects.all()
-            serializer = self.get_serializer(queryset, many=True)
-            return Response(serializer.data)
+            return self.list_loans(queryset)
+        except (NotFound, ValidationError):
+            raise
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
     @action(detail=False, url_path='current')
+    @conditional_list(BorrowedBooks)
     def list_current(self, request):
         """
         Custom action to list currently borrowed books.
         """
         try:
             queryset = BorrowedBooks.objects.filter(HasBeenReturned=False)
-            serializer = self.get_serializer(queryset, many=True)
-            return Response(serializer.data)
+            return self.list_loans(queryset)
+        except (NotFound, ValidationError):
+            raise
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 
 from pathlib import Path
 from datetime import timedelta
+from decouple import config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -38,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'library',
     'rest_framework',
     'rest_framework_simplejwt',
@@ -57,16 +59,57 @@ SWAGGER_SETTINGS = {
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'library.authentication.TokenUserAuthentication',
     ],
 }
 
+# Seconds an active-user check of TokenUserAuthentication is cached in each worker process (0 disables the check)
+LIBRARY_AUTH_ACTIVE_USER_TTL = config('LIBRARY_AUTH_ACTIVE_USER_TTL', default=60, cast=int)
+LIBRARY_AUTH_ACTIVE_USER_CACHE_SIZE = 10000
+
+# Token buckets of the login and signup throttles (see library/throttling.py): "<scope>.<key>" -> (rate, burst).
+# A client may send `burst` requests at once, then `rate` requests. The buckets are kept in the cache below,
+# which must be shared by the worker processes (CACHE_URL) for the limits to apply across them.
+LIBRARY_THROTTLE_RATES = {
+    'login.ip': ('20/min', 20),
+    'login.username': ('5/min', 5),
+    'signup.ip': ('5/min', 10),
+    'signup.username': ('3/min', 3),
+}
+LIBRARY_THROTTLE_CACHE_ALIAS = 'default'
+
+# Seconds the responses of borrow and return requests sent with an Idempotency-Key are kept (see
+# library/idempotency.py), and number of them cached in each worker process
+LIBRARY_IDEMPOTENCY_TTL = config('LIBRARY_IDEMPOTENCY_TTL', default=86400, cast=int)
+LIBRARY_IDEMPOTENCY_CACHE_SIZE = 1000
+
+# Change feed served at /library/changes/ (see library/changes.py): longest long-poll wait and outbox polling
+# interval, age after which a missing sequence number is skipped, and ages (in seconds) after which superseded events
+# and tombstones are removed by the compact_changes command
+LIBRARY_CHANGES_MAX_WAIT = 30
+LIBRARY_CHANGES_POLL_INTERVAL = 0.5
+LIBRARY_CHANGES_GAP_TIMEOUT = 5
+LIBRARY_CHANGES_COMPACT_AFTER = 3600
+LIBRARY_CHANGES_TOMBSTONE_TTL = 30 * 86400
+
+# In-memory availability index (see library/availability.py): seconds between two reads of the change feed and
+# between two full reconciliations with the database, and maximum number of ids per availability request
+LIBRARY_AVAILABILITY_SYNC_INTERVAL = 1
+LIBRARY_AVAILABILITY_RECONCILE_INTERVAL = 300
+LIBRARY_AVAILABILITY_MAX_IDS = 10000
+
+# Brotli quality (0-11) of compressed responses when the brotli package is installed (see library/compression.py)
+LIBRARY_COMPRESSION_BROTLI_QUALITY = 5
+
 JWT_AUTH = {
     'JWT_RESPONSE_PAYLOAD_HANDLER': 'library_management_system.utils.jwt_response_payload_handler',
     'JWT_EXPIRATION_DELTA': timedelta(hours=2),
 }
 
 MIDDLEWARE = [
+    'library.metrics.PerformanceMetricsMiddleware',
+    'library.database.ReplicaRoutingMiddleware',
+    'library.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -100,17 +143,85 @@ WSGI_APPLICATION = 'library_management_system.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# Connections are kept open for DATABASE_CONN_MAX_AGE seconds (0 closes them after every request) and checked
+# before being reused, so a connection dropped by the server is replaced instead of failing the request.
+# This is a persistent connection per worker thread, not a pool. Under ASGI (asgi.py sets DJANGO_SERVER_INTERFACE),
+# every request runs in its own context and opens its own connection, which would never be reused and would pile
+# up: the default is then 0, and connections should be pooled outside Django (PgBouncer).
+# Behind a transaction-pooling PgBouncer, set DATABASE_CONN_MAX_AGE=0 and DATABASE_DISABLE_SERVER_SIDE_CURSORS=True.
+
+SERVER_INTERFACE = config('DJANGO_SERVER_INTERFACE', default='wsgi')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'library_management_system',
-        'USER': 'suyamoon',
-        'PASSWORD': 'password',
-        'HOST': 'localhost',
-        'PORT': '5432',
+        'ENGINE': config('ENGINE', default='django.db.backends.postgresql'),
+        'NAME': config('DATABASE_NAME', default='library_management_system'),
+        'USER': config('DATABASE_USER', default='suyamoon'),
+        'PASSWORD': config('DATABASE_PASSWORD', default='password'),
+        'HOST': config('DATABASE_HOST', default='localhost'),
+        'PORT': config('DATABASE_PORT', default='5432'),
+        'CONN_MAX_AGE': config('DATABASE_CONN_MAX_AGE', default=0 if SERVER_INTERFACE == 'asgi' else 60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        'DISABLE_SERVER_SIDE_CURSORS': config('DATABASE_DISABLE_SERVER_SIDE_CURSORS', default=False, cast=bool),
     }
 }
 
+# Optional read replica: reads of GET/HEAD/OPTIONS requests are sent to it (see library/database.py)
+DATABASE_REPLICA_HOST = config('DATABASE_REPLICA_HOST', default='')
+
+if DATABASE_REPLICA_HOST:
+    DATABASES['replica'] = dict(
+        DATABASES['default'],
+        NAME=config('DATABASE_REPLICA_NAME', default=DATABASES['default']['NAME']),
+        HOST=DATABASE_REPLICA_HOST,
+        PORT=config('DATABASE_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        TEST={'MIRROR': 'default'},
+    )
+
+# Seconds after a write during which the replica may not have replayed it yet: reads whose result outlives the
+# response (cached payloads, listings with validators) go to the primary meanwhile
+LIBRARY_REPLICA_MAX_LAG = config('LIBRARY_REPLICA_MAX_LAG', default=5, cast=float)
+
+DATABASE_ROUTERS = ['library.database.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# The local-memory cache is used by default. Set CACHE_URL (e.g. redis://localhost:6379/0) to use the
+# Redis backend instead, which is shared by all worker processes (requires the redis package).
+
+CACHE_URL = config('CACHE_URL', default='')
+
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'library',
+        }
+    }
+
+# Cache alias and timeout (in seconds) used for the cached catalog payloads (see library/cache.py)
+LIBRARY_CACHE_ALIAS = 'default'
+LIBRARY_CACHE_TIMEOUT = config('LIBRARY_CACHE_TIMEOUT', default=300, cast=int)
+# Without CACHE_URL, every worker process has its own list versions: they expire after this many seconds, which bounds
+# how long a process keeps serving cached listings (and 304 responses) from before a write handled by another one
+LIBRARY_LOCAL_LIST_VERSION_TIMEOUT = config('LIBRARY_LOCAL_LIST_VERSION_TIMEOUT', default=5, cast=float)
+
+# Text search configuration used to build and query the catalog search documents (see library/search.py)
+LIBRARY_SEARCH_CONFIG = 'english'
+
+# Request metrics served at /metrics and in the Server-Timing header (see library/metrics.py).
+# When disabled, the middleware is removed at startup. The sample rate is the share of requests measured (0 to 1).
+LIBRARY_METRICS_ENABLED = config('LIBRARY_METRICS_ENABLED', default=True, cast=bool)
+LIBRARY_METRICS_SAMPLE_RATE = config('LIBRARY_METRICS_SAMPLE_RATE', default=1.0, cast=float)
+LIBRARY_METRICS_SERVER_TIMING = True
 
 
 # Password validation
@@ -5,6 +5,8 @@ from django.urls import include, path
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from library.database import health_view
+from library.metrics import metrics_view
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -21,6 +23,8 @@ schema_view = get_schema_view(
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('library/', include('library.urls')),
+    path('metrics', metrics_view, name='metrics'),
+    path('health', health_view, name='health'),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 ]